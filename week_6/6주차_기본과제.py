@@ -1,7 +1,7 @@
-import base64
 import streamlit as st
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
+import image_cache
 
 # Streamlit 페이지 설정
 st.set_page_config(page_title="Image Chat Bot", layout="wide")
@@ -16,6 +16,9 @@ api_key = st.sidebar.text_input("OpenAI API 키를 입력하세요:",
 
 if api_key:
     st.session_state.api_key = api_key
+
+# 한 번 분석한 이미지는 설명으로 대신 보내고, 질문이 가리키는 이미지만 다시 첨부
+selective_images = st.sidebar.checkbox("필요한 이미지만 전송 (이미지 설명 재사용)", value=True)
     
 # API 키 검증
 if not st.session_state.api_key:
@@ -34,8 +37,10 @@ try:
     # 세션 상태 초기화
     if "messages" not in st.session_state:
         st.session_state.messages = []
-    if "images" not in st.session_state:
-        st.session_state.images = []
+    # 업로드 이미지 저장소 (내용 해시로 중복 제거, 오래된 이미지부터 개수/용량 한도 안으로 정리)
+    if "image_store" not in st.session_state:
+        st.session_state.image_store = image_cache.ImageStore()
+    image_store = st.session_state.image_store
 
     # 다중 이미지 업로더
     uploaded_files = st.file_uploader(
@@ -45,18 +50,21 @@ try:
     )
 
     # 업로드된 이미지 처리
-    if uploaded_files:
-        for uploaded_file in uploaded_files:
-            if uploaded_file not in st.session_state.images:
-                st.session_state.images.append(uploaded_file)
-        
-        # 업로드된 모든 이미지 표시
-        cols = st.columns(len(st.session_state.images))
-        for idx, image in enumerate(st.session_state.images):
-            cols[idx].image(image)
+    # 같은 파일을 다시 올리거나 다시 실행되어 같은 업로드가 들어와도 내용이 같으면 한 번만 저장
+    # 업로더에서 지운 파일의 업로드 기록은 정리 (이미 저장한 이미지는 대화에 그대로 유지)
+    evicted = image_store.add_uploads(uploaded_files or [])
+    if evicted:
+        st.info(f"이미지 한도(최대 {image_store.max_images}장, {image_store.max_bytes // (1024 * 1024)}MB)를 넘어 오래된 이미지 {len(evicted)}장을 대화에서 제외했습니다.")
+
+    if len(image_store):
+        # 대화에 사용하는 모든 이미지 표시 (모델에 보내는 축소본)
+        cols = st.columns(len(image_store))
+        # 캡션은 업로드 순서로 정해진 이미지 번호 (질문과 이미지 설명에서 같은 번호로 가리킴)
+        for idx, payload in enumerate(image_store):
+            cols[idx].image(image_cache.image_bytes(payload), caption=f"이미지 {image_store.numbers[payload.key]}")
 
     # 채팅 인터페이스
-    if st.session_state.images:
+    if len(image_store):
         # 이전 대화 내역 표시
         for message in st.session_state.messages:
             with st.chat_message(message["role"]):
@@ -69,29 +77,34 @@ try:
                 st.markdown(prompt)
             st.session_state.messages.append({"role": "user", "content": prompt})
 
-            # 이미지 데이터 준비
-            image_contents = []
-            for img in st.session_state.images:
-                img.seek(0)
-                base64_image = base64.b64encode(img.read()).decode("utf-8")
-                image_contents.append({
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
-                })
+            # 이미지 데이터 준비 (업로드할 때 인코딩해 둔 결과를 그대로 사용)
+            # 선택 전송이면 처음 보는 이미지와 질문이 가리키는 이미지만 첨부하고 나머지는 설명으로 대체
+            if selective_images:
+                attached = image_cache.select_images(prompt, image_store)
+                content = image_cache.message_content(prompt, image_store, attached)
+            else:
+                attached = list(image_store)
+                content = [{"type": "text", "text": prompt}, *(image_cache.image_content(p) for p in attached)]
 
             # Assistant 응답
             with st.chat_message("assistant"):
-                message = HumanMessage(
-                    content=[
-                        {"type": "text", "text": prompt},
-                        *image_contents
-                    ]
-                )
+                message = HumanMessage(content=content)
                 result = model.invoke([message])
                 response = result.content
                 st.markdown(response)
+                st.caption(f"첨부 이미지 {len(attached)}/{len(image_store)}장")
                 st.session_state.messages.append({"role": "assistant", "content": response})
 
+            # 처음 분석한 이미지는 설명을 만들어 두고 다음 질문부터 설명으로 대체
+            # 설명이 없는 이미지를 한 번의 요청으로 묶어서 백그라운드에서 생성 (답변 후 기다리지 않음)
+            if selective_images:
+                image_cache.start_describing(
+                    image_store,
+                    lambda content, max_tokens: model.bind(max_tokens=max_tokens).invoke(
+                        [HumanMessage(content=content)]
+                    ).content,
+                )
+
 except Exception as e:
     st.error(f"오류가 발생했습니다: {str(e)}")
     if "Invalid API key" in str(e):
@@ -0,0 +1,362 @@
+import io
+import os
+import re
+import base64
+import hashlib
+import threading
+from collections import namedtuple, OrderedDict
+
+# 모델에 보내는 이미지의 긴 변 최대 길이(px), 저장 형식(JPEG/WEBP), 품질 (환경 변수로 변경 가능)
+# gpt-4o 계열은 긴 변 2048px, 짧은 변 768px로 줄여서 처리하므로 그보다 크게 보내도 업로드 시간만 늘어남
+MAX_IMAGE_SIDE = int(os.environ.get("IMAGE_MAX_SIDE", 1024))
+IMAGE_FORMAT = os.environ.get("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", 85))
+# 세션별로 보관/전송하는 최대 이미지 수와 base64 기준 최대 바이트 수
+MAX_SESSION_IMAGES = int(os.environ.get("IMAGE_SESSION_MAX_COUNT", 10))
+MAX_SESSION_BYTES = int(os.environ.get("IMAGE_SESSION_MAX_BYTES", 4 * 1024 * 1024))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png", "GIF": "image/gif"}
+# 파일 시그니처 -> 형식 (Pillow가 없을 때 원본 그대로 보낼 때 사용)
+MAGIC_BYTES = {b"\xff\xd8\xff": "JPEG", b"\x89PNG": "PNG", b"GIF8": "GIF", b"RIFF": "WEBP"}
+
+# 이미지 설명 요청 (한 번 설명한 이미지는 이후 질문에서 설명 텍스트로 대신 전달)
+# 설명이 없는 이미지를 모두 한 번의 요청으로 보내고, 각 설명은 이미지 앞의 라벨로 구분
+DESCRIPTION_PROMPT = """첨부한 이미지 {count}장을 각각 이후 질문에 이미지 없이 답할 수 있도록 설명해주세요.
+각 설명은 이미지 앞에 붙은 라벨(예: [이미지 1])로 시작하고, 라벨 순서대로 작성하세요.
+- 이미지 종류(차트, 표, 스크린샷, 사진 등)와 주제
+- 보이는 텍스트, 수치, 축/범례, 표의 주요 값은 가능한 한 그대로 옮겨 적기
+- 이미지당 200단어 이내"""
+# 설명 요청의 이미지당 최대 응답 토큰 수
+DESCRIPTION_TOKENS_PER_IMAGE = 500
+DESCRIPTION_LABEL_PATTERN = re.compile(r"\[이미지\s*(\d+)\]")
+DESCRIPTIONS_HEADER = "업로드한 이미지 설명 (이미지가 함께 첨부되지 않은 경우 이 설명을 기준으로 답변):\n"
+
+# 질문에서 이미지를 가리키는 표현 ("이미지 2", "2번째 사진", "두 번째", "마지막 이미지", "image 2")
+IMAGE_NUMBER_PATTERN = re.compile(r"(?:이미지|사진|그림|차트|image|img|picture)\s*#?\s*(\d+)", re.IGNORECASE)
+NUMBERED_PATTERN = re.compile(r"(\d+)\s*번(?:째)?")
+KOREAN_ORDINALS = {"첫": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+ORDINAL_PATTERN = re.compile(r"(다섯|여섯|일곱|여덟|아홉|첫|두|세|네|열)\s*번째")
+# 설명만으로는 부족하고 이미지 전체를 다시 봐야 하는 질문
+DETAIL_KEYWORDS = ("자세히", "다시 보", "확대", "세부", "zoom", "detail")
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# 업로드 이미지 하나를 모델 요청용으로 변환한 결과
+# key: 원본 내용의 해시, size: base64 인코딩 전 바이트 수
+ImagePayload = namedtuple("ImagePayload", ["key", "mime", "base64", "width", "height", "size"])
+
+
+def content_hash(data):
+    """이미지 원본 바이트의 SHA-256 해시 (같은 이미지를 다시 올려도 같은 키)"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _sniff_format(data):
+    for magic, image_format in MAGIC_BYTES.items():
+        if data.startswith(magic):
+            return image_format
+    return "JPEG"
+
+
+def encode_image(data, max_side=MAX_IMAGE_SIDE, image_format=IMAGE_FORMAT, quality=IMAGE_QUALITY):
+    """
+    이미지를 디코딩해서 긴 변을 max_side 이하로 줄이고 image_format으로 다시 인코딩
+    줄일 필요가 없고 다시 인코딩한 결과가 원본보다 크면 원본을 그대로 사용
+    Pillow가 없으면 원본 그대로 사용
+    :param data: 업로드한 이미지 원본 바이트
+    :return: (형식, 인코딩된 바이트, 가로, 세로)
+    """
+    if Image is None:
+        return _sniff_format(data), data, None, None
+
+    with Image.open(io.BytesIO(data)) as image:
+        original_format = image.format
+        # 휴대폰 사진의 회전 정보를 픽셀에 반영
+        image = ImageOps.exif_transpose(image)
+        resized = max(image.size) > max_side
+        if resized:
+            image.thumbnail((max_side, max_side))
+
+        if image_format == "JPEG" and image.mode != "RGB":
+            # JPEG는 투명도를 지원하지 않으므로 흰 배경에 합성
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel("A"))
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=image_format, quality=quality)
+        encoded = buffer.getvalue()
+        width, height = image.size
+
+    if not resized and len(encoded) >= len(data) and original_format in MIME_TYPES:
+        return original_format, data, width, height
+    return image_format, encoded, width, height
+
+
+def prepare_image(data, payloads, max_side=MAX_IMAGE_SIDE, image_format=IMAGE_FORMAT, quality=IMAGE_QUALITY,
+                  key=None):
+    """
+    이미지를 한 번만 변환해서 payloads에 내용 해시로 저장하고, 이미 있으면 저장된 결과 반환
+    :param data: 업로드한 이미지 원본 바이트
+    :param payloads: {내용 해시: ImagePayload} (세션 상태 등)
+    :param key: 미리 계산한 내용 해시, 없으면 여기서 계산
+    :return: ImagePayload
+    """
+    key = key or content_hash(data)
+    if key not in payloads:
+        encoded_format, encoded, width, height = encode_image(data, max_side, image_format, quality)
+        payloads[key] = ImagePayload(
+            key=key,
+            mime=MIME_TYPES[encoded_format],
+            base64=base64.b64encode(encoded).decode("utf-8"),
+            width=width,
+            height=height,
+            size=len(encoded),
+        )
+    return payloads[key]
+
+
+def image_content(payload):
+    """ImagePayload를 LangChain/OpenAI 메시지의 이미지 항목으로 변환"""
+    return {
+        "type": "image_url",
+        "image_url": {"url": f"data:{payload.mime};base64,{payload.base64}"},
+    }
+
+
+def image_bytes(payload):
+    """화면 표시용으로 ImagePayload의 인코딩된 이미지 바이트 복원"""
+    return base64.b64decode(payload.base64)
+
+
+def upload_id(uploaded_file):
+    """
+    업로드 파일 식별자 (다시 실행될 때 같은 업로드는 같은 값)
+    같은 업로드는 내용 해시를 다시 계산하지 않기 위해 사용
+    """
+    file_id = getattr(uploaded_file, "file_id", None)
+    return file_id or (uploaded_file.name, uploaded_file.size)
+
+
+class ImageStore:
+    """
+    세션별 업로드 이미지 저장소
+    내용 해시로 중복을 제거해서 같은 이미지는 한 번만 보관/전송하고
+    이미지 수(max_images)나 base64 바이트 합계(max_bytes)를 넘으면 가장 오래 사용하지 않은 이미지부터 제거
+    이미지 번호("이미지 N")는 처음 추가한 순서로 한 번 정해지고 다시 올리거나 다른 이미지가 제거되어도 바뀌지 않음
+    (순회도 번호 순서, 제거 순서만 최근 사용 순서를 따름)
+    """
+
+    def __init__(self, max_images=MAX_SESSION_IMAGES, max_bytes=MAX_SESSION_BYTES):
+        self.max_images = max_images
+        self.max_bytes = max_bytes
+        self.payloads = OrderedDict()  # 내용 해시 -> ImagePayload (오래 사용하지 않은 순서)
+        self.upload_keys = {}  # 업로드 식별자 -> 내용 해시
+        self.evicted_uploads = set()  # 한도를 넘어 이미지가 제거된 업로드 식별자 (업로더에 남아 있는 동안만 보관)
+        self.names = {}  # 내용 해시 -> 업로드 파일 이름
+        self.descriptions = {}  # 내용 해시 -> 이미지 설명 (처음 분석한 뒤 생성)
+        self.numbers = {}  # 내용 해시 -> 이미지 번호 (화면 캡션, 질문의 번호, 설명 라벨에 공통으로 사용)
+        self.describing = set()  # 백그라운드에서 설명을 만드는 중인 내용 해시
+        self._next_number = 1
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def __iter__(self):
+        return iter(sorted(self.payloads.values(), key=lambda payload: self.numbers[payload.key]))
+
+    def __contains__(self, key):
+        return key in self.payloads
+
+    def add(self, data, upload=None):
+        """
+        이미지 원본 바이트를 추가 (이미 있는 내용이면 변환하지 않고 최근 사용으로만 갱신)
+        :param upload: 업로드 식별자, 있으면 다음 실행 때 해시 계산 없이 찾음
+        :return: (ImagePayload, 제거된 ImagePayload 리스트)
+        """
+        key = content_hash(data)
+        if key not in self.payloads:
+            self.total_bytes += len(prepare_image(data, self.payloads, key=key).base64)
+            self.numbers[key] = self._next_number
+            self._next_number += 1
+        if upload is not None:
+            self.upload_keys[upload] = key
+        self.payloads.move_to_end(key)
+        return self.payloads[key], self._evict()
+
+    def add_upload(self, uploaded_file):
+        """
+        Streamlit UploadedFile 추가, 다시 실행될 때 같은 업로드는 읽지 않고 건너뜀
+        :return: (ImagePayload 또는 제거된 경우 None, 제거된 ImagePayload 리스트)
+        """
+        upload = upload_id(uploaded_file)
+        if upload in self.upload_keys:
+            return self.payloads[self.upload_keys[upload]], []
+        if upload in self.evicted_uploads:
+            return None, []
+        payload, evicted = self.add(uploaded_file.getvalue(), upload)
+        self.names[payload.key] = uploaded_file.name
+        return payload, evicted
+
+    def add_uploads(self, uploaded_files):
+        """
+        업로더에 있는 파일을 모두 추가하고, 업로더에서 빠진 파일의 업로드 기록은 정리
+        한도를 넘어 제거된 업로드는 업로더에 남아 있는 동안 다시 추가하지 않음
+        (다시 실행될 때마다 업로더의 파일끼리 서로 밀어내지 않도록)
+        :return: 제거된 ImagePayload 리스트
+        """
+        current = {upload_id(uploaded_file) for uploaded_file in uploaded_files}
+        self.upload_keys = {upload: key for upload, key in self.upload_keys.items() if upload in current}
+        self.evicted_uploads &= current
+        evicted = []
+        for uploaded_file in uploaded_files:
+            evicted += self.add_upload(uploaded_file)[1]
+        return evicted
+
+    def set_descriptions(self, descriptions):
+        """설명 저장 {내용 해시: 설명} (설명하는 동안 제거된 이미지는 무시)"""
+        for key, description in descriptions.items():
+            if key in self.payloads:
+                self.descriptions[key] = description
+
+    def undescribed(self):
+        """아직 설명이 없는 이미지 (이미지 번호 순서)"""
+        return [payload for payload in self if payload.key not in self.descriptions]
+
+    def _evict(self):
+        # 방금 추가한 이미지 하나는 예산보다 커도 남겨둠
+        evicted = []
+        while len(self.payloads) > 1 and (
+            len(self.payloads) > self.max_images or self.total_bytes > self.max_bytes
+        ):
+            _, payload = self.payloads.popitem(last=False)
+            self.total_bytes -= len(payload.base64)
+            self.names.pop(payload.key, None)
+            self.descriptions.pop(payload.key, None)
+            self.numbers.pop(payload.key, None)
+            evicted.append(payload)
+        if evicted:
+            # 제거된 이미지를 가리키는 업로드 기록도 함께 옮김 (없는 키를 가리키지 않도록)
+            evicted_keys = {payload.key for payload in evicted}
+            self.evicted_uploads |= {upload for upload, key in self.upload_keys.items() if key in evicted_keys}
+            self.upload_keys = {
+                upload: key for upload, key in self.upload_keys.items() if key not in evicted_keys
+            }
+        return evicted
+
+
+def referenced_images(question, store):
+    """
+    질문이 가리키는 이미지
+    번호("이미지 2", "2번째", "두 번째", "마지막")나 파일 이름으로 지정한 이미지,
+    자세히/다시 보기처럼 이미지 자체가 필요한 질문이면 전체 이미지
+    :return: ImagePayload 리스트 (이미지 번호 순서)
+    """
+    payloads = list(store)
+    lowered = question.lower()
+    if any(keyword in lowered for keyword in DETAIL_KEYWORDS):
+        return payloads
+
+    numbers = {int(n) for n in IMAGE_NUMBER_PATTERN.findall(question) + NUMBERED_PATTERN.findall(question)}
+    numbers |= {KOREAN_ORDINALS[word] for word in ORDINAL_PATTERN.findall(question)}
+    if "마지막" in question and payloads:
+        numbers.add(store.numbers[payloads[-1].key])
+    referenced = set()
+    for payload in payloads:
+        name = os.path.splitext(store.names.get(payload.key, ""))[0].lower()
+        if store.numbers[payload.key] in numbers or (len(name) >= 3 and name in lowered):
+            referenced.add(payload.key)
+    return [payload for payload in payloads if payload.key in referenced]
+
+
+def select_images(question, store):
+    """
+    이번 질문에 이미지 자체를 첨부할 이미지
+    설명이 아직 없는 이미지(처음 분석) + 질문이 가리키는 이미지, 나머지는 설명 텍스트로 대체
+    :return: ImagePayload 리스트 (이미지 번호 순서)
+    """
+    keys = {payload.key for payload in store.undescribed()}
+    keys |= {payload.key for payload in referenced_images(question, store)}
+    return [payload for payload in store if payload.key in keys]
+
+
+def message_content(question, store, attached):
+    """
+    질문 메시지 내용 생성: [이미지 설명 + 질문 텍스트] + 첨부 이미지
+    설명은 첨부하지 않은 이미지만 포함하고, 모든 이미지에 이미지 번호를 붙여서 질문과 맞춤
+    :param attached: 이미지 자체를 첨부할 ImagePayload 리스트
+    :return: LangChain/OpenAI 메시지 content 리스트
+    """
+    attached_keys = {payload.key for payload in attached}
+    lines = [
+        f"[이미지 {store.numbers[payload.key]}] {store.descriptions[payload.key]}"
+        for payload in store
+        if payload.key not in attached_keys and payload.key in store.descriptions
+    ]
+    text = DESCRIPTIONS_HEADER + "\n\n".join(lines) + "\n\n" + question if lines else question
+    if attached and len(store) > 1:
+        numbers = ", ".join(
+            f"이미지 {store.numbers[payload.key]}" for payload in store if payload.key in attached_keys
+        )
+        text += f"\n\n(첨부 이미지 순서: {numbers})"
+    return [{"type": "text", "text": text}, *(image_content(payload) for payload in attached)]
+
+
+def description_content(store, payloads):
+    """
+    이미지 여러 장의 설명 요청 메시지 content (이미지마다 앞에 이미지 번호 라벨)
+    :param payloads: 설명할 ImagePayload 리스트
+    """
+    content = [{"type": "text", "text": DESCRIPTION_PROMPT.format(count=len(payloads))}]
+    for payload in payloads:
+        content += [{"type": "text", "text": f"[이미지 {store.numbers[payload.key]}]"}, image_content(payload)]
+    return content
+
+
+def parse_descriptions(text, labels):
+    """
+    설명 응답을 라벨 기준으로 나눔
+    :param labels: {이미지 번호: 내용 해시}
+    :return: {내용 해시: 설명} (라벨이 없는 응답은 이미지가 한 장일 때만 전체를 설명으로 사용)
+    """
+    parts = DESCRIPTION_LABEL_PATTERN.split(text)
+    descriptions = {}
+    for number, description in zip(parts[1::2], parts[2::2]):
+        key = labels.get(int(number))
+        if key is not None and description.strip():
+            descriptions[key] = description.strip()
+    if not descriptions and len(labels) == 1 and text.strip():
+        descriptions[next(iter(labels.values()))] = text.strip()
+    return descriptions
+
+
+def start_describing(store, describe):
+    """
+    설명이 없는 이미지를 한 번의 요청으로 묶어서 백그라운드 스레드에서 설명 (답변 표시를 기다리게 하지 않음)
+    설명이 저장되기 전의 질문에서는 해당 이미지를 그대로 첨부
+    :param describe: (content, 최대 응답 토큰 수)를 받아 응답 텍스트를 반환하는 함수 (Streamlit 함수 호출 금지)
+    :return: 시작한 스레드, 설명할 이미지가 없으면 None
+    """
+    payloads = [payload for payload in store.undescribed() if payload.key not in store.describing]
+    if not payloads:
+        return None
+    labels = {store.numbers[payload.key]: payload.key for payload in payloads}
+    content = description_content(store, payloads)
+    store.describing.update(labels.values())
+
+    def run():
+        try:
+            text = describe(content, DESCRIPTION_TOKENS_PER_IMAGE * len(payloads))
+            store.set_descriptions(parse_descriptions(text, labels))
+        except Exception as e:
+            print(f"Error describing images: {e}")
+        finally:
+            store.describing.difference_update(labels.values())
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
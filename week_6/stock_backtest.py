@@ -0,0 +1,188 @@
+import itertools
+import warnings
+import numpy as np
+import pandas as pd
+from stock_indicator import build_panel, rolling_mean, ema, rma, shift
+
+TRADING_DAYS_PER_YEAR = 252
+
+# generate_quant_features의 시그널과 기본 파라미터
+# holding_days: 이벤트 시그널(교차)이 발생한 뒤 보유하는 거래일 수
+SIGNAL_DEFAULTS = {
+    "RSI_Up": {"length": 14},
+    "MACD_Crossover": {"fast": 12, "slow": 26, "signal": 9, "holding_days": 5},
+    "SMA_Trend": {"fast": 20, "slow": 50},
+}
+METRIC_COLUMNS = [
+    "Total_Return", "Annual_Return", "Buy_Hold_Return", "Volatility", "Sharpe",
+    "Max_Drawdown", "Hit_Rate", "Exposure", "Trades",
+]
+
+
+def close_panel(ohlcv_dict):
+    """
+    종목별 OHLCV에서 (날짜 x 종목) 종가 패널 생성
+    종목마다 거래일이 다른 날은 직전 종가로 채우고, 상장 전 구간은 NaN으로 유지
+    """
+    panel = build_panel(ohlcv_dict)
+    if not panel:
+        return pd.DataFrame()
+    return panel["Close"].ffill()
+
+
+def _cached(cache, key, compute):
+    # 파라미터 스윕에서 같은 길이의 지표를 다시 계산하지 않도록 메모
+    if cache is None:
+        return compute()
+    if key not in cache:
+        cache[key] = compute()
+    return cache[key]
+
+
+def rsi_up_signal(close, length=14, cache=None):
+    """RSI가 전일보다 높은 날 (RSI_Up_Flag의 전체 기간 버전)"""
+    def compute_rsi():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = close - shift(close, 1)
+            positive_avg = rma(np.where(change < 0, 0.0, change), length)
+            negative_avg = rma(np.where(change > 0, 0.0, change), length)
+            return 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+
+    rsi = _cached(cache, ("rsi", length), compute_rsi)
+    return rsi > shift(rsi, 1)
+
+
+def macd_crossover_signal(close, fast=12, slow=26, signal=9, cache=None):
+    """MACD가 시그널선을 아래에서 위로 돌파한 날 (MACD_Crossover의 전체 기간 버전)"""
+    def compute_macd():
+        return _cached(cache, ("ema", fast), lambda: ema(close, fast)) - \
+            _cached(cache, ("ema", slow), lambda: ema(close, slow))
+
+    macd = _cached(cache, ("macd", fast, slow), compute_macd)
+    macd_signal = _cached(cache, ("macd_signal", fast, slow, signal), lambda: ema(macd, signal))
+    with np.errstate(invalid="ignore"):
+        above = macd > macd_signal
+        prev_below_or_equal = shift(macd, 1) <= shift(macd_signal, 1)
+    return above & prev_below_or_equal
+
+
+def sma_trend_signal(close, fast=20, slow=50, cache=None):
+    """단기 이동평균이 중기 이동평균보다 높은 날 (SMA_Trend_Flag의 전체 기간 버전)"""
+    fast_sma = _cached(cache, ("sma", fast), lambda: rolling_mean(close, fast))
+    slow_sma = _cached(cache, ("sma", slow), lambda: rolling_mean(close, slow))
+    with np.errstate(invalid="ignore"):
+        return fast_sma > slow_sma
+
+
+def compute_signal(close, name, params, cache=None):
+    """
+    시그널 이름과 파라미터로 (날짜 x 종목) bool 배열 계산
+    :param close: (날짜 x 종목) 종가 배열
+    """
+    if name == "RSI_Up":
+        return rsi_up_signal(close, params["length"], cache)
+    if name == "MACD_Crossover":
+        return macd_crossover_signal(close, params["fast"], params["slow"], params["signal"], cache)
+    if name == "SMA_Trend":
+        return sma_trend_signal(close, params["fast"], params["slow"], cache)
+    raise ValueError(f"지원하지 않는 시그널입니다: {name}")
+
+
+def signal_positions(signal, holding_days=None):
+    """
+    시그널로 다음 거래일부터의 보유 여부(0/1) 계산 (당일 종가로 판단하고 다음날 보유)
+    :param holding_days: 있으면 시그널 발생 후 holding_days 거래일 동안 보유, 없으면 시그널이 켜진 동안 보유
+    """
+    signal = signal.astype(np.float64)
+    if holding_days:
+        # 최근 holding_days 일 안에 시그널이 한 번이라도 있었는지를 누적합 차이로 계산
+        counts = np.cumsum(signal, axis=0)
+        lagged = np.zeros_like(counts)
+        lagged[holding_days:] = counts[:-holding_days]
+        signal = ((counts - lagged) > 0).astype(np.float64)
+    positions = np.zeros_like(signal)
+    positions[1:] = signal[:-1]
+    return positions
+
+
+def simulate_positions(positions, close, cost=0.0):
+    """
+    보유 여부와 종가로 종목별 성과 지표 계산 (종목/날짜 전체를 배열 연산으로 처리)
+    :param positions: (날짜 x 종목) 보유 비중 (0 또는 1)
+    :param close: (날짜 x 종목) 종가 배열
+    :param cost: 진입/청산 1회당 거래 비용 (비율, 예: 0.001 = 0.1%)
+    :return: {METRIC_COLUMNS: 종목별 배열}
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = close / shift(close, 1) - 1
+    traded = ~np.isnan(returns)
+    returns = np.where(traded, returns, 0.0)
+    positions = np.where(traded, positions, 0.0)
+
+    turnover = np.abs(np.diff(positions, axis=0, prepend=0.0))
+    strategy = positions * returns - cost * turnover
+
+    days = np.maximum(traded.sum(axis=0), 1)
+    invested = positions > 0
+    invested_days = invested.sum(axis=0)
+
+    equity = np.cumprod(1 + strategy, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+    total_return = equity[-1] - 1
+    volatility = strategy.std(axis=0) * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "Total_Return": total_return,
+            "Annual_Return": (1 + total_return) ** (TRADING_DAYS_PER_YEAR / days) - 1,
+            "Buy_Hold_Return": np.prod(1 + returns, axis=0) - 1,
+            "Volatility": volatility,
+            "Sharpe": np.where(volatility > 0, strategy.mean(axis=0) * TRADING_DAYS_PER_YEAR / volatility, np.nan),
+            "Max_Drawdown": drawdown.min(axis=0),
+            "Hit_Rate": np.where(invested_days > 0, (invested & (strategy > 0)).sum(axis=0) / invested_days, np.nan),
+            "Exposure": invested_days / days,
+            "Trades": (np.diff(positions, axis=0) > 0).sum(axis=0),
+        }
+
+
+def backtest_signal(close, name, params=None, cost=0.0, cache=None):
+    """
+    시그널 하나를 종목 전체에 대해 백테스트
+    :param close: close_panel 결과 (날짜 x 종목 데이터프레임)
+    :param name: SIGNAL_DEFAULTS의 시그널 이름
+    :param params: 시그널 파라미터, 없으면 기본값
+    :return: 종목별 METRIC_COLUMNS 데이터프레임
+    """
+    params = {**SIGNAL_DEFAULTS[name], **(params or {})}
+    values = close.to_numpy(dtype=np.float64)
+    signal = compute_signal(values, name, params, cache)
+    positions = signal_positions(signal, params.get("holding_days"))
+    metrics = simulate_positions(positions, values, cost)
+    return pd.DataFrame(metrics, index=close.columns, columns=METRIC_COLUMNS)
+
+
+def sweep_signal(close, name, grid, cost=0.0):
+    """
+    파라미터 조합 전체를 백테스트하고 조합별로 종목 평균 지표를 반환
+    같은 길이의 이동평균/EMA/RSI는 한 번만 계산해서 조합 사이에 재사용
+    :param grid: {파라미터 이름: 후보 값 리스트}, 없는 파라미터는 기본값
+    :return: 조합(행) x (파라미터 + 평균 지표) 데이터프레임
+    """
+    values = close.to_numpy(dtype=np.float64)
+    cache = {}
+    names = list(grid)
+    rows = []
+    for combination in itertools.product(*(grid[key] for key in names)):
+        params = {**SIGNAL_DEFAULTS[name], **dict(zip(names, combination))}
+        # 단기 기간이 장기 기간보다 길면 의미가 없으므로 건너뜀
+        if "fast" in params and "slow" in params and params["fast"] >= params["slow"]:
+            continue
+        signal = compute_signal(values, name, params, cache)
+        positions = signal_positions(signal, params.get("holding_days"))
+        metrics = simulate_positions(positions, values, cost)
+        with warnings.catch_warnings():
+            # 모든 종목이 NaN인 지표(예: 한 번도 보유하지 않은 적중률)는 경고 없이 NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            summary = {column: np.nanmean(metrics[column]) for column in METRIC_COLUMNS}
+        rows.append({**dict(zip(names, combination)), **summary})
+    return pd.DataFrame(rows)
@@ -0,0 +1,173 @@
+import os
+import time
+import pickle
+import sqlite3
+from contextlib import contextmanager
+
+# 캐시 디렉토리 (환경 변수로 변경 가능)
+CACHE_DIR_ENV = "STOCK_CACHE_DIR"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "stock_manager")
+
+# 데이터 종류별 유효 시간(초)
+# 일봉은 하루 한 번, 재무제표는 분기 단위로 바뀌고, info의 주가 관련 지표는 매일 바뀜
+DEFAULT_TTL = {
+    "ohlcv": 12 * 60 * 60,
+    "info": 24 * 60 * 60,
+    "statements": 7 * 24 * 60 * 60,
+    # 같은 날 같은 프롬프트의 AI 응답 재사용
+    "llm_response": int(os.environ.get("STOCK_LLM_CACHE_TTL", 24 * 60 * 60)),
+}
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class DiskCache:
+    """
+    SQLite 기반 영구 캐시
+    (종류, 키) 단위로 pickle 직렬화한 값을 저장하고
+    종류별 TTL이 지나면 만료, 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 제거
+    프로세스 재시작이나 여러 워커 사이에서도 같은 파일을 공유
+    """
+
+    def __init__(self, cache_dir=None, ttl=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, "cache.sqlite3")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (kind, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        # Streamlit은 세션마다 스레드가 다르므로 호출마다 연결을 새로 열고 닫음
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, kind, key, default=None):
+        """
+        캐시된 값을 반환, 없거나 TTL이 지났으면 default 반환
+        :param kind: 데이터 종류 ("ohlcv", "info", "statements" 등)
+        :param key: 캐시 키 (보통 종목 심볼)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM cache WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is None:
+                return default
+            value, created_at = row
+            ttl = self.ttl.get(kind)
+            if ttl is not None and now - created_at > ttl:
+                conn.execute("DELETE FROM cache WHERE kind = ? AND key = ?", (kind, key))
+                return default
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE kind = ? AND key = ?", (now, kind, key)
+            )
+        try:
+            return pickle.loads(value)
+        except Exception:
+            return default
+
+    def get_many(self, kind, keys):
+        """
+        여러 키를 한 번의 연결로 조회 (종목 전체 스크리닝처럼 키가 많을 때 사용)
+        :return: {키: 값} (없거나 TTL이 지난 키는 제외)
+        """
+        keys = list(keys)
+        now = time.time()
+        ttl = self.ttl.get(kind)
+        rows = []
+        with self._connect() as conn:
+            # SQLite 바인딩 변수 개수 제한 때문에 나눠서 조회
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows += conn.execute(
+                    f"SELECT key, value, created_at FROM cache WHERE kind = ? AND key IN ({placeholders})",
+                    (kind, *batch),
+                ).fetchall()
+            fresh = [row for row in rows if ttl is None or now - row[2] <= ttl]
+            conn.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE kind = ? AND key = ?",
+                [(now, kind, key) for key, _, _ in fresh],
+            )
+
+        values = {}
+        for key, value, _ in fresh:
+            try:
+                values[key] = pickle.loads(value)
+            except Exception:
+                continue
+        return values
+
+    def set(self, kind, key, value):
+        """
+        값을 저장하고 전체 크기가 제한을 넘으면 LRU 순서로 제거
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (kind, key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, sqlite3.Binary(blob), len(blob), now, now),
+            )
+            self._evict(conn)
+
+    def delete(self, kind, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE kind = ? AND key = ?", (kind, key))
+
+    def clear(self, kind=None):
+        with self._connect() as conn:
+            if kind is None:
+                conn.execute("DELETE FROM cache")
+            else:
+                conn.execute("DELETE FROM cache WHERE kind = ?", (kind,))
+
+    def _evict(self, conn):
+        # 만료된 항목 먼저 정리
+        now = time.time()
+        for kind, ttl in self.ttl.items():
+            conn.execute("DELETE FROM cache WHERE kind = ? AND created_at < ?", (kind, now - ttl))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT kind, key, size FROM cache ORDER BY accessed_at").fetchall()
+        for kind, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM cache WHERE kind = ? AND key = ?", (kind, key))
+            total -= size
+
+    def get_or_fetch(self, kind, key, fetch):
+        """
+        캐시에 있으면 반환, 없으면 fetch()로 가져와서 저장 후 반환
+        fetch 결과가 None이면 저장하지 않음
+        """
+        value = self.get(kind, key)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                self.set(kind, key, value)
+        return value
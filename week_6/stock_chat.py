@@ -0,0 +1,227 @@
+import re
+import hashlib
+import stock_llm
+import stock_prompt
+
+# 추가 질문 한 번에 보내는 대화 맥락의 토큰 예산
+# 분석 요약 + 관련 종목 데이터 + 최근 대화가 각각 예산 안에서만 들어가므로
+# 대화가 길어져도 요청 크기가 일정하게 유지됨
+SUMMARY_TOKEN_BUDGET = 800
+SECTION_TOKEN_BUDGET = 2000
+HISTORY_TOKEN_BUDGET = 1500
+# 최근 대화로 포함하는 최대 메시지 수 (질문/답변 각각 1개)
+MAX_HISTORY_MESSAGES = 8
+# 질문에 종목이 없을 때 직전 질문에서 찾는 범위 (메시지 수)
+SYMBOL_LOOKBACK_MESSAGES = 4
+# 검색 인덱스에서 가져오는 후보 문단 수 (SECTION_TOKEN_BUDGET 안에서 점수 순으로 사용)
+RETRIEVAL_TOP_K = 8
+
+CHAT_SYSTEM_TEXT = "다음은 주식 분석 결과입니다. 이 내용을 기반으로 질문에 답변해주세요."
+
+SUMMARY_SYSTEM_TEXT = "당신은 금융 분석 보고서를 요약하는 애널리스트입니다."
+SUMMARY_PROMPT_TEMPLATE = """
+아래 주식 분석 결과를 이후 추가 질문에 답하기 위한 참고 자료로 요약해주세요.
+- 종목별로 핵심 판단(매수/보유/매도 의견), 근거가 된 주요 수치, 위험 요인을 한두 줄로 정리
+- 전체 의견이나 포트폴리오 관련 내용이 있으면 마지막에 정리
+- {max_tokens} 토큰 이내, 불필요한 수식어 없이 작성
+
+{analysis}
+"""
+
+CONTEXT_TEMPLATE = """{system_text}
+
+## 분석 요약
+{summary}
+"""
+SECTION_CONTEXT_TEMPLATE = """
+## 질문 관련 종목 데이터
+{sections}
+"""
+RETRIEVED_CONTEXT_TEMPLATE = """
+## 질문 관련 분석 내용 및 종목 데이터
+(수치는 종목 데이터 기준으로 답변)
+{passages}
+"""
+
+# 영문 대문자 티커 (BRK.B 같은 클래스 표기 포함, 앞에 $ 표기 가능), 한글 조사가 바로 붙어도 인식
+SYMBOL_PATTERN = re.compile(r"(?<![A-Za-z0-9.$])(\$?)([A-Z]{1,5}(?:\.[A-Z])?)(?![A-Za-z0-9])")
+HANGUL_PATTERN = re.compile(r"[가-힣]")
+# 1~2글자 티커나 영어 단어와 같은 티커는 "$A"나 "A는"처럼 표시가 있을 때만 종목으로 인식
+# ("I think A is good"의 I, A나 IT, ON, NOW, ALL 같은 단어가 엉뚱한 종목 데이터를 가져오지 않도록)
+AMBIGUOUS_SYMBOL_LENGTH = 2
+COMMON_WORD_SYMBOLS = {
+    "ALL", "AND", "ANY", "ARE", "BIG", "CAN", "CAR", "DAY", "FAST", "FOR", "GOOD", "HAS", "HOLD", "HOW",
+    "KEY", "LOW", "MAN", "NEW", "NOW", "OLD", "ONE", "OUT", "PAYS", "RUN", "SEE", "THE", "TWO", "WELL",
+    "WHY", "YOU", "USA", "EPS", "ROE", "PER", "PBR", "RSI", "MACD", "SMA", "ATR", "CEO", "ETF",
+}
+
+
+def analysis_key(full_ai_response):
+    """분석 결과 내용의 해시 (분석이 바뀌면 요약을 다시 만들기 위한 키)"""
+    return hashlib.sha256(full_ai_response.encode("utf-8")).hexdigest()
+
+
+def truncate_to_tokens(text, token_budget, model="gpt-4o"):
+    """
+    문단 단위로 앞에서부터 token_budget 안에 들어가는 만큼만 남김
+    첫 문단 하나가 예산보다 크면 글자 수 비율로 자름
+    """
+    if stock_llm.count_tokens(text, model) <= token_budget:
+        return text
+    kept, used = [], 0
+    for paragraph in text.split("\n\n"):
+        tokens = stock_llm.count_tokens(paragraph, model)
+        if used + tokens > token_budget:
+            break
+        kept.append(paragraph)
+        used += tokens
+    if kept:
+        return "\n\n".join(kept)
+    return text[: max(len(text) * token_budget // stock_llm.count_tokens(text, model), 1)]
+
+
+def summarize_analysis(full_ai_response, api_key, model="gpt-4o", cache=None,
+                       token_budget=SUMMARY_TOKEN_BUDGET):
+    """
+    전체 AI 분석 결과를 추가 질문용 요약으로 압축 (대화 세션당 한 번)
+    이미 예산 안에 들어가면 그대로 사용하고, 요약 요청이 실패하면 앞부분만 잘라서 사용
+    :param cache: stock_cache.DiskCache, 있으면 같은 분석의 요약은 저장된 응답 재사용
+    :return: (요약 텍스트, 요약 성공 여부) 실패해서 앞부분만 자른 경우 False (다음 질문에서 다시 요약)
+    """
+    if stock_llm.count_tokens(full_ai_response, model) <= token_budget:
+        return full_ai_response, True
+    prompt = SUMMARY_PROMPT_TEMPLATE.format(max_tokens=token_budget, analysis=full_ai_response)
+    try:
+        summary = stock_llm.run_completions(
+            api_key=api_key,
+            model=model,
+            system_text=SUMMARY_SYSTEM_TEXT,
+            prompt_texts=[prompt],
+            cache=cache,
+            max_tokens=token_budget,
+        )[0]
+    except Exception as e:
+        summary = f"AI 요청 중 오류 발생: {e}"
+    if summary.startswith("AI 요청 중 오류 발생") or summary == "응답 없음":
+        print(summary)
+        return truncate_to_tokens(full_ai_response, token_budget, model), False
+    return summary, True
+
+
+def _is_ambiguous(symbol):
+    return len(symbol) <= AMBIGUOUS_SYMBOL_LENGTH or symbol in COMMON_WORD_SYMBOLS
+
+
+def find_symbols(text, symbols):
+    """
+    텍스트에 나온 종목 티커 중 symbols에 있는 것 (나온 순서, 중복 제거)
+    짧거나 영어 단어와 같은 티커는 앞에 $가 있거나 바로 뒤에 한글(조사)이 붙은 경우만 인식
+    """
+    found = []
+    for match in SYMBOL_PATTERN.finditer(text):
+        marker, symbol = match.groups()
+        if symbol not in symbols or symbol in found:
+            continue
+        if _is_ambiguous(symbol) and not marker and not HANGUL_PATTERN.match(text, match.end()):
+            continue
+        found.append(symbol)
+    return found
+
+
+def relevant_symbols(question, chat_history, symbols):
+    """
+    질문과 관련된 종목
+    질문에 티커가 없으면("그 종목은?" 같은 후속 질문) 최근 질문에 나온 종목을 사용
+    """
+    found = find_symbols(question, symbols)
+    if found:
+        return found
+    for message in reversed(chat_history[-SYMBOL_LOOKBACK_MESSAGES:]):
+        if message["role"] == "user":
+            found = find_symbols(message["content"], symbols)
+            if found:
+                return found
+    return []
+
+
+def recent_history(chat_history, token_budget=HISTORY_TOKEN_BUDGET,
+                   max_messages=MAX_HISTORY_MESSAGES, model="gpt-4o"):
+    """
+    최근 대화부터 거꾸로 token_budget 안에 들어가는 메시지만 남김 (최대 max_messages개)
+    답변만 남고 질문이 잘리지 않도록 맨 앞이 assistant 메시지면 제외
+    """
+    window, used = [], 0
+    for message in reversed(chat_history[-max_messages:]):
+        tokens = stock_llm.count_tokens(message["content"], model)
+        if used + tokens > token_budget:
+            break
+        window.append(message)
+        used += tokens
+    window.reverse()
+    while window and window[0]["role"] == "assistant":
+        window.pop(0)
+    return window
+
+
+def symbol_sections(symbols, combined_stocks_data, token_budget=SECTION_TOKEN_BUDGET, model="gpt-4o"):
+    """관련 종목의 분석 데이터 섹션을 token_budget 안에서 순서대로 이어붙임"""
+    sections, used = [], 0
+    for symbol in symbols:
+        section = stock_prompt.symbol_prompt_section(symbol, combined_stocks_data[symbol])
+        tokens = stock_llm.count_tokens(section, model)
+        if sections and used + tokens > token_budget:
+            break
+        sections.append(section)
+        used += tokens
+    return "".join(sections)
+
+
+def retrieved_passages(index, question, symbols, token_budget=SECTION_TOKEN_BUDGET,
+                       top_k=RETRIEVAL_TOP_K, model="gpt-4o"):
+    """
+    검색 인덱스에서 질문 관련 문단을 token_budget 안에서 가져옴
+    관련 종목의 분석 데이터(실제 수치)는 검색 점수와 상관없이 먼저 넣고
+    후속 질문은 관련 종목 티커를 검색어에 더하고, 관련 종목 문단을 점수 순서를 유지한 채 앞에 배치
+    :param index: stock_retrieval.BM25Index
+    :param symbols: relevant_symbols 결과
+    """
+    pinned = [passage for passage in index.passages if passage.source == "data" and set(passage.symbols) & set(symbols)]
+    results = [passage for passage, _ in index.search(" ".join([question, *symbols]), top_k) if passage not in pinned]
+    results.sort(key=lambda passage: not set(passage.symbols) & set(symbols))
+    passages, used = [], 0
+    for passage in pinned + results:
+        tokens = stock_llm.count_tokens(passage.text, model)
+        if used + tokens > token_budget:
+            continue
+        passages.append(passage.text.strip())
+        used += tokens
+    return "\n\n".join(passages)
+
+
+def build_chat_messages(question, chat_history, analysis_summary, combined_stocks_data, model="gpt-4o",
+                        index=None):
+    """
+    추가 질문 한 번에 보낼 메시지 생성
+    [시스템: 지시문 + 분석 요약 + 관련 종목 데이터] + 최근 대화 + 질문
+    :param question: 사용자 질문
+    :param chat_history: 이번 질문 이전까지의 대화 [{"role", "content"}]
+    :param analysis_summary: summarize_analysis의 요약 텍스트
+    :param combined_stocks_data: 종목 데이터 (관련 종목 섹션 생성용)
+    :param index: stock_retrieval.BM25Index, 있으면 관련 종목 섹션 대신 검색한 분석 문단/종목 데이터를 사용
+    :return: OpenAI 메시지 리스트
+    """
+    context = CONTEXT_TEMPLATE.format(system_text=CHAT_SYSTEM_TEXT, summary=analysis_summary)
+    symbols = relevant_symbols(question, chat_history, combined_stocks_data)
+    if index is not None:
+        passages = retrieved_passages(index, question, symbols, model=model)
+        if passages:
+            context += RETRIEVED_CONTEXT_TEMPLATE.format(passages=passages)
+    elif symbols:
+        context += SECTION_CONTEXT_TEMPLATE.format(
+            sections=symbol_sections(symbols, combined_stocks_data, model=model)
+        )
+    return (
+        [{"role": "system", "content": context}]
+        + [{"role": m["role"], "content": m["content"]} for m in recent_history(chat_history, model=model)]
+        + [{"role": "user", "content": question}]
+    )
@@ -0,0 +1,137 @@
+import os
+import pandas as pd
+import yfinance as yf
+
+# 로컬 데이터 디렉토리가 지정되면 yfinance 대신 로컬 CSV를 사용 (오프라인 테스트용)
+LOCAL_DATA_DIR_ENV = "STOCK_LOCAL_DATA_DIR"
+
+
+class LocalOhlcvSource:
+    """
+    yf.download와 같은 형태로 동작하는 로컬 OHLCV 데이터 공급처
+    {data_dir}/{symbol}.csv 파일(Date 인덱스, Open/High/Low/Close/Volume 컬럼)을 읽어서
+    group_by="ticker" 다운로드와 동일한 (종목, 컬럼) 멀티 인덱스 데이터프레임을 반환
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+
+    def __call__(self, tickers, period="6mo", interval="1d", group_by="ticker", **kwargs):
+        if isinstance(tickers, str):
+            tickers = tickers.split()
+
+        frames = {}
+        for symbol in tickers:
+            path = os.path.join(self.data_dir, f"{symbol}.csv")
+            if not os.path.exists(path):
+                continue
+            frame = pd.read_csv(path, index_col=0, parse_dates=True).sort_index()
+            frames[symbol] = _slice_period(frame, period)
+
+        if not frames:
+            return pd.DataFrame()
+        # yfinance와 동일하게 전체 종목의 날짜 합집합을 인덱스로 사용
+        return pd.concat(frames, axis=1)
+
+
+def _slice_period(frame, period):
+    """
+    "5d", "6mo", "1y", "max" 형태의 기간 문자열만큼 최근 데이터를 잘라서 반환
+    """
+    if frame.empty or not period or period == "max":
+        return frame
+    units = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    for unit, offset_key in units.items():
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            start = frame.index[-1] - pd.DateOffset(**{offset_key: int(period[:-len(unit)])})
+            return frame[frame.index > start]
+    return frame
+
+
+def get_downloader():
+    """
+    환경 변수에 로컬 데이터 디렉토리가 있으면 로컬 공급처를, 없으면 yf.download를 반환
+    """
+    data_dir = os.environ.get(LOCAL_DATA_DIR_ENV)
+    if data_dir:
+        return LocalOhlcvSource(data_dir)
+    return yf.download
+
+
+def split_grouped_frame(data, symbols):
+    """
+    group_by="ticker"로 받은 멀티 인덱스 데이터프레임을 종목별로 분리
+    종목별 컬럼은 연속된 구간이므로 슬라이스로 잘라내 복사 없이 원본 블록을 공유
+    :param data: (종목, 컬럼) 멀티 인덱스 데이터프레임
+    :param symbols: 종목 심볼 리스트
+    :return: {종목: OHLCV 데이터프레임 또는 None}
+    """
+    frames = {}
+
+    # 단일 종목 다운로드는 yfinance 버전에 따라 멀티 인덱스가 아닐 수 있음
+    if not isinstance(data.columns, pd.MultiIndex):
+        for symbol in symbols:
+            frames[symbol] = data.dropna() if len(symbols) == 1 and not data.empty else None
+        return frames
+
+    tickers = set(data.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol not in tickers:
+            frames[symbol] = None
+            continue
+        frame = data.iloc[:, data.columns.get_loc(symbol)]
+        frame.columns = frame.columns.droplevel(0)
+        # 날짜 합집합 중 해당 종목의 거래가 없는 행 제거
+        frame = frame.dropna()
+        frames[symbol] = frame if not frame.empty else None
+    return frames
+
+
+def download_ohlcv(symbols, period="6mo", interval="1d", downloader=None, cache=None):
+    """
+    여러 종목의 OHLCV 데이터를 한 번의 요청으로 가져와 종목별로 분리
+    :param symbols: 종목 심볼 리스트
+    :param period: 조회 기간
+    :param interval: 조회 간격
+    :param downloader: yf.download와 같은 시그니처의 다운로드 함수, 없으면 get_downloader() 사용
+    :param cache: stock_cache.DiskCache, 있으면 캐시에 없는 종목만 다운로드
+    :return: {종목: OHLCV 데이터프레임 또는 None}
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+
+    frames = {}
+    if cache is not None:
+        for symbol in symbols:
+            frame = cache.get("ohlcv", _ohlcv_cache_key(symbol, period, interval))
+            if frame is not None:
+                frames[symbol] = frame
+    missing = [symbol for symbol in symbols if symbol not in frames]
+    if not missing:
+        return frames
+
+    if downloader is None:
+        downloader = get_downloader()
+    data = downloader(
+        missing,
+        period=period,
+        interval=interval,
+        group_by="ticker",
+        threads=True,
+        progress=False,
+    )
+    if data is None or data.empty:
+        downloaded = {symbol: None for symbol in missing}
+    else:
+        downloaded = split_grouped_frame(data, missing)
+
+    for symbol, frame in downloaded.items():
+        if cache is not None and frame is not None:
+            cache.set("ohlcv", _ohlcv_cache_key(symbol, period, interval), frame)
+        frames[symbol] = frame
+    return {symbol: frames.get(symbol) for symbol in symbols}
+
+
+def _ohlcv_cache_key(symbol, period, interval):
+    return f"{symbol}:{period}:{interval}"
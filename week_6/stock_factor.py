@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Fama-French 3 팩터 일별 데이터 파일 경로 (환경 변수로 지정)
+# Kenneth French 데이터 라이브러리의 F-F_Research_Data_Factors_daily.CSV 형식
+# (YYYYMMDD, Mkt-RF, SMB, HML, RF 퍼센트 단위) 또는 Date 컬럼이 있는 같은 컬럼의 CSV
+FACTOR_FILE_ENV = "STOCK_FACTOR_FILE"
+FACTOR_COLUMNS = ["Mkt-RF", "SMB", "HML", "RF"]
+EXPOSURE_COLUMNS = ["FF_Alpha", "FF_Alpha_Annual", "FF_Beta_Market", "FF_Beta_SMB", "FF_Beta_HML",
+                    "FF_R_Squared", "FF_Observations"]
+
+# 회귀에 필요한 최소 거래일 수
+MIN_OBSERVATIONS = 60
+TRADING_DAYS_PER_YEAR = 252
+
+
+def load_factor_file(path=None):
+    """
+    Fama-French 3 팩터 일별 데이터를 로컬 파일에서 읽음
+    :param path: 파일 경로, 없으면 STOCK_FACTOR_FILE 환경 변수 사용
+    :return: 날짜 인덱스, FACTOR_COLUMNS 컬럼(소수 단위)의 데이터프레임, 파일이 없으면 None
+    """
+    path = path or os.environ.get(FACTOR_FILE_ENV)
+    if not path or not os.path.exists(path):
+        return None
+
+    # French 원본 파일은 앞뒤에 설명 문구가 있고 데이터 행만 8자리 날짜로 시작
+    rows = []
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            fields = [field.strip() for field in line.split(",")]
+            if len(fields) >= 5 and len(fields[0]) == 8 and fields[0].isdigit():
+                rows.append(fields[:5])
+
+    if rows:
+        factors = pd.DataFrame(rows, columns=["Date"] + FACTOR_COLUMNS)
+        factors.index = pd.to_datetime(factors.pop("Date"), format="%Y%m%d")
+        factors = factors.astype(np.float64) / 100
+    else:
+        factors = pd.read_csv(path, index_col="Date", parse_dates=True)[FACTOR_COLUMNS].astype(np.float64)
+        # 퍼센트 단위로 저장된 파일이면 소수 단위로 변환
+        if factors.abs().stack().median() > 0.05:
+            factors = factors / 100
+    factors.index.name = "Date"
+    return factors.sort_index()
+
+
+def returns_panel(technical_frames):
+    """
+    종목별 기술적 분석 데이터프레임의 종가로 (날짜 x 종목) 일별 수익률 패널 생성
+    :param technical_frames: {종목: Close 컬럼이 있는 데이터프레임}
+    """
+    closes = {
+        symbol: frame["Close"].dropna()
+        for symbol, frame in technical_frames.items()
+        if frame is not None and not frame.empty
+    }
+    if not closes:
+        return pd.DataFrame()
+    returns = pd.concat({symbol: close.pct_change() for symbol, close in closes.items()}, axis=1)
+    # 팩터 파일과 맞추기 위해 시간대/시각 정보 제거
+    if returns.index.tz is not None:
+        returns.index = returns.index.tz_localize(None)
+    returns.index = returns.index.normalize()
+    return returns
+
+
+def compute_factor_exposures(returns, factors, min_observations=MIN_OBSERVATIONS):
+    """
+    종목 전체의 초과 수익률을 Fama-French 3 팩터에 한 번에 회귀
+    r - RF = alpha + b_mkt * (Mkt-RF) + b_smb * SMB + b_hml * HML
+    종목마다 결측 거래일이 달라도 종목별 정규방정식을 배열로 쌓아서 일괄 계산
+    :param returns: (날짜 x 종목) 일별 수익률
+    :param factors: load_factor_file 결과
+    :param min_observations: 이보다 관측치가 적은 종목은 NaN
+    :return: 종목별 EXPOSURE_COLUMNS 데이터프레임
+    """
+    dates = returns.index.intersection(factors.index)
+    result = pd.DataFrame(np.nan, index=returns.columns, columns=EXPOSURE_COLUMNS)
+    if len(dates) == 0 or returns.shape[1] == 0:
+        return result
+
+    factor_values = factors.loc[dates, FACTOR_COLUMNS].to_numpy(dtype=np.float64)
+    x = np.column_stack([np.ones(len(dates)), factor_values[:, :3]])  # (날짜 x 4) 상수항 + 3 팩터
+    y = returns.loc[dates].to_numpy(dtype=np.float64) - factor_values[:, [3]]  # (날짜 x 종목) 초과 수익률
+    mask = ~np.isnan(y)
+    y = np.where(mask, y, 0.0)
+    weights = mask.astype(np.float64)
+
+    # 종목별 X'X, X'y (결측일은 가중치 0)
+    xtx = np.einsum("ts,tj,tk->sjk", weights, x, x)
+    xty = x.T @ y  # (4 x 종목)
+    coefficients = np.einsum("sjk,ks->sj", np.linalg.pinv(xtx), xty)  # (종목 x 4)
+
+    # 설명력 (R^2)
+    observations = weights.sum(axis=0)
+    residuals = (y - x @ coefficients.T) * weights
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = y.sum(axis=0) / observations
+        total = (((y - mean) * weights) ** 2).sum(axis=0)
+        r_squared = 1 - (residuals ** 2).sum(axis=0) / total
+
+    result["FF_Alpha"] = coefficients[:, 0]
+    result["FF_Alpha_Annual"] = coefficients[:, 0] * TRADING_DAYS_PER_YEAR
+    result["FF_Beta_Market"] = coefficients[:, 1]
+    result["FF_Beta_SMB"] = coefficients[:, 2]
+    result["FF_Beta_HML"] = coefficients[:, 3]
+    result["FF_R_Squared"] = r_squared
+    result["FF_Observations"] = observations
+    result.loc[observations < min_observations, EXPOSURE_COLUMNS[:-1]] = np.nan
+    return result
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from stock_fundamental import STATEMENT_KEYS
+
+# 종목별로 보관하는 최대 결산 기간 수 (yfinance 연간 재무제표는 보통 4~5개)
+MAX_PERIODS = 5
+
+# Piotroski F-Score 9개 항목
+F_SCORE_COMPONENTS = [
+    "ROA_Positive",           # 1. ROA > 0
+    "CFO_Positive",           # 2. 영업현금흐름 > 0
+    "ROA_Improved",           # 3. ROA 증가
+    "Accrual",                # 4. 영업현금흐름 > 순이익 (이익의 질)
+    "Leverage_Decreased",     # 5. 장기부채/총자산 감소 (부채가 없으면 통과)
+    "Current_Ratio_Improved", # 6. 유동비율 증가
+    "No_New_Shares",          # 7. 발행 주식 수 증가 없음
+    "Gross_Margin_Improved",  # 8. 매출총이익률 증가
+    "Asset_Turnover_Improved",# 9. 자산회전율 증가
+]
+
+
+class FinancialsStore:
+    """
+    여러 종목의 다기간 재무제표를 항목별 2차원 배열로 보관하는 컬럼 저장소
+    values[항목 번호]는 (종목 x 결산 기간) float64 배열이고 기간 0이 가장 최근 결산
+    종목마다 결산일이 달라도 같은 열은 "최근에서 몇 번째 결산"을 의미
+    """
+
+    def __init__(self, symbols, items, dates, values):
+        self.symbols = list(symbols)
+        self.items = list(items)
+        self.dates = dates  # (종목 x 기간) datetime64[ns], 없는 기간은 NaT
+        self.values = values  # (항목 x 종목 x 기간) float64, 없는 값은 NaN
+        self._item_index = {item: i for i, item in enumerate(self.items)}
+
+    @classmethod
+    def from_snapshots(cls, snapshots, periods=MAX_PERIODS):
+        """
+        FundamentalSnapshot들의 재무제표 행을 결산일 기준으로 맞춰서 저장소 생성
+        :param snapshots: {종목: FundamentalSnapshot}
+        :param periods: 종목별로 보관할 최근 결산 기간 수
+        """
+        symbols = sorted(snapshots)
+        items = STATEMENT_KEYS
+        dates = np.full((len(symbols), periods), np.datetime64("NaT"), dtype="datetime64[ns]")
+        values = np.full((len(items), len(symbols), periods), np.nan)
+
+        for i, symbol in enumerate(symbols):
+            rows = [snapshots[symbol].statements.get(item) for item in items]
+            row_dates = [row.dates.astype("datetime64[ns]") for row in rows if row is not None]
+            if not row_dates:
+                continue
+            # 종목의 모든 재무제표에 나오는 결산일을 최신순으로 정렬해서 기간 번호로 사용
+            symbol_dates = np.unique(np.concatenate(row_dates))[::-1][:periods]
+            dates[i, :len(symbol_dates)] = symbol_dates
+            period_of = {date: period for period, date in enumerate(symbol_dates.view("i8").tolist())}
+            for j, row in enumerate(rows):
+                if row is None:
+                    continue
+                for date, value in zip(row.dates.astype("datetime64[ns]").view("i8").tolist(), row.values.tolist()):
+                    period = period_of.get(date)
+                    if period is not None:
+                        values[j, i, period] = value
+        return cls(symbols, items, dates, values)
+
+    def column(self, item):
+        """항목 하나의 (종목 x 기간) 배열"""
+        return self.values[self._item_index[item]]
+
+    def frame(self, item):
+        """항목 하나를 종목(행) x 기간(열) 데이터프레임으로 반환"""
+        return pd.DataFrame(self.column(item), index=pd.Index(self.symbols, name="symbol"))
+
+
+def _ratio(numerator, denominator):
+    # 분모가 0이거나 없으면 NaN
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator != 0, numerator / denominator, np.nan)
+
+
+def f_score_components(store):
+    """
+    Piotroski F-Score 9개 항목의 통과 여부를 종목 전체에 대해 배열 연산으로 계산
+    최근 결산(기간 0)과 직전 결산(기간 1)을 비교하고, 값이 없는 항목은 통과하지 않은 것으로 처리
+    ROA/자산회전율은 기초 자산 대신 해당 결산의 총자산을 사용
+    :param store: FinancialsStore
+    :return: (통과 여부, 계산 가능 여부) 각각 (종목 x 항목) bool 배열
+    """
+    net_income = store.column("net_income")
+    total_assets = store.column("total_assets")
+    cfo = store.column("operating_cash_flow")
+    revenue = store.column("revenue")
+    gross_profit = store.column("gross_profit")
+    shares = store.column("shares_outstanding")
+    # 장기부채 행이 없는 종목은 부채가 없는 것으로 간주
+    long_term_debt = np.nan_to_num(store.column("long_term_debt"))
+
+    roa = _ratio(net_income, total_assets)
+    leverage = _ratio(long_term_debt, total_assets)
+    current_ratio = _ratio(store.column("current_assets"), store.column("current_liabilities"))
+    gross_margin = _ratio(gross_profit, revenue)
+    asset_turnover = _ratio(revenue, total_assets)
+
+    # (종목 x 항목) 통과 여부, NaN 비교는 False가 되므로 결측은 자동으로 0점
+    components = np.column_stack([
+        roa[:, 0] > 0,
+        cfo[:, 0] > 0,
+        roa[:, 0] > roa[:, 1],
+        cfo[:, 0] > net_income[:, 0],
+        (leverage[:, 0] < leverage[:, 1]) | ((leverage[:, 0] == 0) & (leverage[:, 1] == 0)),
+        current_ratio[:, 0] > current_ratio[:, 1],
+        shares[:, 0] <= shares[:, 1],
+        gross_margin[:, 0] > gross_margin[:, 1],
+        asset_turnover[:, 0] > asset_turnover[:, 1],
+    ])
+    available = np.column_stack([
+        ~np.isnan(roa[:, 0]),
+        ~np.isnan(cfo[:, 0]),
+        ~np.isnan(roa[:, :2]).any(axis=1),
+        ~np.isnan(cfo[:, 0]) & ~np.isnan(net_income[:, 0]),
+        ~np.isnan(leverage[:, :2]).any(axis=1),
+        ~np.isnan(current_ratio[:, :2]).any(axis=1),
+        ~np.isnan(shares[:, :2]).any(axis=1),
+        ~np.isnan(gross_margin[:, :2]).any(axis=1),
+        ~np.isnan(asset_turnover[:, :2]).any(axis=1),
+    ])
+
+    return components, available
+
+
+def compute_f_scores(store):
+    """
+    Piotroski F-Score를 종목 전체에 대해 계산
+    :param store: FinancialsStore
+    :return: 종목별 F_Score(0~9), 계산 가능한 항목 수, 항목별 통과 여부 데이터프레임
+    """
+    components, available = f_score_components(store)
+    result = pd.DataFrame(components.astype(np.int8), index=pd.Index(store.symbols, name="symbol"),
+                          columns=F_SCORE_COMPONENTS)
+    result.insert(0, "F_Score_Items", available.sum(axis=1))
+    result.insert(0, "F_Score", components.sum(axis=1))
+    return result
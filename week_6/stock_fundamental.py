@@ -0,0 +1,247 @@
+from collections import namedtuple
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# fundamental_dict 섹션별 항목 -> yfinance 재무제표 행 이름
+INCOME_STMT_ROWS = {
+    "revenue": "Total Revenue",
+    "operating_income": "Operating Income",
+    "net_income": "Net Income",
+}
+BALANCE_SHEET_ROWS = {
+    "total_assets": "Total Assets",
+    "total_liabilities": "Total Liabilities Net Minority Interest",
+    "shareholders_equity": "Total Equity Gross Minority Interest",
+}
+CASH_FLOW_ROWS = {
+    "operating_cash_flow": "Operating Cash Flow",
+    "investing_cash_flow": "Investing Cash Flow",
+    "financing_cash_flow": "Financing Cash Flow",
+}
+
+# fundamental_dict 섹션별 항목 -> ticker.info 키
+KEY_METRICS_INFO = {
+    "EPS": "trailingEps",
+    "DPS": "dividendRate",
+    "ROE": "returnOnEquity",
+    "ROA": "returnOnAssets",
+    "EBITDA": "ebitda",
+    "FCF": "freeCashflow",
+}
+STOCK_METRICS_INFO = {
+    "market_cap": "marketCap",
+    "PER": "trailingPE",
+    "PBR": "priceToBook",
+    "PSR": "priceToSalesTrailing12Months",
+    "EV": "enterpriseValue",
+    "EV/EBITDA": "enterpriseToEbitda",
+}
+GROWTH_AND_DIVIDEND_INFO = {
+    "revenue_growth": "revenueGrowth",
+    "EPS_growth": "earningsGrowth",
+    "dividend_yield": "dividendYield",
+    "payout_ratio": "payoutRatio",
+}
+
+STATEMENT_SECTIONS = {
+    "income_stmt": INCOME_STMT_ROWS,
+    "balance_sheet": BALANCE_SHEET_ROWS,
+    "cash_flow": CASH_FLOW_ROWS,
+}
+INFO_SECTIONS = {
+    "key_metrics": KEY_METRICS_INFO,
+    "stock_metrics": STOCK_METRICS_INFO,
+    "growth_and_dividend": GROWTH_AND_DIVIDEND_INFO,
+}
+SECTIONS = list(STATEMENT_SECTIONS) + list(INFO_SECTIONS)
+
+# 섹션에는 없지만 다기간 분석(Piotroski F-Score 등)에 사용하는 재무제표 행
+INCOME_STMT_EXTRA_ROWS = {
+    "gross_profit": "Gross Profit",
+}
+BALANCE_SHEET_EXTRA_ROWS = {
+    "current_assets": "Current Assets",
+    "current_liabilities": "Current Liabilities",
+    "long_term_debt": "Long Term Debt",
+    "shares_outstanding": "Ordinary Shares Number",
+}
+
+# yfinance Ticker 속성 -> 파싱해서 보관하는 재무제표 행 전체
+STATEMENT_ROWS = {
+    "financials": {**INCOME_STMT_ROWS, **INCOME_STMT_EXTRA_ROWS},
+    "balance_sheet": {**BALANCE_SHEET_ROWS, **BALANCE_SHEET_EXTRA_ROWS},
+    "cashflow": CASH_FLOW_ROWS,
+}
+STATEMENT_KEYS = [key for rows in STATEMENT_ROWS.values() for key in rows]
+INFO_KEYS = [key for section in INFO_SECTIONS.values() for key in section.values()]
+
+# 재무제표 한 행: 결산일(datetime64) 배열과 값(float64) 배열
+StatementSeries = namedtuple("StatementSeries", ["name", "dates", "values"])
+
+
+def latest_statement_value(statement):
+    """
+    재무제표 행(StatementSeries 또는 결산일 인덱스의 pd.Series)에서 가장 최근 결산일의 값
+    결측 결산은 건너뛰고, 값이 없으면 NaN
+    """
+    if isinstance(statement, pd.Series):
+        statement = StatementSeries(
+            statement.name,
+            pd.to_datetime(statement.index).to_numpy(dtype="datetime64[ns]"),
+            pd.to_numeric(statement, errors="coerce").to_numpy(dtype=np.float64),
+        )
+    if statement is None or len(statement.values) == 0:
+        return np.nan
+    valid = ~np.isnan(statement.values)
+    if not valid.any():
+        return np.nan
+    dates = statement.dates[valid]
+    return float(statement.values[valid][np.argmax(dates)])
+
+
+def parse_statement(frame, rows):
+    """
+    yfinance 재무제표(행: 항목, 열: 결산일)에서 필요한 행만 numpy 배열로 추출
+    :param frame: ticker.financials / balance_sheet / cashflow 데이터프레임
+    :param rows: {항목 이름: 재무제표 행 이름}
+    :return: {항목 이름: StatementSeries 또는 None}
+    """
+    if frame is None or frame.empty:
+        return {key: None for key in rows}
+    dates = pd.to_datetime(frame.columns).to_numpy(dtype="datetime64[ns]")
+    parsed = {}
+    for key, row in rows.items():
+        if row in frame.index:
+            values = pd.to_numeric(frame.loc[row], errors="coerce").to_numpy(dtype=np.float64)
+            parsed[key] = StatementSeries(row, dates, values)
+        else:
+            parsed[key] = None
+    return parsed
+
+
+def parse_info(info):
+    """
+    ticker.info 전체(수백 개 키) 중 사용하는 숫자 값만 추출
+    :return: {info 키: 숫자 또는 None}
+    """
+    info = info or {}
+    parsed = {}
+    for section in INFO_SECTIONS.values():
+        for info_key in section.values():
+            value = info.get(info_key)
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            parsed[info_key] = value if is_number else None
+    return parsed
+
+
+@dataclass(frozen=True)
+class FundamentalSnapshot(Mapping):
+    """
+    종목 하나의 기본적 분석 데이터 스냅샷
+    재무제표와 info를 종목당 한 번만 조회/파싱해서 필요한 값만 보관하고
+    기존 fundamental_dict와 같은 6개 섹션(income_stmt, balance_sheet, cash_flow,
+    key_metrics, stock_metrics, growth_and_dividend)을 딕셔너리처럼 제공
+    """
+
+    symbol: str
+    statements: dict = field(default_factory=dict)
+    info: dict = field(default_factory=dict)
+
+    def __getitem__(self, section):
+        if section in STATEMENT_SECTIONS:
+            return {
+                key: self._statement_series(key)
+                for key in STATEMENT_SECTIONS[section]
+            }
+        if section in INFO_SECTIONS:
+            return {
+                key: self.info.get(info_key)
+                for key, info_key in INFO_SECTIONS[section].items()
+            }
+        raise KeyError(section)
+
+    def __iter__(self):
+        return iter(SECTIONS)
+
+    def __len__(self):
+        return len(SECTIONS)
+
+    def raw(self, section):
+        """
+        섹션을 pandas 객체로 바꾸지 않고 반환 (재무제표 항목은 StatementSeries)
+        프롬프트 생성처럼 값만 읽는 경우 Series 생성 비용을 줄이기 위해 사용
+        """
+        if section in STATEMENT_SECTIONS:
+            return {key: self.statements.get(key) for key in STATEMENT_SECTIONS[section]}
+        return self[section]
+
+    def _statement_series(self, key):
+        statement = self.statements.get(key)
+        if statement is None:
+            return None
+        return pd.Series(statement.values, index=pd.DatetimeIndex(statement.dates), name=statement.name)
+
+    def to_dict(self):
+        """기존 fundamental_dict와 동일한 딕셔너리로 변환"""
+        return {section: self[section] for section in SECTIONS}
+
+
+def _fetch_statements(ticker):
+    statements = {}
+    for attribute, rows in STATEMENT_ROWS.items():
+        statements.update(parse_statement(getattr(ticker, attribute), rows))
+    return statements
+
+
+def _is_parsed(value, keys):
+    # 예전 형식으로 캐시된 값이나 값이 하나도 없는 값(조회 실패)은 무시하고 다시 조회
+    return isinstance(value, dict) and set(value) == set(keys) and _has_values(value)
+
+
+def _has_values(parsed):
+    # yfinance가 요청 제한에 걸리면 빈 데이터프레임/{}를 반환해서 모든 값이 None으로 파싱됨
+    # 이런 결과를 캐시하면 TTL 동안 재무 데이터가 없는 종목으로 취급되므로 저장하지 않음
+    return any(value is not None for value in parsed.values())
+
+
+def load_cached_snapshots(symbols, cache):
+    """
+    캐시에 재무제표와 info가 모두 있는 종목의 스냅샷을 네트워크 요청 없이 한 번에 생성
+    :param symbols: 종목 심볼 리스트
+    :param cache: stock_cache.DiskCache
+    :return: {종목: FundamentalSnapshot} (캐시에 없는 종목은 제외)
+    """
+    statements = cache.get_many("statements", symbols)
+    infos = cache.get_many("info", symbols)
+    return {
+        symbol: FundamentalSnapshot(symbol=symbol, statements=statements[symbol], info=infos[symbol])
+        for symbol in symbols
+        if _is_parsed(statements.get(symbol), STATEMENT_KEYS) and _is_parsed(infos.get(symbol), INFO_KEYS)
+    }
+
+
+def fetch_fundamental_snapshot(symbol, cache=None):
+    """
+    종목의 재무제표와 info를 한 번씩만 조회해서 스냅샷 생성
+    :param symbol: 주식 심볼
+    :param cache: stock_cache.DiskCache, 있으면 파싱된 값을 캐시 (값이 하나도 없으면 저장하지 않음)
+    :return: FundamentalSnapshot
+    """
+    ticker = yf.Ticker(symbol)
+
+    statements = cache.get("statements", symbol) if cache is not None else None
+    if not _is_parsed(statements, STATEMENT_KEYS):
+        statements = _fetch_statements(ticker)
+        if cache is not None and _has_values(statements):
+            cache.set("statements", symbol, statements)
+
+    info = cache.get("info", symbol) if cache is not None else None
+    if not _is_parsed(info, INFO_KEYS):
+        info = parse_info(ticker.info)
+        if cache is not None and _has_values(info):
+            cache.set("info", symbol, info)
+
+    return FundamentalSnapshot(symbol=symbol, statements=statements, info=info)
@@ -0,0 +1,660 @@
+import sys
+import copy
+from collections import deque
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 기존 pandas_ta 기반 지표 계산과 동일한 컬럼 구성
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+INDICATOR_COLUMNS = [
+    "SMA_20", "SMA_50",
+    "MACD", "MACD_signal", "MACD_hist",
+    "ADX", "RSI_14",
+    "Stoch_%K", "Stoch_%D",
+    "CCI",
+    "BB_upper", "BB_middle", "BB_lower",
+    "ATR", "OBV", "Volume_MA_20",
+    "Ichimoku_base", "Ichimoku_conversion", "Ichimoku_lead1", "Ichimoku_lead2",
+    "Momentum", "Williams_%R",
+]
+
+
+# 롤링/EWM 커널
+# 모든 커널은 (날짜 x 종목) 2차원 배열을 받아서 종목 전체를 한 번에 계산
+# rolling_mean, shift, ema, rma는 시그널 백테스트(stock_backtest)에서도 사용하는 공개 함수
+# ====================================================
+
+def _pad_front(values, window):
+    """롤링 결과 앞쪽에 window - 1 개의 NaN 행을 채워서 원래 길이로 맞춤"""
+    pad = np.full((window - 1,) + values.shape[1:], np.nan)
+    return np.concatenate([pad, values], axis=0)
+
+
+def _rolling_windows(x, window):
+    if len(x) < window:
+        return None
+    return sliding_window_view(x, window, axis=0)
+
+
+def rolling_mean(x, window):
+    windows = _rolling_windows(x, window)
+    if windows is None:
+        return np.full(x.shape, np.nan)
+    return _pad_front(windows.mean(axis=-1), window)
+
+
+def _rolling_std(x, window):
+    # pandas_ta bbands 기본값과 동일하게 ddof=0
+    windows = _rolling_windows(x, window)
+    if windows is None:
+        return np.full(x.shape, np.nan)
+    return _pad_front(windows.std(axis=-1), window)
+
+
+def _rolling_mad(x, window):
+    windows = _rolling_windows(x, window)
+    if windows is None:
+        return np.full(x.shape, np.nan)
+    mean = windows.mean(axis=-1, keepdims=True)
+    return _pad_front(np.abs(windows - mean).mean(axis=-1), window)
+
+
+def _rolling_min(x, window):
+    windows = _rolling_windows(x, window)
+    if windows is None:
+        return np.full(x.shape, np.nan)
+    return _pad_front(windows.min(axis=-1), window)
+
+
+def _rolling_max(x, window):
+    windows = _rolling_windows(x, window)
+    if windows is None:
+        return np.full(x.shape, np.nan)
+    return _pad_front(windows.max(axis=-1), window)
+
+
+def shift(x, periods):
+    """periods 행만큼 뒤로 민 배열 (앞쪽은 NaN)"""
+    shifted = np.full(x.shape, np.nan)
+    if periods < len(x):
+        shifted[periods:] = x[:len(x) - periods]
+    return shifted
+
+
+def _ewm_mean(x, alpha, adjust, min_periods=0):
+    """
+    pandas ewm(...).mean() (ignore_na=False) 과 같은 점화식을 종목 축으로 벡터화
+    pandas와 동일하게 com을 거쳐서 alpha를 다시 계산해 부동소수점 결과를 맞춤
+    """
+    com = 1.0 / alpha - 1.0
+    alpha = 1.0 / (1.0 + com)
+    old_wt_factor = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+    min_periods = max(min_periods, 1)
+
+    out = np.full(x.shape, np.nan)
+    weighted = x[0].copy()
+    nobs = (~np.isnan(weighted)).astype(int)
+    old_wt = np.ones(x.shape[1:])
+    out[0] = np.where(nobs >= min_periods, weighted, np.nan)
+
+    for i in range(1, len(x)):
+        cur = x[i]
+        is_observation = ~np.isnan(cur)
+        nobs += is_observation
+        has_weighted = ~np.isnan(weighted)
+
+        old_wt = np.where(has_weighted, old_wt * old_wt_factor, old_wt)
+        update = has_weighted & is_observation
+        with np.errstate(invalid="ignore"):
+            blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(update & (weighted != cur), blended, weighted)
+        old_wt = np.where(update, old_wt + new_wt if adjust else 1.0, old_wt)
+        # 첫 관측값은 그대로 시작값으로 사용
+        weighted = np.where(~has_weighted & is_observation, cur, weighted)
+
+        out[i] = np.where(nobs >= min_periods, weighted, np.nan)
+    return out
+
+
+def _first_valid_row(x):
+    """종목별 첫 유효값 위치, 유효값이 없으면 len(x)"""
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+
+
+def ema(x, length):
+    """
+    pandas_ta ema (presma=True, adjust=False)
+    첫 유효값부터 length 개의 단순평균을 시작값으로 사용
+    """
+    rows = np.arange(len(x))[:, None]
+    seed_row = _first_valid_row(x) + length - 1
+    seeded = np.where(rows < seed_row, np.nan, x)
+
+    has_seed = seed_row < len(x)
+    if has_seed.any():
+        sma = rolling_mean(x, length)
+        cols = np.flatnonzero(has_seed)
+        seeded[seed_row[cols], cols] = sma[seed_row[cols], cols]
+    return _ewm_mean(seeded, alpha=2.0 / (length + 1), adjust=False)
+
+
+def rma(x, length):
+    """pandas_ta rma (Wilder 이동평균)"""
+    return _ewm_mean(x, alpha=1.0 / length, adjust=True, min_periods=length)
+
+
+def _non_zero_range(high, low):
+    """pandas_ta non_zero_range: 종목에 0인 구간이 하나라도 있으면 전체에 epsilon을 더함"""
+    diff = high - low
+    has_zero = (diff == 0).any(axis=0)
+    return diff + np.where(has_zero, sys.float_info.epsilon, 0.0)
+
+
+def _true_range(high, low, close):
+    prev_close = shift(close, 1)
+    ranges = np.fmax(np.abs(_non_zero_range(high, low)), np.abs(high - prev_close))
+    ranges = np.fmax(ranges, np.abs(prev_close - low))
+    # 종목별 첫 행은 이전 종가가 없으므로 NaN
+    first_row = _first_valid_row(close)
+    cols = np.flatnonzero(first_row < len(close))
+    ranges[first_row[cols], cols] = np.nan
+    return ranges
+
+
+def _zero(x):
+    return np.where(np.abs(x) < sys.float_info.epsilon, 0.0, x)
+
+
+def _midprice(high, low, length):
+    return 0.5 * (_rolling_min(low, length) + _rolling_max(high, length))
+
+
+# 패널 구성 / 분리
+# ====================================================
+
+def build_panel(ohlcv_dict):
+    """
+    종목별 OHLCV 데이터프레임을 컬럼별 (날짜 x 종목) 와이드 패널로 변환
+    :param ohlcv_dict: {종목: OHLCV 데이터프레임}
+    :return: {컬럼: (날짜 x 종목) 데이터프레임}
+    """
+    frames = {symbol: frame for symbol, frame in ohlcv_dict.items() if frame is not None}
+    if not frames:
+        return {}
+    combined = pd.concat(frames, axis=1)
+    return {
+        column: combined.xs(column, axis=1, level=1).reindex(columns=list(frames))
+        for column in OHLCV_COLUMNS
+    }
+
+
+def _pack(panel):
+    """
+    종목별로 유효한 행(OHLCV 모두 존재)만 아래쪽으로 모아서 앞쪽에만 NaN이 오도록 정렬
+    종목마다 거래일이 달라도 종목 단위 dropna 후 계산한 결과와 같아짐
+    """
+    values = {column: panel[column].to_numpy(dtype=float) for column in OHLCV_COLUMNS}
+    valid = np.logical_and.reduce([~np.isnan(v) for v in values.values()])
+    order = np.argsort(valid, axis=0, kind="stable")
+    pad = ~np.take_along_axis(valid, order, axis=0)
+
+    packed = {}
+    for column, v in values.items():
+        packed_values = np.take_along_axis(v, order, axis=0)
+        packed_values[pad] = np.nan
+        packed[column] = packed_values
+    return packed, valid
+
+
+def compute_packed_indicators(packed):
+    """
+    정렬된 OHLCV 배열로 전체 종목의 기술적 지표를 한 번에 계산
+    :param packed: {컬럼: (행 x 종목) 배열}, 종목별로 앞쪽에만 NaN
+    :return: {지표 컬럼: (행 x 종목) 배열}
+    """
+    high, low, close, volume = packed["High"], packed["Low"], packed["Close"], packed["Volume"]
+    out = {}
+
+    out["SMA_20"] = rolling_mean(close, 20)
+    out["SMA_50"] = rolling_mean(close, 50)
+
+    macd = ema(close, 12) - ema(close, 26)
+    macd_signal = ema(macd, 9)
+    out["MACD"] = macd
+    out["MACD_signal"] = macd_signal
+    out["MACD_hist"] = macd - macd_signal
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr = rma(_true_range(high, low, close), 14)
+
+        up = high - shift(high, 1)
+        dn = shift(low, 1) - low
+        pos = _zero(((up > dn) & (up > 0)) * up)
+        neg = _zero(((dn > up) & (dn > 0)) * dn)
+        k = 100 / atr
+        dmp = k * rma(pos, 14)
+        dmn = k * rma(neg, 14)
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+        out["ADX"] = rma(dx, 14)
+
+        change = close - shift(close, 1)
+        positive_avg = rma(np.where(change < 0, 0.0, change), 14)
+        negative_avg = rma(np.where(change > 0, 0.0, change), 14)
+        out["RSI_14"] = 100 * positive_avg / (positive_avg + np.abs(negative_avg))
+
+        lowest_low = _rolling_min(low, 14)
+        highest_high = _rolling_max(high, 14)
+        stoch = 100 * (close - lowest_low) / _non_zero_range(highest_high, lowest_low)
+        out["Stoch_%K"] = rolling_mean(stoch, 3)
+        out["Stoch_%D"] = rolling_mean(out["Stoch_%K"], 3)
+
+        typical_price = (high + low + close) / 3.0
+        out["CCI"] = (typical_price - rolling_mean(typical_price, 14)) / (0.015 * _rolling_mad(typical_price, 14))
+
+        bb_middle = rolling_mean(close, 20)
+        deviations = 2.0 * _rolling_std(close, 20)
+        out["BB_upper"] = bb_middle + deviations
+        out["BB_middle"] = bb_middle
+        out["BB_lower"] = bb_middle - deviations
+
+        out["ATR"] = atr
+
+        # OBV: 전일 대비 등락 부호 x 거래량 누적합, 첫 행 부호는 1
+        sign = np.sign(change)
+        first_row = _first_valid_row(close)
+        cols = np.flatnonzero(first_row < len(close))
+        sign[first_row[cols], cols] = 1.0
+        obv = np.nancumsum(sign * volume, axis=0)
+        obv[np.isnan(close)] = np.nan
+        out["OBV"] = obv
+
+        out["Volume_MA_20"] = rolling_mean(volume, 20)
+
+        out["Ichimoku_base"] = _midprice(high, low, 26)
+        out["Ichimoku_conversion"] = _midprice(high, low, 9)
+        # 기존 코드는 pandas_ta가 미래 날짜 인덱스로 돌려주는 선행 스팬을 대입하고 있어서
+        # 인덱스가 맞지 않아 항상 NaN이 들어감, 동일한 결과를 위해 그대로 유지
+        out["Ichimoku_lead1"] = np.full(close.shape, np.nan)
+        out["Ichimoku_lead2"] = np.full(close.shape, np.nan)
+
+        out["Momentum"] = close - shift(close, 10)
+        out["Williams_%R"] = 100 * ((close - lowest_low) / (highest_high - lowest_low) - 1)
+
+    return out
+
+
+def compute_panel_indicators(panel):
+    """
+    와이드 패널로 전체 종목의 기술적 지표를 계산
+    :param panel: build_panel 결과 {컬럼: (날짜 x 종목) 데이터프레임}
+    :return: {지표 컬럼: (날짜 x 종목) 데이터프레임}, 거래가 없는 날짜는 NaN
+    """
+    if not panel:
+        return {}
+    index = panel["Close"].index
+    symbols = panel["Close"].columns
+    packed, valid = _pack(panel)
+    indicators = compute_packed_indicators(packed)
+
+    # 아래쪽으로 모았던 값을 원래 날짜 위치로 되돌림
+    order = np.argsort(valid, axis=0, kind="stable")
+    wide = {}
+    for column, values in indicators.items():
+        unpacked = np.full(values.shape, np.nan)
+        np.put_along_axis(unpacked, order, values, axis=0)
+        unpacked[~valid] = np.nan
+        wide[column] = pd.DataFrame(unpacked, index=index, columns=symbols)
+    return wide
+
+
+def calculate_technical_indicators_bulk(ohlcv_dict):
+    """
+    여러 종목의 기술적 지표를 한 번에 계산해서 종목별 데이터프레임으로 반환
+    결과 컬럼은 기존 pandas_ta 기반 지표 계산과 동일
+    :param ohlcv_dict: {종목: OHLCV 데이터프레임 또는 None}
+    :return: {종목: 기술적 지표를 포함한 데이터프레임 또는 None}
+    """
+    result = {symbol: None for symbol in ohlcv_dict}
+    panel = build_panel(ohlcv_dict)
+    if not panel:
+        return result
+
+    packed, valid = _pack(panel)
+    indicators = compute_packed_indicators(packed)
+    total_rows = len(valid)
+
+    for idx, symbol in enumerate(panel["Close"].columns):
+        rows = int(valid[:, idx].sum())
+        if rows == 0:
+            continue
+        # 유효한 행은 배열의 마지막 rows 개에 원래 순서대로 모여 있음
+        frame = ohlcv_dict[symbol]
+        frame = frame[frame[OHLCV_COLUMNS].notna().all(axis=1)]
+        columns = {
+            column: values[total_rows - rows:, idx]
+            for column, values in indicators.items()
+        }
+        result[symbol] = pd.concat([frame, pd.DataFrame(columns, index=frame.index)], axis=1)
+    return result
+
+
+def compact_technical_frame(technical_df):
+    """
+    오래 보관하는 기술적 지표 데이터프레임의 지표 컬럼을 float32로 변환 (메모리 절반)
+    수익률/회귀에 쓰는 OHLCV 컬럼은 float64 그대로 유지
+    :param technical_df: 기술적 지표 데이터프레임 (없으면 None)
+    :return: 지표 컬럼이 float32인 데이터프레임
+    """
+    if technical_df is None:
+        return None
+    columns = [
+        column for column in technical_df.columns.intersection(INDICATOR_COLUMNS)
+        if technical_df[column].dtype != np.float32
+    ]
+    if not columns:
+        return technical_df
+    return technical_df.astype({column: np.float32 for column in columns})
+
+
+# 증분 계산
+# 하루 한 번 갱신 시 새로 추가된 봉만 반영하도록 종목별 지표 상태를 유지
+# 결과는 저장된 전체 봉(초기 봉 + 추가 봉)을 한 번에 계산한 값과 같음
+# ====================================================
+
+class _EwmState:
+    """_ewm_mean 점화식의 단일 종목 버전"""
+
+    def __init__(self, alpha, adjust, min_periods=0):
+        com = 1.0 / alpha - 1.0
+        alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = np.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, cur):
+        is_observation = not np.isnan(cur)
+        self.nobs += is_observation
+        if not np.isnan(self.weighted):
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if self.weighted != cur:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * cur) / (self.old_wt + self.new_wt)
+                self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        elif is_observation:
+            self.weighted = cur
+        return self.weighted if self.nobs >= self.min_periods else np.nan
+
+
+class _EmaState:
+    """pandas_ta ema (presma=True): 첫 length 개 유효값의 평균으로 시작"""
+
+    def __init__(self, length):
+        self.length = length
+        self.seed_values = []
+        self.ewm = _EwmState(alpha=2.0 / (length + 1), adjust=False)
+
+    def update(self, cur):
+        if len(self.seed_values) < self.length:
+            if np.isnan(cur) and not self.seed_values:
+                return np.nan
+            self.seed_values.append(cur)
+            if len(self.seed_values) < self.length:
+                return np.nan
+            cur = np.mean(self.seed_values)
+        return self.ewm.update(cur)
+
+
+def _rma_state(length):
+    return _EwmState(alpha=1.0 / length, adjust=True, min_periods=length)
+
+
+def _window_mean(window, length):
+    if len(window) < length:
+        return np.nan
+    return np.mean(list(window)[-length:])
+
+
+class IndicatorState:
+    """
+    종목 하나의 기술적 지표 상태
+    EMA/RMA 누적값(MACD, RSI, ATR, ADX), 롤링 윈도우(SMA, BB, Stoch, CCI, Ichimoku), OBV 누적값을 보관
+    update()는 봉 하나를 받아 윈도우 크기 이내의 연산만 수행
+    """
+
+    def __init__(self):
+        self.last_date = None
+        self.prev_close = np.nan
+        self.prev_high = np.nan
+        self.prev_low = np.nan
+        self.obv = np.nan
+        # pandas_ta non_zero_range는 범위가 0인 구간이 있으면 epsilon을 더함
+        # 증분 계산에서는 0인 구간을 만난 이후부터 적용 (차이는 1e-16 수준)
+        self.hl_has_zero = False
+        self.stoch_has_zero = False
+
+        self.closes = deque(maxlen=50)
+        self.highs = deque(maxlen=26)
+        self.lows = deque(maxlen=26)
+        self.volumes = deque(maxlen=20)
+        self.typical_prices = deque(maxlen=14)
+        self.stoch_raw = deque(maxlen=3)
+        self.stoch_k = deque(maxlen=3)
+
+        self.ema_fast = _EmaState(12)
+        self.ema_slow = _EmaState(26)
+        self.ema_signal = _EmaState(9)
+        self.atr = _rma_state(14)
+        self.dm_pos = _rma_state(14)
+        self.dm_neg = _rma_state(14)
+        self.adx = _rma_state(14)
+        self.rsi_up = _rma_state(14)
+        self.rsi_down = _rma_state(14)
+
+        # 마지막 봉 반영 직전 상태 (같은 날짜 봉이 다시 들어오면 되돌리고 재계산)
+        self._before_last = None
+
+    def update(self, date, open_, high, low, close, volume, snapshot=False):
+        """
+        봉 하나를 반영하고 해당 봉의 지표 값을 반환
+        마지막으로 반영한 날짜와 같은 날짜가 들어오면 장중 갱신으로 보고 마지막 봉을 교체
+        :param snapshot: 반영 직전 상태를 보관할지 여부 (이후 같은 날짜 봉 교체에 필요)
+        :return: {지표 컬럼: 값}, 교체할 수 없는 이전 날짜 봉이면 None
+        """
+        if self.last_date is not None and date <= self.last_date:
+            if date != self.last_date or self._before_last is None:
+                return None
+            self.__dict__.update(copy.deepcopy(self._before_last.__dict__))
+        self._before_last = None
+        if snapshot:
+            self._before_last = copy.deepcopy(self)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = self._update(high, low, close, volume)
+        self.last_date = date
+        return values
+
+    def _update(self, high, low, close, volume):
+        high, low, close, volume = (np.float64(v) for v in (high, low, close, volume))
+        prev_close, prev_high, prev_low = self.prev_close, self.prev_high, self.prev_low
+        out = {}
+
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+        self.volumes.append(volume)
+
+        out["SMA_20"] = _window_mean(self.closes, 20)
+        out["SMA_50"] = _window_mean(self.closes, 50)
+
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        macd_signal = self.ema_signal.update(macd)
+        out["MACD"] = macd
+        out["MACD_signal"] = macd_signal
+        out["MACD_hist"] = macd - macd_signal
+
+        hl_range = high - low
+        self.hl_has_zero = self.hl_has_zero or hl_range == 0
+        if self.hl_has_zero:
+            hl_range += sys.float_info.epsilon
+        if np.isnan(prev_close):
+            true_range = np.nan
+        else:
+            true_range = max(abs(hl_range), abs(high - prev_close), abs(prev_close - low))
+        atr = self.atr.update(true_range)
+
+        up = high - prev_high
+        dn = prev_low - low
+        pos = float(_zero(((up > dn) & (up > 0)) * up))
+        neg = float(_zero(((dn > up) & (dn > 0)) * dn))
+        k = 100 / atr
+        dmp = k * self.dm_pos.update(pos)
+        dmn = k * self.dm_neg.update(neg)
+        out["ADX"] = self.adx.update(100 * abs(dmp - dmn) / (dmp + dmn))
+
+        change = close - prev_close
+        positive_avg = self.rsi_up.update(0.0 if change < 0 else change)
+        negative_avg = self.rsi_down.update(0.0 if change > 0 else change)
+        out["RSI_14"] = 100 * positive_avg / (positive_avg + abs(negative_avg))
+
+        if len(self.lows) >= 14:
+            lowest_low = min(list(self.lows)[-14:])
+            highest_high = max(list(self.highs)[-14:])
+        else:
+            lowest_low = highest_high = np.nan
+        stoch_range = highest_high - lowest_low
+        self.stoch_has_zero = self.stoch_has_zero or stoch_range == 0
+        if self.stoch_has_zero:
+            stoch_range += sys.float_info.epsilon
+        self.stoch_raw.append(100 * (close - lowest_low) / stoch_range)
+        stoch_k = _window_mean(self.stoch_raw, 3)
+        self.stoch_k.append(stoch_k)
+        out["Stoch_%K"] = stoch_k
+        out["Stoch_%D"] = _window_mean(self.stoch_k, 3)
+
+        typical_price = (high + low + close) / 3.0
+        self.typical_prices.append(typical_price)
+        if len(self.typical_prices) >= 14:
+            window = np.array(self.typical_prices)
+            mean = window.mean()
+            out["CCI"] = (typical_price - mean) / (0.015 * np.abs(window - mean).mean())
+        else:
+            out["CCI"] = np.nan
+
+        bb_middle = out["SMA_20"]
+        deviations = 2.0 * np.std(list(self.closes)[-20:]) if len(self.closes) >= 20 else np.nan
+        out["BB_upper"] = bb_middle + deviations
+        out["BB_middle"] = bb_middle
+        out["BB_lower"] = bb_middle - deviations
+
+        out["ATR"] = atr
+
+        sign = 1.0 if np.isnan(prev_close) else np.sign(change)
+        self.obv = sign * volume if np.isnan(self.obv) else self.obv + sign * volume
+        out["OBV"] = self.obv
+
+        out["Volume_MA_20"] = _window_mean(self.volumes, 20)
+
+        out["Ichimoku_base"] = (
+            0.5 * (min(self.lows) + max(self.highs)) if len(self.lows) >= 26 else np.nan
+        )
+        out["Ichimoku_conversion"] = (
+            0.5 * (min(list(self.lows)[-9:]) + max(list(self.highs)[-9:])) if len(self.lows) >= 9 else np.nan
+        )
+        out["Ichimoku_lead1"] = np.nan
+        out["Ichimoku_lead2"] = np.nan
+
+        out["Momentum"] = close - self.closes[-11] if len(self.closes) >= 11 else np.nan
+        out["Williams_%R"] = 100 * ((close - lowest_low) / (highest_high - lowest_low) - 1)
+
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        return out
+
+
+def append_bars(technical_df, state, ohlcv):
+    """
+    새로 들어온 봉만 상태에 반영해서 기술적 지표 데이터프레임 뒤에 추가
+    마지막 날짜와 같은 봉은 교체, 그 이전 날짜의 봉은 무시
+    :param technical_df: 기존 기술적 지표 데이터프레임 (없으면 None)
+    :param state: 종목의 IndicatorState
+    :param ohlcv: 최근 OHLCV 데이터프레임
+    :return: 갱신된 기술적 지표 데이터프레임
+    """
+    if ohlcv is None or ohlcv.empty:
+        return technical_df
+    ohlcv = ohlcv[ohlcv[OHLCV_COLUMNS].notna().all(axis=1)]
+    if state.last_date is not None:
+        ohlcv = ohlcv[ohlcv.index >= state.last_date]
+    if ohlcv.empty:
+        return technical_df
+
+    rows = []
+    last = len(ohlcv) - 1
+    for idx, (date, bar) in enumerate(zip(ohlcv.index, ohlcv[OHLCV_COLUMNS].itertuples(index=False))):
+        rows.append(state.update(date, *bar, snapshot=idx == last))
+    keep = [row is not None for row in rows]
+    ohlcv = ohlcv[keep]
+    if ohlcv.empty:
+        return technical_df
+    new_df = pd.concat(
+        [ohlcv, pd.DataFrame([row for row in rows if row is not None], index=ohlcv.index, columns=INDICATOR_COLUMNS)],
+        axis=1,
+    )
+
+    if technical_df is None or technical_df.empty:
+        return new_df
+    # 다시 받은 마지막 날짜 행은 새로 계산한 값으로 교체
+    technical_df = technical_df[~technical_df.index.isin(new_df.index)]
+    return pd.concat([technical_df, new_df[technical_df.columns.intersection(new_df.columns)]])
+
+
+def build_indicator_state(ohlcv):
+    """
+    OHLCV 전체 이력을 한 번 재생해서 종목의 지표 상태와 기술적 지표 데이터프레임을 생성
+    :param ohlcv: 종목 하나의 OHLCV 데이터프레임
+    :return: (IndicatorState, 기술적 지표 데이터프레임)
+    """
+    state = IndicatorState()
+    return state, append_bars(None, state, ohlcv)
+
+
+# 증분 갱신 때 받는 최근 봉 기간 (마지막 반영 이후 지난 달력 일수 상한, yfinance 기간)
+# 거래일 기준 기간이 주말/휴장일을 포함한 달력 일수를 넉넉히 덮도록 선택
+UPDATE_PERIODS = [(5, "5d"), (25, "1mo"), (80, "3mo")]
+
+
+def update_period(last_date, now):
+    """
+    마지막으로 반영한 날짜 이후의 봉을 빠짐없이 받을 수 있는 다운로드 기간
+    :param last_date: IndicatorState.last_date
+    :param now: 현재 시각 (pd.Timestamp)
+    :return: 기간 문자열, 공백이 너무 길면 None (전체 이력으로 상태를 다시 만들어야 함)
+    """
+    if last_date is None:
+        return None
+    last_date, now = pd.Timestamp(last_date), pd.Timestamp(now)
+    if last_date.tzinfo is not None:
+        last_date = last_date.tz_convert(None)
+    if now.tzinfo is not None:
+        now = now.tz_convert(None)
+    gap_days = (now.normalize() - last_date.normalize()).days
+    for max_days, period in UPDATE_PERIODS:
+        if gap_days <= max_days:
+            return period
+    return None
+
+
+def has_gap(state, ohlcv):
+    """
+    받은 봉이 마지막으로 반영한 날짜부터 이어지지 않는지 여부
+    (append_bars는 마지막 날짜 이전 봉만 무시하므로, 중간 봉이 빠지면 지표가 조용히 어긋남)
+    """
+    if state.last_date is None or ohlcv is None or ohlcv.empty:
+        return False
+    return ohlcv.index[0] > state.last_date
@@ -0,0 +1,178 @@
+import os
+import json
+import asyncio
+import hashlib
+import time
+from collections import deque
+import openai
+from openai import AsyncOpenAI
+
+# 분당 요청/토큰 한도와 동시 요청 개수 (환경 변수로 변경 가능)
+REQUESTS_PER_MINUTE = int(os.environ.get("OPENAI_RPM", 500))
+TOKENS_PER_MINUTE = int(os.environ.get("OPENAI_TPM", 30000))
+MAX_CONCURRENCY = int(os.environ.get("STOCK_LLM_CONCURRENCY", 8))
+RETRIES = 3
+BACKOFF = 1.0
+# 응답 토큰 한도를 정하지 않은 요청이 분당 토큰 한도에서 차지하는 예상 응답 토큰 수
+EXPECTED_COMPLETION_TOKENS = 1024
+
+# 일시적인 오류만 재시도 (인증/요청 형식 오류는 바로 실패)
+TRANSIENT_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+def count_tokens(text, model="gpt-4o"):
+    """
+    텍스트의 토큰 수 계산
+    tiktoken이 있으면 모델 토크나이저를 사용하고, 없으면 UTF-8 바이트 수로 근사
+    (한글 1글자 = 3바이트 ≈ 1토큰, 영문 3글자 ≈ 1토큰으로 약간 크게 잡음)
+    """
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return len(encoding.encode(text))
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+class RateLimiter:
+    """
+    최근 60초 동안의 요청 수/토큰 수를 기준으로 한도를 넘지 않게 대기시키는 제한기
+    """
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.events = deque()  # (요청 시각, 토큰 수)
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, tokens):
+        while True:
+            async with self.lock:
+                now = time.monotonic()
+                while self.events and now - self.events[0][0] >= 60:
+                    self.events.popleft()
+                used_tokens = sum(t for _, t in self.events)
+                # 토큰 한도보다 큰 요청 하나는 비어 있을 때 단독으로 보냄
+                if len(self.events) < self.requests_per_minute and (
+                    used_tokens + tokens <= self.tokens_per_minute or not self.events
+                ):
+                    self.events.append((now, tokens))
+                    return
+                wait = self.events[0][0] + 60 - now
+            await asyncio.sleep(max(wait, 0.05))
+
+
+def build_messages(system_text, prompt_text):
+    return [
+        {"role": "system", "content": system_text},
+        {"role": "user", "content": prompt_text},
+    ]
+
+
+async def _request(client, model, messages, index, on_token, **kwargs):
+    if on_token is None:
+        response = await client.chat.completions.create(model=model, messages=messages, **kwargs)
+        return response.choices[0].message.content if response.choices else "응답 없음"
+
+    # 스트리밍: 토큰이 도착할 때마다 지금까지의 텍스트를 콜백으로 전달
+    stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs)
+    text = ""
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            text += delta
+            on_token(index, text)
+    return text or "응답 없음"
+
+
+def response_cache_key(model, messages, **kwargs):
+    """
+    (모델, 시스템/사용자 메시지, 요청 옵션) 내용의 해시를 응답 캐시 키로 사용
+    """
+    payload = json.dumps([model, messages, kwargs], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _complete(client, model, messages, index, limiter, semaphore, retries, backoff, on_token,
+                    cache=None, **kwargs):
+    # 같은 내용으로 요청한 적이 있으면 캐시된 응답을 바로 반환
+    cache_key = response_cache_key(model, messages, **kwargs)
+    if cache is not None:
+        cached = cache.get("llm_response", cache_key)
+        if cached is not None:
+            if on_token is not None:
+                on_token(index, cached)
+            return cached
+
+    tokens = sum(count_tokens(m["content"], model) for m in messages)
+    tokens += kwargs.get("max_tokens") or EXPECTED_COMPLETION_TOKENS
+    async with semaphore:
+        for attempt in range(retries + 1):
+            await limiter.acquire(tokens)
+            try:
+                text = await _request(client, model, messages, index, on_token, **kwargs)
+                if cache is not None and text != "응답 없음":
+                    cache.set("llm_response", cache_key, text)
+                return text
+            except TRANSIENT_ERRORS as e:
+                if attempt == retries:
+                    return f"AI 요청 중 오류 발생: {e}"
+                # 스트리밍 도중 실패하면 처음부터 다시 받으므로 표시 중인 텍스트 초기화
+                if on_token is not None:
+                    on_token(index, "")
+                await asyncio.sleep(backoff * (2 ** attempt))
+            except Exception as e:
+                return f"AI 요청 중 오류 발생: {e}"
+
+
+async def dispatch_completions(client, model, system_text, prompt_texts,
+                               max_concurrency=MAX_CONCURRENCY, limiter=None,
+                               retries=RETRIES, backoff=BACKOFF, on_token=None, cache=None, **kwargs):
+    """
+    여러 프롬프트를 동시에 요청하고 입력 순서대로 응답 반환
+    :param client: AsyncOpenAI 클라이언트
+    :param prompt_texts: 사용자 프롬프트 리스트
+    :param max_concurrency: 동시에 진행할 요청 수
+    :param limiter: RateLimiter, 없으면 기본 한도로 생성
+    :param on_token: 스트리밍 콜백 on_token(프롬프트 순번, 지금까지 받은 텍스트), 없으면 스트리밍하지 않음
+    :param cache: stock_cache.DiskCache, 있으면 같은 내용의 요청은 저장된 응답을 재사용
+    :return: 응답 텍스트 리스트 (실패한 요청은 오류 메시지)
+    """
+    limiter = limiter or RateLimiter()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [
+        _complete(
+            client, model, build_messages(system_text, prompt_text), index,
+            limiter, semaphore, retries, backoff, on_token, cache=cache, **kwargs
+        )
+        for index, prompt_text in enumerate(prompt_texts)
+    ]
+    return await asyncio.gather(*tasks)
+
+
+def run_completions(api_key, model, system_text, prompt_texts, base_url=None, **kwargs):
+    """
+    dispatch_completions 동기 실행 래퍼 (Streamlit 스크립트에서 호출)
+    :param base_url: OpenAI 호환 서버 주소, 로컬 목 서버로 테스트할 때 사용
+    :return: 응답 텍스트 리스트
+    """
+    async def _run():
+        # 재시도는 요청별로 직접 처리하므로 클라이언트 자체 재시도는 끔
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        try:
+            return await dispatch_completions(client, model, system_text, prompt_texts, **kwargs)
+        finally:
+            await client.close()
+
+    return asyncio.run(_run())
@@ -1,12 +1,23 @@
 import streamlit as st
-import pandas as pd
-import yfinance as yf
-import pandas_ta as ta
 import json
 from datetime import datetime
 from streamlit_cookies_manager import EncryptedCookieManager
-from openai import OpenAI # GPT-4 API
 import stock_prompt
+import stock_data
+import stock_cache
+import stock_fundamental
+import stock_pipeline
+import stock_llm
+import stock_screen
+import stock_quant
+import stock_financials
+import stock_factor
+import stock_backtest
+import stock_session
+import stock_symbol_store
+import stock_universe
+import stock_chat
+import stock_retrieval
 import base64
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
@@ -30,354 +41,92 @@ if not st.session_state.api_key:
     st.warning("사이드바에 OpenAI API 키를 입력해주세요.")
     st.stop()
 
-# S&P 500 리스트 크롤링 함수
-@st.cache_data
+# S&P 500 리스트 (로컬 스냅샷)
+@st.cache_data(ttl=60 * 60)
 def load_sp500_symbols():
     """
-    위키백과 페이지에서 S&P500 리스트를 가져온 뒤
-    심볼(Symbol) 컬럼만 추출하여 리스트로 반환
+    로컬 S&P 500 스냅샷에서 심볼(Symbol)과 회사명(Security)을 리스트로 반환
+    위키백과 크롤링은 스냅샷이 없을 때만 하고, 오래된 스냅샷은 백그라운드에서 갱신
+    스냅샷이 없고 받지도 못하면 빈 리스트 (백그라운드 갱신이 스냅샷을 채움)
     """
-    url = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
-    tables = pd.read_html(url)
-    df = tables[0]
-    # Symbol과 Security(회사명) 컬럼 추출
-    return df[['Symbol', 'Security']].values.tolist()
-
-# 선택된 종목에 대해 OHLCV 데이터를 가져오고 기술적 지표를 계산
-@st.cache_data
-def fetch_technical_analyze(symbol):
-    """
-    종목에 대해 OHLCV 데이터를 가져오고 기술적 지표를 계산
-    :param symbol: 종목 심볼
-    :return: 기술적 지표를 포함한 데이터프레임 딕셔너리
-    """
-    try:
-        data = yf.download(symbol, period="6mo", interval="1d")
-        data.dropna(inplace=True)
-        # 멀티 인덱스인 경우 제거
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.droplevel(1)
-
-        # 기술적 지표 계산
-        data['SMA_20'] = ta.sma(data['Close'], length=20)
-        data['SMA_50'] = ta.sma(data['Close'], length=50)
-        macd = ta.macd(data["Close"], fast=12, slow=26, signal=9)
-
-        data["MACD"] = macd["MACD_12_26_9"]
-        data["MACD_signal"] = macd["MACDs_12_26_9"]
-        data["MACD_hist"] = macd["MACDh_12_26_9"]
-        
-        data['ADX'] = ta.adx(data['High'], data['Low'], data['Close'])['ADX_14']
-        data['RSI_14'] = ta.rsi(data['Close'], length=14)
-        stoch = ta.stoch(data['High'], data['Low'], data['Close'])
-        data['Stoch_%K'] = stoch['STOCHk_14_3_3']
-        data['Stoch_%D'] = stoch['STOCHd_14_3_3']
-        data['CCI'] = ta.cci(data['High'], data['Low'], data['Close'])
-        bollinger = ta.bbands(data['Close'], length=20, std=2)
-        data['BB_upper'] = bollinger['BBU_20_2.0']
-        data['BB_middle'] = bollinger['BBM_20_2.0']
-        data['BB_lower'] = bollinger['BBL_20_2.0']
-        data['ATR'] = ta.atr(data['High'], data['Low'], data['Close'])
-        data['OBV'] = ta.obv(data['Close'], data['Volume'])
-        data['Volume_MA_20'] = ta.sma(data['Volume'], length=20)
-
-        ichimoku_base, ichimoku_lead = ta.ichimoku(data['High'], data['Low'], data['Close'])
-
-        data['Ichimoku_base'] = ichimoku_base['IKS_26']
-        data['Ichimoku_conversion'] = ichimoku_base['ITS_9']
-        data['Ichimoku_lead1'] = ichimoku_lead['ISA_9']
-        data['Ichimoku_lead2'] = ichimoku_lead['ISB_26']
-        
-        data['Momentum'] = ta.mom(data['Close'], length=10)
-        
-        data['Williams_%R'] = ta.willr(data['High'], data['Low'], data['Close'])
-
-
-        # 결과 저장
-        return data
-    except Exception as e:
-        st.error(f"{symbol} 데이터를 분석하는 중 오류 발생: {e}")
-        return None
+    universe = stock_universe.load_universe()
+    stock_universe.start_background_refresh()
+    return [[symbol, name] for symbol, name in zip(universe.index, universe["name"])]
 
-
-def fetch_fundamental_dict(symbol):
+# 재시작이나 여러 워커 사이에서도 유지되는 디스크 캐시
+@st.cache_resource
+def get_disk_cache():
     """
-    주식 심볼에 대한 기본적 분석 데이터를 수집
-    :param symbol: 주식 심볼
-    :return: 재무 데이터 딕셔너리
+    일봉/재무 데이터용 영구 캐시 (STOCK_CACHE_DIR 환경 변수로 위치 변경 가능)
     """
-    try:
-        ticker = yf.Ticker(symbol)
-
-        # 손익계산서 (Income Statement)
-        income_stmt = ticker.financials
-        if income_stmt is not None and not income_stmt.empty:
-            income_stmt = income_stmt.T
-            revenue = income_stmt.get('Total Revenue', None)
-            operating_income = income_stmt.get('Operating Income', None)
-            net_income = income_stmt.get('Net Income', None)
-        else:
-            revenue = operating_income = net_income = None
-
-        income_stmt_metrics = {
-            "revenue": revenue,
-            "operating_income": operating_income,
-            "net_income": net_income,
-        }
-
-        # 대차대조표 (Balance Sheet)
-        balance_sheet = ticker.balance_sheet
-        if balance_sheet is not None and not balance_sheet.empty:
-            balance_sheet = balance_sheet.T
-            total_assets = balance_sheet.get('Total Assets', None)
-            total_liabilities = balance_sheet.get('Total Liabilities Net Minority Interest', None)
-            shareholders_equity = balance_sheet.get('Total Equity Gross Minority Interest', None)
-        else:
-            total_assets = total_liabilities = shareholders_equity = None
-
-        balance_sheet_metrics = {
-            "total_assets": total_assets,
-            "total_liabilities": total_liabilities,
-            "shareholders_equity": shareholders_equity,
-        }
-
-        # 현금흐름표 (Cash Flow Statement)
-        cash_flow = ticker.cashflow
-        if cash_flow is not None and not cash_flow.empty:
-            cash_flow = cash_flow.T
-            operating_cf = cash_flow.get('Operating Cash Flow', None)
-            investing_cf = cash_flow.get('Investing Cash Flow', None)
-            financing_cf = cash_flow.get('Financing Cash Flow', None)
-        else:
-            operating_cf = investing_cf = financing_cf = None
-        cash_flow_metrics = {
-            "operating_cash_flow": operating_cf,
-            "investing_cash_flow": investing_cf,
-            "financing_cash_flow": financing_cf,
-        }
-
-        # 주요 재무 지표
-        key_metrics = {
-            "EPS": ticker.info.get("trailingEps"),
-            "DPS": ticker.info.get("dividendRate"),
-            "ROE": ticker.info.get("returnOnEquity"),
-            "ROA": ticker.info.get("returnOnAssets"),
-            "EBITDA": ticker.info.get("ebitda"),
-            "FCF": ticker.info.get("freeCashflow"),
-        }
-
-        # 주가 관련 지표
-        stock_metrics = {
-            "market_cap": ticker.info.get("marketCap"),
-            "PER": ticker.info.get("trailingPE"),
-            "PBR": ticker.info.get("priceToBook"),
-            "PSR": ticker.info.get("priceToSalesTrailing12Months"),
-            "EV": ticker.info.get("enterpriseValue"),
-            "EV/EBITDA": ticker.info.get("enterpriseToEbitda"),
-        }
-
-        # 성장 및 배당 데이터
-        growth_and_dividend = {
-            "revenue_growth": ticker.info.get("revenueGrowth"),
-            "EPS_growth": ticker.info.get("earningsGrowth"),
-            "dividend_yield": ticker.info.get("dividendYield"),
-            "payout_ratio": ticker.info.get("payoutRatio"),
-        }
-        return {
-            "income_stmt": income_stmt_metrics,
-            "balance_sheet": balance_sheet_metrics,
-            "cash_flow": cash_flow_metrics,
-            "key_metrics": key_metrics,
-            "stock_metrics": stock_metrics,
-            "growth_and_dividend": growth_and_dividend,
-        }
+    return stock_cache.DiskCache()
 
-    except Exception as e:
-        print(f"Error fetching data for {symbol}: {e}")
-        return None
-def generate_quant_strategies(technical_analysis_df, fundamental_dict):
+# 종목 데이터 공유 저장소 (프로세스가 유지되는 동안 모든 사용자 세션이 공유)
+@st.cache_resource
+def get_symbol_store():
     """
-    기술적/기본적 분석 데이터를 활용하여
-    검증된 투자가들의 공식 기준을 생성해 반환
-    :param technical_analysis_df: 기술적 분석 데이터 프레임
-    :param fundamental_dict: 기본적 분석 데이터 딕셔너리
-    :return: 퀀트 투자 전략에 활용할 공식 딕셔너리
+    종목별 기술적 지표/재무 스냅샷을 갱신 주기마다 한 번만 계산해서 모든 세션에 제공
+    :return: stock_symbol_store.SymbolDataStore
     """
-    
-    income_stmt = fundamental_dict["income_stmt"]
-    balance_sheet = fundamental_dict["balance_sheet"]
-    cash_flow = fundamental_dict["cash_flow"]
-    key_metrics = fundamental_dict["key_metrics"]
-    stock_metrics =  fundamental_dict["stock_metrics"]
-    growth_dividend = fundamental_dict["growth_and_dividend"]
-
-
-    # total_current_assets = total_assets 개념이 같은건가? 일단 데이터상 제공되는대로 진행
-    total_current_assets = balance_sheet.get("total_assets", None)
-    total_liabilities = balance_sheet.get("total_liabilities", None)
-    market_cap = stock_metrics.get("market_cap", None)
-
-
-    # NCAV (Net Current Asset Value) 계산
-    # 저평가된 주식을 찾기 위한 전통적인 방법 중 하나
-    # 시장이 순유동자산보다 싸게 거래 중인지 판단
-    # 
-    # NCAV 계산
-    if total_current_assets is not None and total_liabilities is not None:
-        ncav = total_current_assets - total_liabilities
-    else:
-        ncav = None
-
-    # NCAV/시가총액 비율
-    if ncav is not None and market_cap is not None and market_cap > 0:
-        ncav_ratio = ncav / market_cap
-    else:
-        ncav_ratio = None
-
-
-    # Magic Formula (Joel Greenblatt)
-    # 저평가 우량주를 찾기 위한 전략
-    # 공식 쓸꺼면 특정 섹터를 제거하고 최소 시가총액 이상의 종목만 고려해야함
-    # 좋은 공식으로 판단되지만, 일단 간단하게만 구현
-    # 어차피 나중에 퀀트쪽은 더 개선이 필요함 TODO
-    ebit = key_metrics.get("EBITDA", None)  # 근사적으로 EBIT를 EBITDA로 사용
-    ev = stock_metrics.get("EV", None)
-    net_working_capital = (balance_sheet.get("total_assets", 0) - balance_sheet.get("total_liabilities", 0))
-    fixed_assets = balance_sheet.get("shareholders_equity", 0)
-    
-    # Earnings Yield 계산 (EBIT / EV)
-    if ebit and ev and ev > 0:
-        earnings_yield = ebit / ev
-    else:
-        earnings_yield = None
-    
-    # Return on Capital 계산 (EBIT / (Net Working Capital + Fixed Assets))
-    if ebit and (net_working_capital + fixed_assets) > 0:
-        return_on_capital = ebit / (net_working_capital + fixed_assets)
-    else:
-        return_on_capital = None
-
-    # Fama-French 3 공식 TODO
-    # 시장의 위험 프리미엄을 고려한 수익률 계산
-    # 데이터 부족해서 일단 방식만 명시
-    # SP500 지수 데이터, 미국 국채 수익률, SMB, HML 등을 사용해야 함
-
-    # Piotroski F-Score 재무 안전성 평가 TODO
-    # 0 ~ 9점까지, 9점은 가장 안전한 종목
-    # 스코어 계산을 위해 전년도 재무 평가표와 신규 주식 발행 여부, 매출총이익률증가, 자산회전율을 추가해야함
-    # 현재 단계에서는 계산 불가
-
-    # CANSLIM 전략 TODO
-    # C: Current Earnings(최근 분기 이익)
-    # A: Annual Earnings(연간 이익)
-    # N: New Products or Services(신제품, 서비스): 없는데 나중에 감정분석 추가되면 가능
-    # S: Supply and Demand(공급과 수요)
-    # L: Leader or Laggard(시장 점유율): 없음, 나중에 마법 공식 추가하면 전체 주식 비교도 들어가야하는데 이때 진행
-    # I: Institutional Sponsorship(기관 투자): 없음
-    # M: Market Direction(시장 방향): Fama-French 3 공식과 연관 있음
-
-    # PEG Ratio
-    # PER 대비 EPS 성장률을 고려한 지표
-    # 주식이 고평가되었는지 저평가되었는지 판단
-    per = fundamental_dict["stock_metrics"].get("PER")  # P/E Ratio
-    eps_growth = fundamental_dict["growth_and_dividend"].get("EPS_growth")  # EPS 성장률
-
-    if per and eps_growth and eps_growth > 0:
-        peg_ratio = per / (eps_growth * 100)  # EPS 성장률을 %로 사용하므로 *100
-        # PEG Ratio가 1보다 작으면 저평가, 1보다 크면 고평가로 판단
-    else:
-        peg_ratio = None
-        neff_score = None
-    
-    return {
-        "NCAV": ncav,
-        "NCAV_Ratio": ncav_ratio,
-        "Magic_Formula_Earnings_Yield": earnings_yield,
-        "Magic_Formula_Return_on_Capital": return_on_capital,
-        "PEG_Ratio": peg_ratio,
-    }
+    return stock_symbol_store.SymbolDataStore(cache=get_disk_cache())
 
 
-def generate_quant_features(technical_analysis_df, fundamental_dict):
+@st.cache_data(ttl=24 * 60 * 60)
+def load_factor_data():
     """
-    기술적/기본적 분석 데이터를 활용하여
-    (1) 이벤트/플래그, (2) 추가 파생 지표, (3) 간단한 스코어 등을 생성해 반환합니다.
-    
-    :param technical_analysis_df: 기술적 분석 데이터 프레임
-    :param fundamental_dict: 기본적 분석 데이터 딕셔너리
-    :return: 퀀트 투자 전략에 활용할 피처 딕셔너리
+    Fama-French 3 팩터 일별 데이터 (STOCK_FACTOR_FILE 환경 변수의 로컬 파일, 없으면 None)
     """
-    quant_features = {}
-
-    # 기술적 분석: 최근 (가장 마지막 row) 기준으로 시그널 뽑기
-    # ====================================================
-    latest = technical_analysis_df.iloc[-1]  # 가장 최근 날짜 행
-    prev = technical_analysis_df.iloc[-2] if len(technical_analysis_df) > 1 else latest  # 바로 전날 (데이터가 충분히 있다고 가정)
-
-    # RSI 방향성(전일 대비 상승/하락)
-    rsi_flag = 1 if latest["RSI_14"] > prev["RSI_14"] else 0
-
-    # MACD > MACD_signal 교차 여부(골든크로스?)
-    macd_crossover = 1 if (
-        (latest["MACD"] > latest["MACD_signal"]) and
-        (prev["MACD"] <= prev["MACD_signal"])
-    ) else 0
-
-    # SMA20 vs SMA50 (단기 > 중기)
-    sma_trend = 1 if latest["SMA_20"] > latest["SMA_50"] else 0
-
-    # ATR, ADX, Stoch, Bollinger 밴드 이벤트 등은....TODO
-
-
-    # 기본적 분석: PER, PBR, EV/EBITDA 등으로 Value Score를 간단 계산
-    # ====================================================
+    return stock_factor.load_factor_file()
 
-    income_stmt = fundamental_dict["income_stmt"]
-    balance_sheet = fundamental_dict["balance_sheet"]
-    cash_flow = fundamental_dict["cash_flow"]
-    key_metrics = fundamental_dict["key_metrics"]
-    stock_mertrics =  fundamental_dict["stock_metrics"]
-    growth_dividend = fundamental_dict["growth_and_dividend"]
 
-    
-    per = stock_mertrics.get("PER", None)
-    pbr = stock_mertrics.get("PBR", None)
-    ev_ebitda = stock_mertrics.get("EV/EBITDA", None)
-    
-    
-    roe = key_metrics.get("ROE", None)
-
-    # Value Score = (PER + PBR + EV/EBITDA)를 단순 합
-    # 실제로는 Z-score로 정규화하거나, 결측치 처리 등을 해야한다는데...TODO
-    if per and pbr and ev_ebitda and all(x > 0 for x in [per, pbr, ev_ebitda]):
-        value_score = per + pbr + ev_ebitda
-    else:
-        value_score = None
-
-    # ROE가 높을수록, 혹은 FCF가 클수록 점수가 높도록
-    # 간단히 "ROE" 자체를 점수화할 수도 있고, 여러 요소 합산 가능
-    # 여기서는 ROE가 있으면 ROE 그대로, 없으면 0으로 처리 TODO
-    quality_score = roe if roe else 0
+def get_chat_index(full_ai_response, combined_stocks_data):
+    """
+    추가 질문 검색 인덱스 (분석 결과가 바뀔 때만 새로 만들고 세션에 저장)
+    :return: stock_retrieval.BM25Index
+    """
+    index_key = stock_chat.analysis_key(full_ai_response)
+    if st.session_state.get("chat_index_key") != index_key:
+        st.session_state["chat_index"] = stock_retrieval.build_chat_index(
+            full_ai_response, combined_stocks_data, include_quant=st.session_state.get("include_quant", False)
+        )
+        st.session_state["chat_index_key"] = index_key
+    return st.session_state["chat_index"]
 
 
-    # 퀀트 스코어: 기술적 + 가치 + 퀄리티 통합 TODO
-    # ====================================================
-    # 단순히 "기술적 시그널 합 + (1 / value_score) + quality_score" 등으로 정리했는데
-    # 실제 퀀트 스코어 계산 기준은 다 다르고, 복잡하기에 일단 PASS
+@st.cache_data(ttl=24 * 60 * 60)
+def load_backtest_closes(symbols, period="5y"):
+    """
+    백테스트용 장기 종가 패널 (날짜 x 종목), 디스크 캐시를 거쳐서 한 번에 다운로드
+    """
+    ohlcv_dict = stock_data.download_ohlcv(list(symbols), period=period, interval="1d", cache=get_disk_cache())
+    return stock_backtest.close_panel(ohlcv_dict)
 
-    technical_sum = rsi_flag + macd_crossover + sma_trend  # 단순 예시
-    final_score = technical_sum + (1 / value_score) + (quality_score if quality_score else 0)
 
-    quant_features= {
-        "RSI_Up_Flag": rsi_flag,
-        "MACD_Crossover": macd_crossover,
-        "SMA_Trend_Flag": sma_trend,
-        "Value_Score": value_score,
-        "Quality_Score": quality_score,
-        "Final_Quant_Score": final_score,
-    }
+def load_universe_snapshots(symbols):
+    """
+    종목 전체의 재무 스냅샷을 불러옴
+    캐시에 있는 종목은 한 번에 읽고, 없는 종목만 동시에 조회 (진행률 표시)
+    :return: {종목: FundamentalSnapshot}
+    """
+    cache = get_disk_cache()
+    snapshots = stock_fundamental.load_cached_snapshots(symbols, cache)
+    missing = [symbol for symbol in symbols if symbol not in snapshots]
+    if missing:
+        progress = st.progress(0.0, text="재무 데이터 수집 중...")
+        for done_count, (symbol, snapshot, error) in enumerate(
+            stock_pipeline.iter_concurrent(
+                missing, lambda s: stock_fundamental.fetch_fundamental_snapshot(s, cache=cache)
+            ),
+            start=1,
+        ):
+            if error is not None:
+                print(f"Error fetching data for {symbol}: {error}")
+            else:
+                snapshots[symbol] = snapshot
+            progress.progress(done_count / len(missing), text=f"재무 데이터 수집 중... ({done_count}/{len(missing)})")
+        progress.empty()
+    return snapshots
 
-    return quant_features
 
 cookie_manager = EncryptedCookieManager(
     prefix="stock_manager_cookies",
@@ -404,13 +153,18 @@ def select_stocks():
     holding_stocks = json.loads(cookie_manager["holding_stocks"])
 
     sp500_data = load_sp500_symbols()
+    if not sp500_data:
+        # 스냅샷이 없고 받지도 못한 경우 (처음 실행 또는 오프라인), 빈 목록은 캐시하지 않고 다음 실행 때 다시 읽음
+        load_sp500_symbols.clear()
+        st.warning("S&P 500 종목 목록을 가져오지 못했습니다. 백그라운드에서 다시 받는 중이니 잠시 후 새로고침해주세요.")
     sp500_dict = {symbol: name for symbol, name in sp500_data}
 
     # 관심 종목 선택
     st.subheader("관심 종목 선택")
     favorite_stocks = st.multiselect(
         "관심 종목을 선택하세요",
-        options=[symbol for symbol, _ in sp500_data],
+        # 목록에 없는 저장된 관심 종목도 선택 상태를 유지
+        options=[symbol for symbol, _ in sp500_data] + [symbol for symbol in favorite_stocks if symbol not in sp500_dict],
         default=favorite_stocks,
         format_func=lambda x: f"{x} - {sp500_dict.get(x, '')}"
     )
@@ -468,6 +222,34 @@ def select_stocks():
                     cookie_manager.save()
                     st.rerun()
 
+    # S&P 500 전체 대상 퀀트 스크리닝
+    with st.expander("퀀트 스크리닝 (S&P 500 전체)"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            ranking = st.selectbox("정렬 기준", list(stock_screen.RANKINGS.keys()))
+        with col2:
+            top_n = st.number_input("종목 수", min_value=1, max_value=100, value=20, step=1)
+        with col3:
+            min_market_cap = st.number_input("최소 시가총액 (B USD)", min_value=0.0, value=0.0, step=1.0)
+
+        if st.button("스크리닝 실행"):
+            snapshots = load_universe_snapshots([symbol for symbol, _ in sp500_data])
+            st.session_state["screening_table"] = stock_screen.build_fundamental_table(snapshots)
+            st.session_state["screening_f_scores"] = stock_financials.compute_f_scores(
+                stock_financials.FinancialsStore.from_snapshots(snapshots)
+            )
+
+        # 지표/순위 계산은 벡터 연산이라 조건을 바꿀 때마다 다시 계산
+        if st.session_state.get("screening_table") is not None:
+            metrics = stock_screen.compute_screening_metrics(
+                st.session_state["screening_table"],
+                min_market_cap=min_market_cap * 1_000_000_000,
+                f_scores=st.session_state.get("screening_f_scores"),
+            )
+            top = stock_screen.screen_top(metrics, ranking, int(top_n))
+            top.insert(0, "Security", [sp500_dict.get(symbol, "") for symbol in top.index])
+            st.dataframe(top)
+
     # 종목 분석 진행 버튼
     if st.button("종목 분석 진행"):
         cookie_manager["favorite_stocks"] = json.dumps(favorite_stocks)
@@ -500,33 +282,53 @@ def data_analysis():
         combined_stocks_data = {}
         all_selected = set(favorite_stocks + [h['symbol'] for h in holding_stocks])
 
-        for symbol in all_selected:
-            is_favorite = symbol in favorite_stocks
-            is_holding = symbol in [h['symbol'] for h in holding_stocks]
-            holding_info = next((h for h in holding_stocks if h['symbol'] == symbol), None)
-            technical_analysis_df = fetch_technical_analyze(symbol)
-            fundamental_dict = fetch_fundamental_dict(symbol)
-
-            # technical_analysis_df,fundamental_dict 두 데이터가 모두 존재하는 경우에만 분석 진행
-            if technical_analysis_df is None or fundamental_dict is None:
-                continue
-            
-            # quant_features_dict = generate_quant_features(technical_analysis_df,fundamental_dict)
-            # quant_strategies_dict = generate_quant_strategies(technical_analysis_df,fundamental_dict)
-            # 아직 효용성이 검증되지 않아서 비활성화
-            quant_features_dict = None
-            quant_strategies_dict = None
-
-            combined_stocks_data[symbol] ={
-                "symbol": symbol,
-                "is_favorite": is_favorite,
-                "holding_info": holding_info,
-                "is_holding": is_holding,
-                "technical_analysis_df": technical_analysis_df,
-                "fundamental_dict": fundamental_dict,
-                "quant_features_dict": quant_features_dict,
-                "quant_strategies_dict": quant_strategies_dict,
-            }
+        # 다른 사용자가 이미 계산한 종목은 공유 저장소의 데이터를 그대로 사용하고
+        # 갱신 주기가 지난 종목만 전체 종목을 한 번에 다운로드 (지표 상태를 이어받아 새 봉만 반영)
+        # 재무 데이터는 캐시에 없는 종목만 스레드 풀에서 동시에 가져옴
+        progress = st.progress(0.0, text="재무 데이터 수집 중...")
+        # 준비된 종목은 전체가 끝나기를 기다리지 않고 바로 세션 데이터에 넣고 화면에 표시
+        ready = st.empty()
+        ready_rows = {"종목": [], "종가": [], "RSI": []}
+
+        def show_progress(done_count, total, symbol):
+            progress.progress(done_count / total, text=f"재무 데이터 수집 중... ({done_count}/{total}) {symbol or ''}")
+
+        def add_symbol(symbol, data):
+            # 세션에는 최근 행 요약만 저장하고 전체 이력은 공유 저장소에 그대로 둠
+            stock_info = stock_session.build_stock_info(
+                symbol, data.technical_df, data.fundamental, favorite_stocks, holding_stocks
+            )
+            combined_stocks_data[symbol] = stock_info
+            latest = stock_info["technical_analysis_df"].iloc[-1]
+            ready_rows["종목"].append(symbol)
+            ready_rows["종가"].append(round(float(latest["Close"]), 2))
+            ready_rows["RSI"].append(round(float(latest["RSI_14"]), 2))
+            ready.dataframe(ready_rows)
+
+        symbol_data, errors = get_symbol_store().refresh(
+            sorted(all_selected), on_progress=show_progress, on_symbol=add_symbol
+        )
+        progress.empty()
+        ready.empty()
+        for symbol, error in errors.items():
+            print(f"Error fetching data for {symbol}: {error}")
+            if symbol not in symbol_data:
+                st.error(f"{symbol} 데이터를 가져오지 못했습니다.")
+
+        # 완료 순서와 상관없이 종목 순서를 고정
+        combined_stocks_data = {symbol: combined_stocks_data[symbol] for symbol in sorted(combined_stocks_data)}
+
+        # Fama-French 3 팩터 노출도는 전체 종목을 한 번에 회귀해서 종목별로 저장
+        factors = load_factor_data()
+        if factors is not None and combined_stocks_data:
+            exposures = stock_factor.compute_factor_exposures(
+                stock_factor.returns_panel(
+                    {symbol: symbol_data[symbol].technical_df for symbol in combined_stocks_data}
+                ),
+                factors,
+            )
+            for symbol, exposure in exposures.iterrows():
+                combined_stocks_data[symbol]["factor_exposure"] = exposure.to_dict()
         
         # 분석된 데이터 저장 (세션 유지)
         st.session_state["combined_stocks_data"] = combined_stocks_data
@@ -577,11 +379,31 @@ def data_analysis():
         st.write("#### 성장 및 배당 데이터")
         st.json(selected_data["fundamental_dict"]["growth_and_dividend"])
 
-        # 퀀트 투자 전략 표시는 생략, 아직 기술이 확립되지 않음
+        # 퀀트 지표는 선택한 종목만 이 시점에 계산
+        st.write("#### 퀀트 피처")
+        st.json(stock_quant.get_quant_features(selected_data))
+
+        st.write("#### 퀀트 투자 전략 지표")
+        st.json(stock_quant.get_quant_strategies(selected_data))
+
+        if selected_data.get("factor_exposure"):
+            st.write("#### Fama-French 3 팩터 노출도")
+            st.json(selected_data["factor_exposure"])
 
     else:
         st.warning(f"📉 {selected_symbol}에 대한 분석 데이터가 없습니다.")
 
+    # 기술적 시그널 백테스트 (분석한 종목 전체, 장기 일봉 기준)
+    with st.expander("기술적 시그널 백테스트"):
+        signal_name = st.selectbox("시그널", list(stock_backtest.SIGNAL_DEFAULTS))
+        cost = st.number_input("거래 비용 (1회, %)", min_value=0.0, value=0.1, step=0.05) / 100
+        if st.button("백테스트 실행") and all_selected:
+            closes = load_backtest_closes(tuple(all_selected))
+            if closes.empty:
+                st.warning("백테스트할 가격 데이터가 없습니다.")
+            else:
+                st.dataframe(stock_backtest.backtest_signal(closes, signal_name, cost=cost))
+
 
     # 투자가 선택 버튼
     if st.button("분석 투자가 선택"):
@@ -605,9 +427,25 @@ def select_investor():
     if selected_investor:
         st.write(f"🔍 {selected_investor} 스타일이 적용됩니다: {investors[selected_investor]}")
 
+    # 종목 데이터를 AI에 전달하는 형식 (표 형식은 종목당 토큰 수가 적어 비용/응답 시간 절약)
+    prompt_formats = {
+        "상세 (종목별 마크다운)": "markdown",
+        "간결 (CSV 표)": "table",
+    }
+    selected_format = st.radio("데이터 전달 형식을 선택하세요", list(prompt_formats.keys()))
+    # 퀀트 지표는 포함할 때만 종목별로 계산
+    include_quant = st.checkbox("퀀트 지표 포함", value=False)
+
+    combined_stocks_data = st.session_state.get("combined_stocks_data", {})
+    if combined_stocks_data:
+        with st.expander("형식별 토큰 사용량"):
+            st.dataframe(stock_prompt.prompt_token_report(combined_stocks_data, include_quant=include_quant))
+
     # AI 분석 진행 버튼
     if st.button("🤖 AI 분석 진행"):
         st.session_state["selected_investor"] = selected_investor
+        st.session_state["prompt_format"] = prompt_formats[selected_format]
+        st.session_state["include_quant"] = include_quant
         st.session_state["page"] = "ai_analysis"
         st.session_state["full_ai_response"] = ""
         st.rerun()
@@ -639,7 +477,6 @@ def ai_analysis():
         return
     elif not st.session_state["full_ai_response"]:
         # 분석 진행
-        client = OpenAI(api_key=st.session_state.api_key)
         # 선택한 투자가에 따라서 AI 모델에 전달할 시스템/프롬프트 텍스트 생성
         if(selected_investor == "워렌 버핏"):
             system_text = stock_prompt.warrenBuffett_system_text()
@@ -653,32 +490,45 @@ def ai_analysis():
 
             system_text = stock_prompt.normal_system_text()
         
-        prompt_text_list = stock_prompt.normal_prompt_text(combined_stocks_data)
+        prompt_text_list = stock_prompt.normal_prompt_text(
+            combined_stocks_data,
+            prompt_format=st.session_state.get("prompt_format", "markdown"),
+            include_quant=st.session_state.get("include_quant", False),
+        )
 
         st.write(f"적용된 투자 스타일: {selected_investor}")
-        # OpenAI API 요청 (동기 방식)
-        ai_responses = []
-        # 분석을 종복별로 따로 요청을 하는 방식으로 변경 고려중 TODO
-        for idx, prompt_text in enumerate(prompt_text_list):
-            try:
-                print(f"AI 분석 진행 중... ({idx + 1}/{len(prompt_text_list)})")
-                with st.spinner(f"AI 분석 진행 중... ({idx + 1}/{len(prompt_text_list)})"):
-
-                    # langchain을 사용한 방식으로 이후 ai_chat과 연동이 되도록 변경 TODO
-                    response = client.chat.completions.create(
-                        model="gpt-4o",
-                        messages=[
-                            {"role": "system", "content": system_text},
-                            {"role": "user", "content": prompt_text}
-                        ]
-                    )
-                    ai_responses.append(response.choices[0].message.content if response.choices else "응답 없음")
-            except Exception as e:
-                ai_responses.append(f"AI 요청 중 오류 발생: {e}")
+        # OpenAI API 요청 (비동기 동시 요청, 분당 요청/토큰 한도 내에서 진행)
+        # 응답은 프롬프트 순서대로 정렬되고, 일시적인 오류는 요청별로 재시도
+        # 응답 토큰은 도착하는 대로 요청별 영역에 바로 표시 (스트리밍)
+        print(f"AI 분석 진행 중... ({len(prompt_text_list)}건 동시 요청)")
+        stream_placeholders = [st.empty() for _ in prompt_text_list]
+
+        def render_stream(idx, text):
+            stream_placeholders[idx].markdown(text)
+
+        try:
+            # langchain을 사용한 방식으로 이후 ai_chat과 연동이 되도록 변경 TODO
+            ai_responses = stock_llm.run_completions(
+                api_key=st.session_state.api_key,
+                model="gpt-4o",
+                system_text=system_text,
+                prompt_texts=prompt_text_list,
+                on_token=render_stream,
+                # 같은 종목/투자가/데이터로 다시 분석하면 저장된 응답 사용
+                cache=get_disk_cache(),
+            )
+        except Exception as e:
+            ai_responses = [f"AI 요청 중 오류 발생: {e}"]
+
+        # 스트리밍으로 표시한 내용은 지우고 아래에서 전체 결과로 다시 표시
+        for placeholder in stream_placeholders:
+            placeholder.empty()
 
         # AI 분석 결과를 session_state에 즉시 저장**
         # 데이터 양 문제인지 추가질문시 데이터 인식 못하고 연산 두번 돌림
         st.session_state["full_ai_response"] = "\n\n".join(ai_responses)
+        # 추가 질문에서 관련 문단/종목 데이터만 검색해서 쓰도록 분석이 끝난 시점에 인덱스 생성
+        get_chat_index(st.session_state["full_ai_response"], combined_stocks_data)
     st.write("AI 분석 결과")
     st.markdown(st.session_state["full_ai_response"])
     # 추가 질문 버튼
@@ -726,26 +576,36 @@ def ai_chat():
 
         # 사용자 입력
         if prompt := st.chat_input("주식 분석 관련 질문을 입력하세요!"):
-            # 사용자 메시지 저장
+            # 사용자 메시지 표시
             with st.chat_message("user"):
                 st.markdown(prompt)
-            st.session_state.chat_history.append({"role": "user", "content": prompt})
 
-            # OpenAI에 전달할 메시지 형식 맞춤
-            messages = [
-                {"role": "system", "content": "다음은 주식 분석 결과입니다. 이 내용을 기반으로 질문에 답변해주세요."},
-                {"role": "assistant", "content": st.session_state.full_ai_response},
-                {"role": "user", "content": prompt}
-            ]
+            # 전체 분석 결과 대신 요약(분석 결과가 바뀔 때만 새로 생성) + 질문 관련 종목 데이터 + 최근 대화만 전달
+            summary_key = stock_chat.analysis_key(full_ai_response)
+            if st.session_state.get("analysis_summary_key") != summary_key:
+                with st.spinner("분석 결과 요약 중..."):
+                    st.session_state["analysis_summary"], summarized = stock_chat.summarize_analysis(
+                        full_ai_response, st.session_state.api_key, cache=get_disk_cache()
+                    )
+                # 요약에 실패해서 앞부분만 자른 경우는 키를 저장하지 않고 다음 질문에서 다시 요약
+                if summarized:
+                    st.session_state["analysis_summary_key"] = summary_key
+
+            messages = stock_chat.build_chat_messages(
+                prompt,
+                st.session_state.chat_history,
+                st.session_state["analysis_summary"],
+                st.session_state.get("combined_stocks_data", {}),
+                index=get_chat_index(full_ai_response, st.session_state.get("combined_stocks_data", {})),
+            )
+            st.session_state.chat_history.append({"role": "user", "content": prompt})
 
-            # AI 응답 생성
+            # AI 응답 생성 (토큰이 도착하는 대로 표시)
             with st.chat_message("assistant"):
-                with st.spinner("분석 중..."):
-                    response = model.invoke(messages)  
-                    ai_response = response.content if response else "응답 없음"
-                    st.markdown(ai_response)
-                    
-                    st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
+                ai_response = st.write_stream(chunk.content for chunk in model.stream(messages))
+                ai_response = ai_response or "응답 없음"
+                
+                st.session_state.chat_history.append({"role": "assistant", "content": ai_response})
 
     except Exception as e:
         st.error(f"오류 발생: {str(e)}")
@@ -0,0 +1,70 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 동시 요청 개수, 종목별 제한 시간(초), 재시도 설정 (환경 변수로 변경 가능)
+MAX_WORKERS = int(os.environ.get("STOCK_PIPELINE_WORKERS", 8))
+SYMBOL_TIMEOUT = float(os.environ.get("STOCK_PIPELINE_TIMEOUT", 30))
+RETRIES = int(os.environ.get("STOCK_PIPELINE_RETRIES", 2))
+BACKOFF = 0.5
+
+
+def call_with_retry(func, item, retries=RETRIES, backoff=BACKOFF):
+    """
+    func(item)을 호출하고 예외가 나면 지수 백오프(backoff, backoff*2, ...)로 재시도
+    :return: func(item) 결과, 마지막 시도까지 실패하면 예외를 그대로 전달
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func(item)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt))
+
+
+def iter_concurrent(items, func, max_workers=MAX_WORKERS, timeout=SYMBOL_TIMEOUT,
+                    retries=RETRIES, backoff=BACKOFF):
+    """
+    I/O 위주의 작업을 스레드 풀에서 동시에 실행하고 끝나는 순서대로 결과를 반환
+    스레드에서는 Streamlit 함수를 호출하지 않도록 func에는 순수 조회 함수만 전달
+    :param items: 작업 대상 (종목 심볼 등)
+    :param func: item 하나를 받아 결과를 반환하는 함수
+    :param max_workers: 동시 실행 개수
+    :param timeout: 작업 하나가 실행을 시작한 뒤 기다릴 최대 시간(재시도 포함)
+    :return: (item, 결과, 예외) 제너레이터, 실패하면 결과는 None
+    """
+    items = list(items)
+    if not items:
+        return
+
+    started = {}
+
+    def task(item):
+        started[item] = time.monotonic()
+        return call_with_retry(func, item, retries=retries, backoff=backoff)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(task, item): item for item in items}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = futures[future]
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+
+            # 제한 시간을 넘긴 작업은 기다리지 않고 실패로 처리
+            now = time.monotonic()
+            for future in list(pending):
+                item = futures[future]
+                if item in started and now - started[item] > timeout:
+                    pending.discard(future)
+                    future.cancel()
+                    yield item, None, TimeoutError(f"{item} 작업이 {timeout}초 안에 끝나지 않았습니다.")
+    finally:
+        # 멈춘 스레드를 기다리지 않고 대기 중인 작업은 취소
+        executor.shutdown(wait=False, cancel_futures=True)
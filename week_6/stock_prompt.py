@@ -1,22 +1,20 @@
 
+import numpy as np
 import pandas as pd
-def normal_prompt_text(combined_stocks_data):
- 
-    """
-    종목 데이터를 바탕으로 일반적인 투자 분석 프롬프트를 생성
-    종목은 5개씩 묶어서 프롬프트를 생성
-    간결한 설명을 유지해 토큰 낭비 방지
+import stock_llm
+import stock_quant
+from stock_fundamental import FundamentalSnapshot, StatementSeries
 
-    """
+# 프롬프트 하나(요청 하나)에 담을 최대 토큰 수와 종목 수
+# 종목이 많을수록 응답도 길어지므로 종목 수도 함께 제한
+PROMPT_TOKEN_BUDGET = 8000
+MAX_SYMBOLS_PER_PROMPT = 20
 
-    stock_symbols = list(combined_stocks_data.keys())
-    chunk_size = 5  # 한 번에 처리할 종목 개수
-    prompt_list = []  # 최종 프롬프트 리스트
+# 종목 데이터 표현 형식: 종목별 상세 마크다운 섹션 / 종목당 한 행의 CSV 표
+PROMPT_FORMATS = ("markdown", "table")
 
-    for i in range(0, len(stock_symbols), chunk_size):
-        chunk_symbols = stock_symbols[i : i + chunk_size]
-
-        prompt_text = """
+# 모든 요청에 공통으로 들어가는 분석 지시문 (요청당 한 번만 포함)
+NORMAL_PROMPT_HEADER = """
 제공된 데이터를 바탕으로 종합적인 투자 분석을 수행하고, 적절한 투자 전략을 제시해주세요.
 
 ## 1. 기술적 분석
@@ -52,84 +50,406 @@ def normal_prompt_text(combined_stocks_data):
 주의: 이 분석은 단순 참고용이며 실제 투자 결정은 책임질 수 없음을 압니다.
 """
 
-        for symbol in chunk_symbols:
-            stock_info = combined_stocks_data[symbol]
-
-            # 최신 종가 가져오기
-            latest_close = stock_info['technical_analysis_df'].iloc[-1]['Close']
-            
-            # 숫자 단위 변환 함수 (가독성 개선)
-            def format_large_number(value):
-                """큰 숫자를 B(십억) / M(백만) 단위로 변환하고 소수점 2자리로 포맷"""
-                if isinstance(value, (int, float)):
-                    if abs(value) >= 1_000_000_000:
-                        return f"{value / 1_000_000_000:.2f}B"
-                    elif abs(value) >= 1_000_000:
-                        return f"{value / 1_000_000:.2f}M"
-                    else:
-                        return f"{value:.2f}"
-                return "N/A"
-            
-            # 재무 데이터 가공
-            def format_value(value):
-                """숫자 포맷 정리 (소수점 2자리, 단위 변환)"""
-                if isinstance(value, (int, float)):
-                    return format_large_number(value)
-                elif isinstance(value, pd.Series) and not value.empty:
-                    
-                    return ', '.join([
-                        f"({pd.to_datetime(date).strftime('%Y-%m-%d')}: {format_large_number(val)})"
-                        if isinstance(val, (int, float)) else f"({pd.to_datetime(date).strftime('%Y-%m-%d')}: N/A)"
-                        for date, val in value.tail(5).items()
-                    ])
-                return "N/A"
-
-            prompt_text += f"""
+
+def normal_prompt_text(combined_stocks_data, token_budget=PROMPT_TOKEN_BUDGET,
+                       max_symbols=MAX_SYMBOLS_PER_PROMPT, model="gpt-4o", prompt_format="markdown",
+                       include_quant=False):
+ 
+    """
+    종목 데이터를 바탕으로 일반적인 투자 분석 프롬프트를 생성
+    종목별 섹션의 토큰 수를 계산해서 지시문 + 섹션이 token_budget 안에 들어가는 만큼 묶어서 생성
+    간결한 설명을 유지해 토큰 낭비 방지
+    :param prompt_format: "markdown"(종목별 상세 섹션) 또는 "table"(종목당 한 행의 CSV 표)
+    :param include_quant: 퀀트 피처/전략 지표 포함 여부 (포함할 때만 계산)
+
+    """
+
+    if prompt_format == "table":
+        rows = [
+            symbol_table_row(symbol, stock_info, include_quant)
+            for symbol, stock_info in combined_stocks_data.items()
+        ]
+        header = TABLE_PROMPT_HEADER + (TABLE_QUANT_LEGEND if include_quant else "")
+        return pack_prompt_sections(
+            header + table_header_row(include_quant), rows, token_budget, max_symbols, model,
+            footer=TABLE_FOOTER,
+        )
+    if prompt_format != "markdown":
+        raise ValueError(f"지원하지 않는 프롬프트 형식입니다: {prompt_format}")
+
+    sections = [
+        symbol_prompt_section(symbol, stock_info, include_quant)
+        for symbol, stock_info in combined_stocks_data.items()
+    ]
+    return pack_prompt_sections(NORMAL_PROMPT_HEADER, sections, token_budget, max_symbols, model)
+
+
+def pack_prompt_sections(header, sections, token_budget=PROMPT_TOKEN_BUDGET,
+                         max_symbols=MAX_SYMBOLS_PER_PROMPT, model="gpt-4o", footer=""):
+    """
+    공통 지시문 뒤에 종목 섹션을 순서대로 채우다가 토큰 예산이나 종목 수를 넘으면 다음 프롬프트로 넘김
+    섹션 하나가 예산보다 크면 단독으로 한 프롬프트를 사용
+    :param footer: 프롬프트마다 섹션 뒤에 붙는 텍스트 (표 닫기 등)
+    :return: 프롬프트 리스트
+    """
+    header_tokens = stock_llm.count_tokens(header + footer, model)
+    prompt_list = []  # 최종 프롬프트 리스트
+    chunk, chunk_tokens = [], header_tokens
+
+    for section in sections:
+        section_tokens = stock_llm.count_tokens(section, model)
+        if chunk and (chunk_tokens + section_tokens > token_budget or len(chunk) >= max_symbols):
+            prompt_list.append(header + "".join(chunk) + footer)
+            chunk, chunk_tokens = [], header_tokens
+        chunk.append(section)
+        chunk_tokens += section_tokens
+
+    if chunk:
+        prompt_list.append(header + "".join(chunk) + footer)
+    return prompt_list
+
+
+# 종목 섹션에서 사용하는 최신 기술적 지표 컬럼
+LATEST_TECHNICAL_COLUMNS = ["Close", "SMA_20", "SMA_50", "RSI_14", "MACD", "MACD_signal", "BB_upper", "BB_lower"]
+
+# 종목 섹션 템플릿 (필드는 symbol_prompt_record의 키)
+SYMBOL_SECTION_TEMPLATE = """
 ### {symbol} 종목 분석
 #### 1. 기술적 분석
-- 종가: {format_value(latest_close)}
-- SMA 20: {format_value(stock_info['technical_analysis_df'].iloc[-1]['SMA_20'])}
-- SMA 50: {format_value(stock_info['technical_analysis_df'].iloc[-1]['SMA_50'])}
-- RSI: {format_value(stock_info['technical_analysis_df'].iloc[-1]['RSI_14'])}
-- MACD: {format_value(stock_info['technical_analysis_df'].iloc[-1]['MACD'])} / Signal: {format_value(stock_info['technical_analysis_df'].iloc[-1]['MACD_signal'])}
-- 볼린저 밴드: 상단={format_value(stock_info['technical_analysis_df'].iloc[-1]['BB_upper'])}, 하단={format_value(stock_info['technical_analysis_df'].iloc[-1]['BB_lower'])}
+- 종가: {Close}
+- SMA 20: {SMA_20}
+- SMA 50: {SMA_50}
+- RSI: {RSI_14}
+- MACD: {MACD} / Signal: {MACD_signal}
+- 볼린저 밴드: 상단={BB_upper}, 하단={BB_lower}
 
 #### 2. 재무제표 분석
-- 매출: {format_value(stock_info['fundamental_dict']['income_stmt'].get('revenue', 'N/A'))}
-- 영업이익: {format_value(stock_info['fundamental_dict']['income_stmt'].get('operating_income', 'N/A'))}
-- 총자산: {format_value(stock_info['fundamental_dict']['balance_sheet'].get('total_assets', 'N/A'))}
-- 총부채: {format_value(stock_info['fundamental_dict']['balance_sheet'].get('total_liabilities', 'N/A'))}
-- 영업현금흐름: {format_value(stock_info['fundamental_dict']['cash_flow'].get('operating_cash_flow', 'N/A'))}
-- 투자현금흐름: {format_value(stock_info['fundamental_dict']['cash_flow'].get('investing_cash_flow', 'N/A'))}
+- 매출: {revenue}
+- 영업이익: {operating_income}
+- 총자산: {total_assets}
+- 총부채: {total_liabilities}
+- 영업현금흐름: {operating_cash_flow}
+- 투자현금흐름: {investing_cash_flow}
 
 #### 3. 핵심 재무 지표
-- EPS: {format_value(stock_info['fundamental_dict']['key_metrics'].get('EPS', 'N/A'))}
-- ROE: {format_value(stock_info['fundamental_dict']['key_metrics'].get('ROE', 'N/A'))}
-- PER: {format_value(stock_info['fundamental_dict']['stock_metrics'].get('PER', 'N/A'))}
-- PBR: {format_value(stock_info['fundamental_dict']['stock_metrics'].get('PBR', 'N/A'))}
-- EV/EBITDA: {format_value(stock_info['fundamental_dict']['stock_metrics'].get('EV/EBITDA', 'N/A'))}
+- EPS: {EPS}
+- ROE: {ROE}
+- PER: {PER}
+- PBR: {PBR}
+- EV/EBITDA: {EV/EBITDA}
 
 #### 4. 성장성 및 배당
-- 매출 성장률: {format_value(stock_info['fundamental_dict']['growth_and_dividend'].get('revenue_growth', 'N/A'))}
-- EPS 성장률: {format_value(stock_info['fundamental_dict']['growth_and_dividend'].get('EPS_growth', 'N/A'))}
-- 배당수익률: {format_value(stock_info['fundamental_dict']['growth_and_dividend'].get('dividend_yield', 'N/A'))}
-- 배당성향: {format_value(stock_info['fundamental_dict']['growth_and_dividend'].get('payout_ratio', 'N/A'))}
+- 매출 성장률: {revenue_growth}
+- EPS 성장률: {EPS_growth}
+- 배당수익률: {dividend_yield}
+- 배당성향: {payout_ratio}
 """
 
-            # 보유 종목이라면 손익 계산 추가
-            if stock_info['is_holding']:
-                pnl = latest_close - stock_info['holding_info']['price']
-                pnl_rate = (pnl / stock_info['holding_info']['price']) * 100
-                prompt_text += f"""
+QUANT_SECTION_TEMPLATE = """
+#### 5. 퀀트 지표
+- 시그널: RSI 상승={RSI_Up_Flag}, MACD 골든크로스={MACD_Crossover}, SMA20>SMA50={SMA_Trend_Flag}
+- Value Score: {Value_Score} / Quality Score: {Quality_Score} / 종합 점수: {Final_Quant_Score}
+- NCAV 비율: {NCAV_Ratio} / Earnings Yield: {Magic_Formula_Earnings_Yield} / Return on Capital: {Magic_Formula_Return_on_Capital} / PEG: {PEG_Ratio}
+- Piotroski F-Score: {Piotroski_F_Score}
+"""
+
+FACTOR_SECTION_TEMPLATE = """- Fama-French 3 팩터: 알파(연율)={FF_Alpha_Annual}, 시장 베타={FF_Beta_Market}, SMB 베타={FF_Beta_SMB}, HML 베타={FF_Beta_HML}, R²={FF_R_Squared}
+"""
+
+# 정수 값인 퀀트 지표 (소수점 없이 표시)
+QUANT_FLAG_FIELDS = {"RSI_Up_Flag", "MACD_Crossover", "SMA_Trend_Flag", "Piotroski_F_Score", "Piotroski_F_Score_Items"}
+# Piotroski F-Score 전체 항목 수
+F_SCORE_MAX = 9
+
+HOLDING_SECTION_TEMPLATE = """
 #### 보유 종목 정보
-- 보유 수량: {stock_info['holding_info']['quantity']}주
-- 매수 단가: {format_value(stock_info['holding_info']['price'])}
-- 현재 손익: {format_value(pnl)} ({format_value(pnl_rate)}%)
+- 보유 수량: {quantity}주
+- 매수 단가: {price}
+- 현재 손익: {pnl} ({pnl_rate}%)
 """
 
-        prompt_list.append(prompt_text)
+# 섹션별로 프롬프트에 포함하는 재무 항목
+FUNDAMENTAL_PROMPT_FIELDS = {
+    "income_stmt": ["revenue", "operating_income"],
+    "balance_sheet": ["total_assets", "total_liabilities"],
+    "cash_flow": ["operating_cash_flow", "investing_cash_flow"],
+    "key_metrics": ["EPS", "ROE"],
+    "stock_metrics": ["PER", "PBR", "EV/EBITDA"],
+    "growth_and_dividend": ["revenue_growth", "EPS_growth", "dividend_yield", "payout_ratio"],
+}
 
-    return prompt_list
+
+def format_large_number(value):
+    """큰 숫자를 B(십억) / M(백만) 단위로 변환하고 소수점 2자리로 포맷"""
+    if isinstance(value, (int, float)):
+        if abs(value) >= 1_000_000_000:
+            return f"{value / 1_000_000_000:.2f}B"
+        elif abs(value) >= 1_000_000:
+            return f"{value / 1_000_000:.2f}M"
+        else:
+            return f"{value:.2f}"
+    return "N/A"
+
+
+def format_statement(dates, values):
+    """재무제표 행(결산일 배열, 값 배열)을 최근 5개까지 "(날짜: 값)" 목록으로 포맷"""
+    dates = np.datetime_as_string(np.asarray(dates, dtype="datetime64[ns]")[-5:], unit="D")
+    return ', '.join(
+        f"({date}: {format_large_number(val)})" for date, val in zip(dates, values[-5:])
+    )
+
+
+def format_value(value):
+    """숫자 포맷 정리 (소수점 2자리, 단위 변환)"""
+    if isinstance(value, (int, float)):
+        return format_large_number(value)
+    elif isinstance(value, StatementSeries) and len(value.values):
+        return format_statement(value.dates, value.values.tolist())
+    elif isinstance(value, pd.Series) and not value.empty:
+        return format_statement(pd.to_datetime(value.index), value.tolist())
+    return "N/A"
+
+
+def format_f_score(f_score, items):
+    """
+    F-Score를 계산 가능한 항목 수 기준으로 표시 ("4 / 4 (5개 항목 데이터 없음)")
+    값이 없는 항목은 0점이므로 9점 만점으로만 표시하면 데이터 부족이 낮은 점수로 보임
+    """
+    if f_score is None or not items:
+        return "N/A"
+    if items >= F_SCORE_MAX:
+        return f"{f_score} / {F_SCORE_MAX}"
+    return f"{f_score} / {items} ({F_SCORE_MAX - items}개 항목 데이터 없음)"
+
+
+def latest_technical_values(stock_info):
+    """최신 기술적 지표 행에서 LATEST_TECHNICAL_COLUMNS 순서의 값 리스트 추출"""
+    return stock_info['technical_analysis_df'].iloc[-1].reindex(LATEST_TECHNICAL_COLUMNS).tolist()
+
+
+def fundamental_prompt_values(stock_info):
+    """
+    FUNDAMENTAL_PROMPT_FIELDS 항목의 원본 값을 재무 섹션당 한 번씩만 조회해서 반환
+    :return: {항목 이름: 값 (재무제표 항목은 StatementSeries 또는 pd.Series)}
+    """
+    fundamental_dict = stock_info['fundamental_dict']
+    values = {}
+    for section_name, keys in FUNDAMENTAL_PROMPT_FIELDS.items():
+        if isinstance(fundamental_dict, FundamentalSnapshot):
+            section = fundamental_dict.raw(section_name)
+        else:
+            section = fundamental_dict[section_name]
+        for key in keys:
+            values[key] = section.get(key, 'N/A')
+    return values
+
+
+def symbol_prompt_record(symbol, stock_info):
+    """
+    종목 섹션에 들어갈 값을 포맷된 문자열의 평평한 딕셔너리로 추출
+    최신 기술적 지표 행과 재무 섹션은 종목당 한 번씩만 조회
+    :return: (템플릿 필드 딕셔너리, 최신 종가)
+    """
+    latest = latest_technical_values(stock_info)
+    record = {"symbol": symbol}
+    record.update(zip(LATEST_TECHNICAL_COLUMNS, map(format_value, latest)))
+    for key, value in fundamental_prompt_values(stock_info).items():
+        record[key] = format_value(value)
+    return record, latest[0]
+
+
+def quant_prompt_values(stock_info):
+    """퀀트 피처와 전략 지표를 하나의 딕셔너리로 반환 (처음 요청될 때 계산)"""
+    return {**stock_quant.get_quant_features(stock_info), **stock_quant.get_quant_strategies(stock_info)}
+
+
+def symbol_prompt_section(symbol, stock_info, include_quant=False):
+    """
+    종목 하나의 분석 데이터 섹션 텍스트 생성
+    """
+    record, latest_close = symbol_prompt_record(symbol, stock_info)
+    section = SYMBOL_SECTION_TEMPLATE.format_map(record)
+
+    if include_quant:
+        quant = quant_prompt_values(stock_info)
+        values = {
+            key: str(value) if key in QUANT_FLAG_FIELDS else format_value(value)
+            for key, value in quant.items()
+        }
+        values["Piotroski_F_Score"] = format_f_score(quant["Piotroski_F_Score"], quant["Piotroski_F_Score_Items"])
+        section += QUANT_SECTION_TEMPLATE.format_map(values)
+        if stock_info.get("factor_exposure"):
+            section += FACTOR_SECTION_TEMPLATE.format_map({
+                key: format_value(value) for key, value in stock_info["factor_exposure"].items()
+            })
+
+    # 보유 종목이라면 손익 계산 추가
+    if stock_info['is_holding']:
+        price = stock_info['holding_info']['price']
+        pnl = latest_close - price
+        pnl_rate = (pnl / price) * 100
+        section += HOLDING_SECTION_TEMPLATE.format(
+            quantity=stock_info['holding_info']['quantity'],
+            price=format_value(price),
+            pnl=format_value(pnl),
+            pnl_rate=format_value(pnl_rate),
+        )
+
+    return section
+
+
+# 간결한 표 형식: 종목당 한 행, 모든 종목이 하나의 헤더 행을 공유
+# (컬럼 이름, 값) 중 재무제표 항목은 최근 결산 값과 직전 결산 값(_prev)만 포함
+TABLE_STATEMENT_COLUMNS = ["revenue", "operating_income"]
+TABLE_COLUMNS = (
+    ["symbol", "type", "close", "sma20", "sma50", "rsi", "macd", "macd_sig", "bb_up", "bb_low", "fy"]
+    + [column for key in TABLE_STATEMENT_COLUMNS for column in (key, f"{key}_prev")]
+    + ["total_assets", "total_liabilities", "operating_cf", "investing_cf",
+       "eps", "roe", "per", "pbr", "ev_ebitda",
+       "revenue_growth", "eps_growth", "dividend_yield", "payout_ratio",
+       "qty", "buy_price", "pnl", "pnl_pct"]
+)
+
+TABLE_PROMPT_HEADER = NORMAL_PROMPT_HEADER + """
+종목 데이터는 아래 CSV 표로 제공합니다 (종목당 한 행, 빈 칸은 데이터 없음).
+- type: H=보유 종목, W=관심 종목 / B=십억, M=백만
+- fy: 최근 결산일, 재무제표 값은 최근 결산 기준이고 *_prev는 직전 결산 값
+- qty, buy_price, pnl, pnl_pct는 보유 종목의 보유 수량, 매수 단가, 현재 손익, 손익률(%)
+"""
+TABLE_FOOTER = "```\n"
+
+# 퀀트 지표 포함 시 행 끝에 붙는 컬럼 -> 퀀트 피처/전략 키
+QUANT_TABLE_COLUMNS = {
+    "rsi_up": "RSI_Up_Flag",
+    "macd_cross": "MACD_Crossover",
+    "sma_trend": "SMA_Trend_Flag",
+    "value_score": "Value_Score",
+    "quality_score": "Quality_Score",
+    "quant_score": "Final_Quant_Score",
+    "ncav_ratio": "NCAV_Ratio",
+    "earnings_yield": "Magic_Formula_Earnings_Yield",
+    "roc": "Magic_Formula_Return_on_Capital",
+    "peg": "PEG_Ratio",
+    "f_score": "Piotroski_F_Score",
+    "f_score_items": "Piotroski_F_Score_Items",
+}
+# 퀀트 지표 포함 시 이어서 붙는 Fama-French 3 팩터 컬럼 -> factor_exposure 키
+FACTOR_TABLE_COLUMNS = {
+    "ff_alpha": "FF_Alpha_Annual",
+    "ff_mkt": "FF_Beta_Market",
+    "ff_smb": "FF_Beta_SMB",
+    "ff_hml": "FF_Beta_HML",
+}
+TABLE_QUANT_LEGEND = """- rsi_up, macd_cross, sma_trend: 1이면 RSI 상승, MACD 골든크로스, SMA20>SMA50
+- value_score(PER+PBR+EV/EBITDA), quality_score(ROE), quant_score(종합), ncav_ratio, earnings_yield, roc(Return on Capital), peg: 퀀트 지표
+- f_score: Piotroski F-Score (f_score_items개 계산 가능한 항목 중 통과 수, 높을수록 재무 안정), f_score_items: 9개 항목 중 데이터가 있는 항목 수
+- ff_alpha(연율), ff_mkt, ff_smb, ff_hml: Fama-French 3 팩터 알파와 베타
+"""
+
+
+def table_header_row(include_quant=False):
+    columns = TABLE_COLUMNS + (list(QUANT_TABLE_COLUMNS) + list(FACTOR_TABLE_COLUMNS) if include_quant else [])
+    return "```csv\n" + ",".join(columns) + "\n"
+
+
+def format_cell(value):
+    """표 셀용 숫자 포맷, 숫자가 아니거나 NaN이면 빈 칸"""
+    if isinstance(value, (int, float)) and value == value:
+        return format_large_number(value)
+    return ""
+
+
+def latest_statement_values(value):
+    """
+    재무제표 행에서 (최근 결산일, 최근 값, 직전 값) 추출
+    yfinance 재무제표는 최신 결산이 앞에 오지만 순서에 의존하지 않도록 결산일로 정렬
+    """
+    if isinstance(value, StatementSeries):
+        dates, values = np.asarray(value.dates, dtype="datetime64[ns]"), value.values.tolist()
+    elif isinstance(value, pd.Series):
+        dates, values = pd.to_datetime(value.index).to_numpy(dtype="datetime64[ns]"), value.tolist()
+    else:
+        return None, None, None
+    if len(values) == 0:
+        return None, None, None
+    order = np.argsort(dates)[::-1]
+    latest_date = np.datetime_as_string(dates[order[0]], unit="D")
+    previous = values[order[1]] if len(order) > 1 else None
+    return latest_date, values[order[0]], previous
+
+
+def symbol_table_row(symbol, stock_info, include_quant=False):
+    """
+    종목 하나의 데이터를 TABLE_COLUMNS 순서의 CSV 한 행으로 생성
+    include_quant이면 QUANT_TABLE_COLUMNS 값을 뒤에 추가
+    """
+    latest = latest_technical_values(stock_info)
+    fundamentals = fundamental_prompt_values(stock_info)
+
+    statement_cells = []
+    fiscal_date = None
+    for key in TABLE_STATEMENT_COLUMNS:
+        date, value, previous = latest_statement_values(fundamentals[key])
+        fiscal_date = fiscal_date or date
+        statement_cells += [format_cell(value), format_cell(previous)]
+
+    holding_cells = ["", "", "", ""]
+    if stock_info['is_holding']:
+        price = stock_info['holding_info']['price']
+        pnl = latest[0] - price
+        holding_cells = [
+            str(stock_info['holding_info']['quantity']),
+            format_cell(price),
+            format_cell(pnl),
+            format_cell((pnl / price) * 100),
+        ]
+
+    other_cells = [
+        format_cell(latest_statement_values(fundamentals[key])[1])
+        for key in ["total_assets", "total_liabilities", "operating_cash_flow", "investing_cash_flow"]
+    ] + [
+        format_cell(fundamentals[key])
+        for key in ["EPS", "ROE", "PER", "PBR", "EV/EBITDA",
+                    "revenue_growth", "EPS_growth", "dividend_yield", "payout_ratio"]
+    ]
+
+    cells = (
+        [symbol, "H" if stock_info['is_holding'] else "W"]
+        + [format_cell(value) for value in latest]
+        + [fiscal_date or ""]
+        + statement_cells
+        + other_cells
+        + holding_cells
+    )
+    if include_quant:
+        quant = quant_prompt_values(stock_info)
+        cells += [
+            ("" if quant[key] is None else str(quant[key])) if key in QUANT_FLAG_FIELDS else format_cell(quant[key])
+            for key in QUANT_TABLE_COLUMNS.values()
+        ]
+        exposure = stock_info.get("factor_exposure") or {}
+        cells += [format_cell(exposure.get(key)) for key in FACTOR_TABLE_COLUMNS.values()]
+    return ",".join(cells) + "\n"
+
+
+def prompt_token_report(combined_stocks_data, model="gpt-4o", formats=PROMPT_FORMATS, include_quant=False):
+    """
+    프롬프트 형식별 토큰 사용량 비교
+    :return: 형식별 (프롬프트 수, 전체 토큰 수, 종목당 토큰 수) 데이터프레임
+    """
+    symbol_count = max(len(combined_stocks_data), 1)
+    report = {}
+    for prompt_format in formats:
+        prompt_list = normal_prompt_text(
+            combined_stocks_data, model=model, prompt_format=prompt_format, include_quant=include_quant
+        )
+        total_tokens = sum(stock_llm.count_tokens(prompt, model) for prompt in prompt_list)
+        report[prompt_format] = {
+            "프롬프트 수": len(prompt_list),
+            "전체 토큰 수": total_tokens,
+            "종목당 토큰 수": round(total_tokens / symbol_count, 1),
+        }
+    return pd.DataFrame.from_dict(report, orient="index")
 
 
 def normal_system_text():
@@ -0,0 +1,237 @@
+import math
+from stock_fundamental import FundamentalSnapshot, latest_statement_value
+from stock_financials import FinancialsStore, f_score_components
+
+
+def _number(value):
+    # 숫자(NaN 제외)만 float로, 나머지는 None
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and not math.isnan(value):
+        return float(value)
+    return None
+
+
+def _latest(value):
+    # 재무제표 항목은 가장 최근 결산 값, 숫자는 그대로
+    if value is None or isinstance(value, (int, float)):
+        return _number(value)
+    return _number(latest_statement_value(value))
+
+
+def _section(fundamental_dict, section):
+    # 스냅샷은 Series를 만들지 않는 원본 섹션을 사용, 재무 데이터가 없으면 빈 섹션
+    if fundamental_dict is None:
+        return {}
+    if isinstance(fundamental_dict, FundamentalSnapshot):
+        return fundamental_dict.raw(section)
+    return fundamental_dict.get(section) or {}
+
+
+def generate_quant_strategies(technical_analysis_df, fundamental_dict):
+    """
+    기술적/기본적 분석 데이터를 활용하여
+    검증된 투자가들의 공식 기준을 생성해 반환
+    재무 데이터가 없거나 일부 항목이 없으면 해당 지표는 None
+    :param technical_analysis_df: 기술적 분석 데이터 프레임
+    :param fundamental_dict: 기본적 분석 데이터 딕셔너리 또는 FundamentalSnapshot
+    :return: 퀀트 투자 전략에 활용할 공식 딕셔너리
+    """
+    balance_sheet = _section(fundamental_dict, "balance_sheet")
+    key_metrics = _section(fundamental_dict, "key_metrics")
+    stock_metrics = _section(fundamental_dict, "stock_metrics")
+    growth_dividend = _section(fundamental_dict, "growth_and_dividend")
+
+    # total_current_assets = total_assets 개념이 같은건가? 일단 데이터상 제공되는대로 진행
+    # 재무제표 항목은 여러 결산일 값이 있으므로 가장 최근 결산 값을 사용
+    total_current_assets = _latest(balance_sheet.get("total_assets"))
+    total_liabilities = _latest(balance_sheet.get("total_liabilities"))
+    shareholders_equity = _latest(balance_sheet.get("shareholders_equity"))
+    market_cap = _number(stock_metrics.get("market_cap"))
+
+    # NCAV (Net Current Asset Value) 계산
+    # 저평가된 주식을 찾기 위한 전통적인 방법 중 하나
+    # 시장이 순유동자산보다 싸게 거래 중인지 판단
+    if total_current_assets is not None and total_liabilities is not None:
+        ncav = total_current_assets - total_liabilities
+    else:
+        ncav = None
+
+    # NCAV/시가총액 비율
+    if ncav is not None and market_cap is not None and market_cap > 0:
+        ncav_ratio = ncav / market_cap
+    else:
+        ncav_ratio = None
+
+    # Magic Formula (Joel Greenblatt)
+    # 저평가 우량주를 찾기 위한 전략
+    # 종목 전체 순위는 stock_screen에서 계산하고, 여기서는 종목 하나의 두 지표만 계산
+    ebit = _number(key_metrics.get("EBITDA"))  # 근사적으로 EBIT를 EBITDA로 사용
+    ev = _number(stock_metrics.get("EV"))
+    net_working_capital = (total_current_assets or 0) - (total_liabilities or 0)
+    fixed_assets = shareholders_equity or 0
+
+    # Earnings Yield 계산 (EBIT / EV)
+    if ebit and ev and ev > 0:
+        earnings_yield = ebit / ev
+    else:
+        earnings_yield = None
+
+    # Return on Capital 계산 (EBIT / (Net Working Capital + Fixed Assets))
+    if ebit and (net_working_capital + fixed_assets) > 0:
+        return_on_capital = ebit / (net_working_capital + fixed_assets)
+    else:
+        return_on_capital = None
+
+    # Fama-French 3 공식
+    # 시장의 위험 프리미엄을 고려한 수익률 계산
+    # 팩터 데이터(시장 초과수익률, 무위험 수익률, SMB, HML)로 여러 종목을 한 번에 회귀해야 해서
+    # 종목 하나씩이 아니라 stock_factor.compute_factor_exposures에서 계산 (stock_info["factor_exposure"])
+
+    # Piotroski F-Score 재무 안전성 평가
+    # 0 ~ 9점까지, 9점은 가장 안전한 종목
+    # 최근/직전 결산 재무제표가 필요하므로 다기간 재무제표가 있는 스냅샷에서만 계산
+    # 종목 전체는 stock_financials.compute_f_scores로 한 번에 계산
+    # 값이 없는 항목은 0점이므로 계산 가능한 항목 수를 함께 저장 (데이터 부족과 낮은 점수를 구분)
+    f_score, f_score_items = None, 0
+    if isinstance(fundamental_dict, FundamentalSnapshot):
+        components, available = f_score_components(
+            FinancialsStore.from_snapshots({fundamental_dict.symbol: fundamental_dict})
+        )
+        f_score_items = int(available[0].sum())
+        if f_score_items:
+            f_score = int(components[0].sum())
+
+    # CANSLIM 전략 TODO
+    # C: Current Earnings(최근 분기 이익)
+    # A: Annual Earnings(연간 이익)
+    # N: New Products or Services(신제품, 서비스): 없는데 나중에 감정분석 추가되면 가능
+    # S: Supply and Demand(공급과 수요)
+    # L: Leader or Laggard(시장 점유율): 없음, 나중에 마법 공식 추가하면 전체 주식 비교도 들어가야하는데 이때 진행
+    # I: Institutional Sponsorship(기관 투자): 없음
+    # M: Market Direction(시장 방향): Fama-French 3 공식과 연관 있음
+
+    # PEG Ratio
+    # PER 대비 EPS 성장률을 고려한 지표
+    # 주식이 고평가되었는지 저평가되었는지 판단
+    per = _number(stock_metrics.get("PER"))  # P/E Ratio
+    eps_growth = _number(growth_dividend.get("EPS_growth"))  # EPS 성장률
+
+    if per and eps_growth and eps_growth > 0:
+        peg_ratio = per / (eps_growth * 100)  # EPS 성장률을 %로 사용하므로 *100
+        # PEG Ratio가 1보다 작으면 저평가, 1보다 크면 고평가로 판단
+    else:
+        peg_ratio = None
+
+    return {
+        "NCAV": ncav,
+        "NCAV_Ratio": ncav_ratio,
+        "Magic_Formula_Earnings_Yield": earnings_yield,
+        "Magic_Formula_Return_on_Capital": return_on_capital,
+        "PEG_Ratio": peg_ratio,
+        "Piotroski_F_Score": f_score,
+        "Piotroski_F_Score_Items": f_score_items,
+    }
+
+
+def generate_quant_features(technical_analysis_df, fundamental_dict):
+    """
+    기술적/기본적 분석 데이터를 활용하여
+    (1) 이벤트/플래그, (2) 추가 파생 지표, (3) 간단한 스코어 등을 생성해 반환합니다.
+    재무 데이터가 없거나 Value Score를 계산할 수 없으면 해당 항목은 점수에서 제외
+
+    :param technical_analysis_df: 기술적 분석 데이터 프레임
+    :param fundamental_dict: 기본적 분석 데이터 딕셔너리 또는 FundamentalSnapshot
+    :return: 퀀트 투자 전략에 활용할 피처 딕셔너리
+    """
+    # 기술적 분석: 최근 (가장 마지막 row) 기준으로 시그널 뽑기
+    # ====================================================
+    if technical_analysis_df is not None and len(technical_analysis_df) > 0:
+        # 필요한 컬럼의 마지막 두 값만 numpy 배열에서 꺼내서 사용 (행 Series 생성 비용 절약)
+        recent = {
+            column: technical_analysis_df[column].to_numpy()[-2:]
+            for column in ["RSI_14", "MACD", "MACD_signal", "SMA_20", "SMA_50"]
+        }
+        latest = {column: values[-1] for column, values in recent.items()}  # 가장 최근 날짜 행
+        prev = {column: values[0] for column, values in recent.items()}  # 바로 전날 (하루치면 최근 값)
+
+        # RSI 방향성(전일 대비 상승/하락)
+        rsi_flag = 1 if latest["RSI_14"] > prev["RSI_14"] else 0
+
+        # MACD > MACD_signal 교차 여부(골든크로스?)
+        macd_crossover = 1 if (
+            (latest["MACD"] > latest["MACD_signal"]) and
+            (prev["MACD"] <= prev["MACD_signal"])
+        ) else 0
+
+        # SMA20 vs SMA50 (단기 > 중기)
+        sma_trend = 1 if latest["SMA_20"] > latest["SMA_50"] else 0
+    else:
+        rsi_flag = macd_crossover = sma_trend = 0
+
+    # ATR, ADX, Stoch, Bollinger 밴드 이벤트 등은....TODO
+
+    # 기본적 분석: PER, PBR, EV/EBITDA 등으로 Value Score를 간단 계산
+    # ====================================================
+    key_metrics = _section(fundamental_dict, "key_metrics")
+    stock_metrics = _section(fundamental_dict, "stock_metrics")
+
+    per = _number(stock_metrics.get("PER"))
+    pbr = _number(stock_metrics.get("PBR"))
+    ev_ebitda = _number(stock_metrics.get("EV/EBITDA"))
+
+    roe = _number(key_metrics.get("ROE"))
+
+    # Value Score = (PER + PBR + EV/EBITDA)를 단순 합
+    # 종목 전체 기준 Z-score 정규화는 stock_screen의 Value_Score 참고
+    if per and pbr and ev_ebitda and all(x > 0 for x in [per, pbr, ev_ebitda]):
+        value_score = per + pbr + ev_ebitda
+    else:
+        value_score = None
+
+    # ROE가 높을수록, 혹은 FCF가 클수록 점수가 높도록
+    # 간단히 "ROE" 자체를 점수화할 수도 있고, 여러 요소 합산 가능
+    # 여기서는 ROE가 있으면 ROE 그대로, 없으면 0으로 처리 TODO
+    quality_score = roe if roe else 0
+
+    # 퀀트 스코어: 기술적 + 가치 + 퀄리티 통합 TODO
+    # ====================================================
+    # 단순히 "기술적 시그널 합 + (1 / value_score) + quality_score" 등으로 정리했는데
+    # 실제 퀀트 스코어 계산 기준은 다 다르고, 복잡하기에 일단 PASS
+    # Value Score가 없으면(밸류에이션 지표 결측/음수) 가치 항목은 0으로 처리
+
+    technical_sum = rsi_flag + macd_crossover + sma_trend  # 단순 예시
+    final_score = technical_sum + (1 / value_score if value_score else 0) + quality_score
+
+    return {
+        "RSI_Up_Flag": rsi_flag,
+        "MACD_Crossover": macd_crossover,
+        "SMA_Trend_Flag": sma_trend,
+        "Value_Score": value_score,
+        "Quality_Score": quality_score,
+        "Final_Quant_Score": final_score,
+    }
+
+
+def get_quant_features(stock_info):
+    """
+    종목 데이터의 퀀트 피처를 처음 요청될 때 계산하고 stock_info에 저장해서 재사용
+    :param stock_info: combined_stocks_data의 종목 데이터 딕셔너리
+    :return: generate_quant_features 결과
+    """
+    if stock_info.get("quant_features_dict") is None:
+        stock_info["quant_features_dict"] = generate_quant_features(
+            stock_info.get("technical_analysis_df"), stock_info.get("fundamental_dict")
+        )
+    return stock_info["quant_features_dict"]
+
+
+def get_quant_strategies(stock_info):
+    """
+    종목 데이터의 퀀트 전략 지표를 처음 요청될 때 계산하고 stock_info에 저장해서 재사용
+    :param stock_info: combined_stocks_data의 종목 데이터 딕셔너리
+    :return: generate_quant_strategies 결과
+    """
+    if stock_info.get("quant_strategies_dict") is None:
+        stock_info["quant_strategies_dict"] = generate_quant_strategies(
+            stock_info.get("technical_analysis_df"), stock_info.get("fundamental_dict")
+        )
+    return stock_info["quant_strategies_dict"]
@@ -0,0 +1,146 @@
+import re
+import math
+from collections import namedtuple, Counter
+import numpy as np
+import stock_llm
+import stock_prompt
+from stock_chat import find_symbols
+
+# BM25 파라미터 (일반적인 기본값)
+BM25_K1 = 1.5
+BM25_B = 0.75
+# 분석 결과를 나누는 문단 묶음의 최대 토큰 수
+PASSAGE_TOKENS = 200
+TOP_K = 5
+
+# 검색 단위: 텍스트, 출처("analysis" = AI 분석 결과, "data" = 종목 분석 데이터), 관련 종목
+Passage = namedtuple("Passage", ["text", "source", "symbols"])
+
+# 영문/티커, 숫자, 한글 단어
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+(?:\.[A-Za-z])?|\d+(?:\.\d+)?|[가-힣]+")
+HANGUL_PATTERN = re.compile(r"[가-힣]+")
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+
+def tokenize(text):
+    """
+    검색용 토큰 리스트
+    영문은 소문자 단어, 한글은 조사가 붙어도 맞도록 두 글자씩 끊은 바이그램 사용 ("리스크는" -> 리스, 스크, 크는)
+    """
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        if HANGUL_PATTERN.fullmatch(word) and len(word) > 2:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+class BM25Index:
+    """
+    메모리 내 BM25 검색 인덱스
+    단어별로 (문서 번호 배열, BM25 가중치 배열)을 미리 계산해 두고
+    검색할 때는 질문 단어의 가중치만 더해서 점수를 계산
+    """
+
+    def __init__(self, passages, k1=BM25_K1, b=BM25_B):
+        self.passages = list(passages)
+        counts = [Counter(tokenize(passage.text)) for passage in self.passages]
+        lengths = np.array([sum(count.values()) for count in counts], dtype=np.float64)
+        average_length = lengths.mean() if len(lengths) and lengths.mean() > 0 else 1.0
+
+        postings = {}
+        for doc, count in enumerate(counts):
+            for term, tf in count.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc)
+                postings[term][1].append(tf)
+
+        total = len(self.passages)
+        self.postings = {}
+        for term, (docs, tfs) in postings.items():
+            docs = np.array(docs)
+            tfs = np.array(tfs, dtype=np.float64)
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1 - b + b * lengths[docs] / average_length)
+            self.postings[term] = (docs, idf * tfs * (k1 + 1) / (tfs + norm))
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, query):
+        """질문에 대한 전체 문서의 BM25 점수 배열"""
+        scores = np.zeros(len(self.passages))
+        for term in set(tokenize(query)):
+            if term in self.postings:
+                docs, weights = self.postings[term]
+                scores[docs] += weights
+        return scores
+
+    def search(self, query, top_k=TOP_K):
+        """
+        점수가 높은 순서로 top_k개 검색
+        :return: [(Passage, 점수)] (점수가 0인 문서는 제외)
+        """
+        scores = self.scores(query)
+        top_k = min(top_k, int((scores > 0).sum()))
+        if top_k == 0:
+            return []
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.passages[i], float(scores[i])) for i in top]
+
+
+def analysis_passages(full_ai_response, symbols, model="gpt-4o", passage_tokens=PASSAGE_TOKENS):
+    """
+    AI 분석 결과를 제목(#) 단위 섹션으로 나누고, 섹션 안의 문단을 passage_tokens 안에서 묶어서 검색 단위로 만듦
+    섹션 제목은 각 묶음 앞에 붙여서 종목명이 본문에 없어도 검색되도록 함
+    :param symbols: 분석한 종목 (각 묶음에 나온 종목을 Passage.symbols로 기록)
+    """
+    passages = []
+    heading, chunk, chunk_tokens = "", [], 0
+
+    def flush():
+        if chunk:
+            text = "\n\n".join(([heading] if heading else []) + chunk)
+            passages.append(Passage(text, "analysis", tuple(find_symbols(text, symbols))))
+        chunk.clear()
+
+    for paragraph in full_ai_response.split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        first_line, _, rest = paragraph.partition("\n")
+        if HEADING_PATTERN.match(first_line):
+            flush()
+            heading, chunk_tokens = first_line, 0
+            paragraph = rest.strip()
+            if not paragraph:
+                continue
+        tokens = stock_llm.count_tokens(paragraph, model)
+        if chunk and chunk_tokens + tokens > passage_tokens:
+            flush()
+            chunk_tokens = 0
+        chunk.append(paragraph)
+        chunk_tokens += tokens
+    flush()
+    return passages
+
+
+def data_passages(combined_stocks_data, include_quant=False):
+    """종목별 분석 데이터 섹션(실제 수치)을 종목당 하나의 검색 단위로 만듦"""
+    return [
+        Passage(stock_prompt.symbol_prompt_section(symbol, stock_info, include_quant), "data", (symbol,))
+        for symbol, stock_info in combined_stocks_data.items()
+    ]
+
+
+def build_chat_index(full_ai_response, combined_stocks_data, include_quant=False, model="gpt-4o"):
+    """
+    추가 질문 검색용 인덱스 생성 (AI 분석 결과 문단 + 종목별 분석 데이터)
+    :return: BM25Index
+    """
+    return BM25Index(
+        analysis_passages(full_ai_response, combined_stocks_data, model)
+        + data_passages(combined_stocks_data, include_quant)
+    )
@@ -0,0 +1,170 @@
+import warnings
+import numpy as np
+import pandas as pd
+from stock_fundamental import latest_statement_value, KEY_METRICS_INFO, STOCK_METRICS_INFO, GROWTH_AND_DIVIDEND_INFO
+
+# 스크리닝 테이블 컬럼 -> (재무 섹션 항목 또는 info 키)
+# 재무제표 항목은 최근 결산 값, info 항목은 조회 시점 값
+STATEMENT_COLUMNS = ["total_assets", "total_liabilities", "shareholders_equity"]
+INFO_COLUMNS = {
+    "market_cap": STOCK_METRICS_INFO["market_cap"],
+    "EV": STOCK_METRICS_INFO["EV"],
+    "EBITDA": KEY_METRICS_INFO["EBITDA"],
+    "ROE": KEY_METRICS_INFO["ROE"],
+    "PER": STOCK_METRICS_INFO["PER"],
+    "PBR": STOCK_METRICS_INFO["PBR"],
+    "EV/EBITDA": STOCK_METRICS_INFO["EV/EBITDA"],
+    "EPS_growth": GROWTH_AND_DIVIDEND_INFO["EPS_growth"],
+}
+TABLE_COLUMNS = STATEMENT_COLUMNS + list(INFO_COLUMNS)
+
+# Value Score에 사용하는 밸류에이션 지표 (낮을수록 저평가)
+VALUE_COLUMNS = ["PER", "PBR", "EV/EBITDA"]
+# 이상치 하나가 평균/표준편차를 끌고 가지 않도록 Z-score 범위 제한
+Z_SCORE_CLIP = 3.0
+
+# 정렬 기준 컬럼 -> 작을수록 상위인지 여부
+RANKINGS = {
+    "Magic_Formula_Rank": True,
+    "Composite_Score": False,
+    "Value_Score": False,
+    "Quality_Score": False,
+    "NCAV_Ratio": False,
+    "PEG_Ratio": True,
+    "F_Score": False,
+    "F_Score_Ratio": False,
+}
+# F_Score_Ratio(통과 항목 / 계산 가능한 항목)를 구하는 최소 계산 가능 항목 수
+# 항목이 너무 적으면 한두 개 통과만으로 비율이 1.0이 되어 상위로 올라오므로 제외
+F_SCORE_MIN_ITEMS = 6
+
+
+def build_fundamental_table(snapshots):
+    """
+    종목별 FundamentalSnapshot을 종목(행) x 지표(열)의 float64 테이블로 변환
+    :param snapshots: {종목: FundamentalSnapshot}
+    :return: TABLE_COLUMNS 컬럼의 데이터프레임 (값이 없으면 NaN)
+    """
+    symbols = sorted(snapshots)
+    data = np.full((len(symbols), len(TABLE_COLUMNS)), np.nan)
+    for row, symbol in enumerate(symbols):
+        snapshot = snapshots[symbol]
+        for col, key in enumerate(STATEMENT_COLUMNS):
+            data[row, col] = latest_statement_value(snapshot.statements.get(key))
+        for col, info_key in enumerate(INFO_COLUMNS.values(), start=len(STATEMENT_COLUMNS)):
+            value = snapshot.info.get(info_key)
+            if value is not None:
+                data[row, col] = value
+    return pd.DataFrame(data, index=pd.Index(symbols, name="symbol"), columns=TABLE_COLUMNS)
+
+
+def _z_score(values):
+    # 종목 전체 기준 Z-score (결측치는 평균/표준편차 계산에서 제외)
+    with warnings.catch_warnings():
+        # 값이 하나도 없는 지표는 경고 없이 NaN으로 처리
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    std = np.where(std > 0, std, np.nan)
+    return np.clip((values - mean) / std, -Z_SCORE_CLIP, Z_SCORE_CLIP)
+
+
+def _rank(values, ascending):
+    # 1위부터 순위 (값이 같으면 같은 순위, 결측치는 NaN)
+    return pd.Series(values).rank(ascending=ascending, method="min").to_numpy()
+
+
+def compute_screening_metrics(table, min_market_cap=0, f_scores=None):
+    """
+    종목 전체를 대상으로 퀀트 지표를 벡터 연산으로 계산하고 순위를 매김
+    지표 정의는 generate_quant_strategies / generate_quant_features와 동일하고
+    Value/Quality Score는 종목 전체 기준 Z-score, Magic Formula는 두 순위의 합으로 계산
+    :param table: build_fundamental_table 결과
+    :param min_market_cap: Magic Formula 순위에 포함할 최소 시가총액
+    :param f_scores: stock_financials.compute_f_scores 결과, 있으면 F_Score/F_Score_Items/F_Score_Ratio 컬럼으로 추가
+        (계산 가능한 항목이 없는 종목의 F_Score는 0점이 아니라 NaN)
+    :return: 입력 컬럼 + 지표/순위 컬럼의 데이터프레임
+    """
+    columns = {name: table[name].to_numpy(dtype=np.float64) for name in TABLE_COLUMNS}
+    market_cap = columns["market_cap"]
+    ev = columns["EV"]
+    ebit = columns["EBITDA"]  # 근사적으로 EBIT를 EBITDA로 사용
+    per = columns["PER"]
+    eps_growth = columns["EPS_growth"]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # NCAV (총자산을 유동자산 대신 사용, 데이터상 제공되는대로 진행)
+        ncav = columns["total_assets"] - columns["total_liabilities"]
+        ncav_ratio = np.where(market_cap > 0, ncav / market_cap, np.nan)
+
+        # Magic Formula: Earnings Yield (EBIT / EV), Return on Capital (EBIT / (순운전자본 + 고정자산))
+        capital = ncav + columns["shareholders_equity"]
+        has_ebit = np.nan_to_num(ebit) != 0
+        earnings_yield = np.where(has_ebit & (ev > 0), ebit / ev, np.nan)
+        return_on_capital = np.where(has_ebit & (capital > 0), ebit / capital, np.nan)
+
+        # PEG Ratio (EPS 성장률을 %로 사용하므로 *100)
+        # 적자 기업(PER < 0)의 PEG는 순위에서 가장 저평가로 잡히므로 제외
+        peg_ratio = np.where((per > 0) & (eps_growth > 0), per / (eps_growth * 100), np.nan)
+
+    # Value Score: PER, PBR, EV/EBITDA가 모두 양수인 종목끼리 Z-score를 구해서 평균
+    # 지표가 낮을수록 저평가이므로 부호를 바꿔서 높을수록 좋은 점수로 사용
+    value_inputs = np.column_stack([columns[name] for name in VALUE_COLUMNS])
+    value_inputs[~np.all(value_inputs > 0, axis=1)] = np.nan
+    value_score = -_z_score(value_inputs).mean(axis=1)
+
+    # Quality Score: ROE의 Z-score
+    quality_score = _z_score(columns["ROE"])
+    composite_score = np.nansum(np.column_stack([value_score, quality_score]), axis=1)
+    composite_score[np.isnan(value_score) & np.isnan(quality_score)] = np.nan
+
+    # Magic Formula 순위: 두 지표의 순위 합이 작을수록 상위 (최소 시가총액 미만은 제외)
+    eligible = ~np.isnan(earnings_yield) & ~np.isnan(return_on_capital) & (market_cap >= min_market_cap)
+    magic_rank = np.full(len(table), np.nan)
+    if eligible.any():
+        rank_sum = (
+            _rank(earnings_yield[eligible], ascending=False)
+            + _rank(return_on_capital[eligible], ascending=False)
+        )
+        magic_rank[eligible] = _rank(rank_sum, ascending=True)
+
+    metrics = pd.DataFrame(
+        {
+            "NCAV": ncav,
+            "NCAV_Ratio": ncav_ratio,
+            "Magic_Formula_Earnings_Yield": earnings_yield,
+            "Magic_Formula_Return_on_Capital": return_on_capital,
+            "Magic_Formula_Rank": magic_rank,
+            "PEG_Ratio": peg_ratio,
+            "Value_Score": value_score,
+            "Quality_Score": quality_score,
+            "Composite_Score": composite_score,
+        },
+        index=table.index,
+    )
+    if f_scores is not None:
+        # 값이 없는 항목은 0점으로 계산되므로 데이터가 없는 종목과 재무가 약한 종목을 구분
+        f_score = f_scores["F_Score"].reindex(table.index).astype(np.float64)
+        f_score_items = f_scores["F_Score_Items"].reindex(table.index).astype(np.float64)
+        metrics["F_Score"] = f_score.where(f_score_items > 0)
+        metrics["F_Score_Items"] = f_score_items
+        metrics["F_Score_Ratio"] = (f_score / f_score_items).where(f_score_items >= F_SCORE_MIN_ITEMS)
+    else:
+        metrics["F_Score"] = np.nan
+        metrics["F_Score_Items"] = np.nan
+        metrics["F_Score_Ratio"] = np.nan
+    return pd.concat([table, metrics], axis=1)
+
+
+def screen_top(metrics, ranking="Magic_Formula_Rank", top_n=20):
+    """
+    계산된 지표에서 정렬 기준 상위 top_n 종목 반환 (정렬 기준 값이 없는 종목은 제외)
+    :param metrics: compute_screening_metrics 결과
+    :param ranking: RANKINGS의 키 (정렬 기준 컬럼)
+    """
+    if ranking not in RANKINGS:
+        raise ValueError(f"지원하지 않는 정렬 기준입니다: {ranking}")
+    ranked = metrics[metrics[ranking].notna()]
+    if RANKINGS[ranking]:
+        return ranked.nsmallest(top_n, ranking)
+    return ranked.nlargest(top_n, ranking)
@@ -0,0 +1,46 @@
+# 세션(st.session_state)에 저장하는 종목 데이터 모델
+# 전체 기술적 지표 이력은 프로세스에서 공유하는 저장소에만 두고
+# 세션에는 화면/프롬프트가 실제로 사용하는 최근 행 요약과 공유 객체 참조만 보관
+
+# 세션에 보관하는 최근 기술적 지표 행 수
+# 화면 요약(tail 5행), 프롬프트(최신 행), 퀀트 피처(최근 2행)가 사용하는 범위
+SUMMARY_ROWS = 5
+
+
+def technical_summary(technical_df, rows=SUMMARY_ROWS):
+    """
+    전체 기술적 지표 데이터프레임에서 최근 rows개 행만 복사
+    슬라이스를 그대로 저장하면 원본 배열 전체가 세션에 묶여 있으므로 복사본으로 저장
+    :param technical_df: 기술적 지표 데이터프레임 (없으면 None)
+    :return: 최근 rows개 행의 데이터프레임
+    """
+    if technical_df is None:
+        return None
+    return technical_df.tail(rows).copy()
+
+
+def build_stock_info(symbol, technical_df, fundamental_dict, favorite_stocks, holding_stocks):
+    """
+    세션에 저장할 종목 데이터 딕셔너리 생성
+    technical_analysis_df에는 최근 행 요약만 저장 (전체 이력은 공유 저장소에서 종목으로 조회)
+    퀀트 피처/전략은 화면이나 프롬프트에서 처음 요청할 때 계산
+    (stock_quant.get_quant_features / get_quant_strategies가 계산 후 여기에 저장)
+    :param symbol: 종목 심볼
+    :param technical_df: 종목의 전체 기술적 지표 데이터프레임
+    :param fundamental_dict: 재무 데이터 스냅샷
+    :param favorite_stocks: 관심 종목 리스트
+    :param holding_stocks: 보유 종목 딕셔너리 리스트
+    :return: combined_stocks_data의 종목 데이터 딕셔너리
+    """
+    holding_info = next((h for h in holding_stocks if h['symbol'] == symbol), None)
+    return {
+        "symbol": symbol,
+        "is_favorite": symbol in favorite_stocks,
+        "holding_info": holding_info,
+        "is_holding": holding_info is not None,
+        "technical_analysis_df": technical_summary(technical_df),
+        "fundamental_dict": fundamental_dict,
+        "quant_features_dict": None,
+        "quant_strategies_dict": None,
+    }
+
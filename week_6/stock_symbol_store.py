@@ -0,0 +1,238 @@
+import os
+import copy
+import time
+import threading
+from dataclasses import dataclass
+import pandas as pd
+import stock_data
+import stock_indicator
+import stock_fundamental
+import stock_pipeline
+
+# 공유 종목 데이터를 다시 계산하는 주기(초), 환경 변수로 변경 가능
+REFRESH_INTERVAL = int(os.environ.get("STOCK_SYMBOL_REFRESH", 60 * 60))
+# 처음 보는 종목(또는 상태를 다시 만드는 종목)의 이력 기간
+# 이후 갱신 때 받는 최근 봉 기간은 stock_indicator.update_period로 마지막 반영 날짜에서 계산
+HISTORY_PERIOD = "6mo"
+HISTORY_MONTHS = 6
+
+
+@dataclass(frozen=True)
+class SymbolData:
+    """
+    종목 하나의 공유 데이터 (모든 세션이 같은 객체를 읽기만 함)
+    세션에 저장할 값은 stock_session.build_stock_info로 요약/복사해서 사용
+    """
+
+    symbol: str
+    technical_df: pd.DataFrame
+    fundamental: stock_fundamental.FundamentalSnapshot
+    updated_at: float
+
+
+class SymbolDataStore:
+    """
+    프로세스 전체에서 공유하는 종목 데이터 저장소
+    종목마다 기술적 지표와 재무 스냅샷을 refresh_interval 동안 한 번만 계산하고
+    모든 사용자 세션에 같은 SymbolData를 반환 (요청/메모리가 사용자 수가 아니라 종목 수에 비례)
+    기술적 지표는 종목별 IndicatorState를 이어받아 새 봉만 반영
+    여러 프로세스 사이에서는 DiskCache(SQLite)를 통해 처음 받는 이력/재무 데이터를 공유
+    """
+
+    def __init__(self, cache=None, refresh_interval=REFRESH_INTERVAL, downloader=None, clock=time.time):
+        self.cache = cache
+        self.refresh_interval = refresh_interval
+        self.downloader = downloader
+        self.clock = clock
+        self._states = {}  # 종목 -> IndicatorState (항상 _data와 같은 종목)
+        self._data = {}  # 종목 -> SymbolData
+        # 같은 종목을 여러 세션이 동시에 갱신하지 않도록 종목별 잠금을 사용하고
+        # 저장소 전체 잠금은 _data/_states를 읽고 교체할 때만 짧게 잡음 (다른 종목을 갱신하는 세션은 기다리지 않음)
+        self._symbol_locks = {}  # 종목 -> threading.Lock
+        self._lock = threading.Lock()
+
+    def __contains__(self, symbol):
+        return symbol in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, symbol):
+        """종목의 공유 데이터 (없으면 None)"""
+        return self._data.get(symbol)
+
+    def stale_symbols(self, symbols):
+        """데이터가 없거나 refresh_interval이 지난 종목"""
+        now = self.clock()
+        with self._lock:
+            return [
+                symbol for symbol in symbols
+                if symbol not in self._data or now - self._data[symbol].updated_at >= self.refresh_interval
+            ]
+
+    def refresh(self, symbols, on_progress=None, on_symbol=None):
+        """
+        오래된 종목만 다시 계산하고 요청한 종목의 공유 데이터를 반환
+        다른 세션이 갱신 중인 종목은 직접 받지 않고 그 갱신이 끝나기를 기다린 뒤 결과를 사용
+        갱신에 실패한 종목은 이전 데이터가 있으면 그대로 사용
+        :param symbols: 종목 심볼 리스트
+        :param on_progress: 재무 데이터 조회가 끝날 때마다 (완료 수, 전체 수, 종목)으로 호출 (호출한 스레드에서 실행)
+        :param on_symbol: 종목 데이터가 준비될 때마다 (종목, SymbolData)로 호출 (호출한 스레드에서 실행)
+            갱신이 필요 없는 종목은 바로, 갱신하는 종목은 재무 데이터가 도착하는 순서대로 호출
+        :return: ({종목: SymbolData}, {종목: 예외})
+        """
+        errors, reported = {}, set()
+
+        def report(symbol, data):
+            reported.add(symbol)
+            if on_symbol is not None:
+                on_symbol(symbol, data)
+
+        def report_fresh(candidates):
+            # 갱신할 필요가 없는(다른 세션이 갱신을 끝낸) 종목은 바로 전달하고, 아직 오래된 종목을 반환
+            stale = self.stale_symbols(candidates)
+            for symbol in candidates:
+                if symbol not in stale and symbol not in reported:
+                    report(symbol, self._data[symbol])
+            return stale
+
+        pending = report_fresh(list(symbols))
+        total, completed = len(pending), 0
+        while pending:
+            owned = self._acquire(pending)
+            try:
+                # 기다리는 동안 다른 세션이 갱신했을 수 있으므로 잠금 안에서 다시 확인
+                stale = report_fresh(owned)
+                if stale:
+                    progress = None
+                    if on_progress is not None:
+                        def progress(done_count, _, symbol, offset=completed):
+                            on_progress(offset + done_count, total, symbol)
+                    self._refresh_symbols(stale, errors, progress, report)
+            finally:
+                for symbol in owned:
+                    self._symbol_locks[symbol].release()
+            completed += len(owned)
+            # 다른 세션이 갱신 중이던 종목은 끝난 뒤 다시 확인하고, 그 갱신이 실패했으면 직접 갱신
+            pending = report_fresh([symbol for symbol in pending if symbol not in owned])
+
+        with self._lock:
+            result = {symbol: self._data[symbol] for symbol in symbols if symbol in self._data}
+        # 갱신에 실패해서 이전 데이터를 그대로 쓰는 종목
+        for symbol, data in result.items():
+            if symbol not in reported:
+                report(symbol, data)
+        return result, errors
+
+    def _acquire(self, symbols):
+        """
+        다른 세션이 갱신 중이 아닌 종목의 잠금을 모두 가져옴
+        전부 갱신 중이면 첫 종목의 갱신이 끝날 때까지 기다림 (다른 잠금을 쥔 채 기다리지 않으므로 교착 없음)
+        :return: 잠금을 가져온 종목 리스트
+        """
+        with self._lock:
+            locks = [self._symbol_locks.setdefault(symbol, threading.Lock()) for symbol in symbols]
+        owned = [symbol for symbol, lock in zip(symbols, locks) if lock.acquire(blocking=False)]
+        if not owned:
+            locks[0].acquire()
+            owned = [symbols[0]]
+        return owned
+
+    def _refresh_symbols(self, symbols, errors, on_progress, on_symbol):
+        # 잠금을 가져온 종목만 다운로드/계산하고, 종목마다 재무 데이터가 도착하는 대로 저장소 잠금 안에서 교체
+        with self._lock:
+            previous = {symbol: self._data[symbol] for symbol in symbols if symbol in self._data}
+            states = {symbol: self._states[symbol] for symbol in previous}
+        technical_dict, new_states = self._refresh_technicals(symbols, previous, states, errors)
+        now = self.clock()
+
+        def store(symbol, snapshot):
+            data = SymbolData(symbol, technical_dict[symbol], snapshot, now)
+            # 지표 상태와 데이터프레임을 같이 바꿔야 다음 갱신 때 이어짐
+            with self._lock:
+                self._data[symbol] = data
+                self._states[symbol] = new_states[symbol]
+            on_symbol(symbol, data)
+
+        fetched = [symbol for symbol in symbols if technical_dict.get(symbol) is not None]
+        snapshots = self._refresh_fundamentals(fetched, errors, on_progress, store)
+        # 재무 데이터만 실패한 종목은 이전 스냅샷으로 기술적 지표만 갱신
+        for symbol in fetched:
+            if symbol not in snapshots and symbol in previous:
+                store(symbol, previous[symbol].fundamental)
+
+    def _refresh_technicals(self, symbols, previous, states, errors):
+        # 처음 보는 종목은 전체 이력으로 상태를 만들고, 기존 종목은 마지막 반영 이후의 봉만 받아서 반영
+        # 공백이 길거나 받은 봉이 마지막 반영 날짜부터 이어지지 않으면 전체 이력으로 상태를 다시 만듦
+        # 기존 상태는 복사해서 갱신하므로 실패해도 저장된 상태와 데이터프레임이 어긋나지 않음
+        # 처음 보는 종목만 디스크 캐시를 사용하고, 기존 종목의 갱신은 캐시(ohlcv TTL이 갱신 주기보다 긺)를 거치지 않고 받음
+        now = pd.Timestamp(self.clock(), unit="s")
+        new_symbols = [symbol for symbol in symbols if symbol not in states]
+        rebuild_symbols = []
+        update_groups = {}  # 다운로드 기간 -> 종목
+        for symbol, state in states.items():
+            period = stock_indicator.update_period(state.last_date, now)
+            if period is None:
+                rebuild_symbols.append(symbol)
+            else:
+                update_groups.setdefault(period, []).append(symbol)
+        technical_dict, new_states = {}, {}
+        try:
+            for period, group in update_groups.items():
+                ohlcv_dict = stock_data.download_ohlcv(group, period=period, interval="1d", downloader=self.downloader)
+                for symbol in group:
+                    ohlcv = ohlcv_dict.get(symbol)
+                    if stock_indicator.has_gap(states[symbol], ohlcv):
+                        rebuild_symbols.append(symbol)
+                        continue
+                    new_states[symbol] = copy.deepcopy(states[symbol])
+                    technical_dict[symbol] = stock_indicator.append_bars(
+                        previous[symbol].technical_df, new_states[symbol], ohlcv
+                    )
+            for history_symbols, cache in ((new_symbols, self.cache), (rebuild_symbols, None)):
+                if not history_symbols:
+                    continue
+                ohlcv_dict = stock_data.download_ohlcv(
+                    history_symbols, period=HISTORY_PERIOD, interval="1d", downloader=self.downloader, cache=cache
+                )
+                for symbol, ohlcv in ohlcv_dict.items():
+                    if ohlcv is not None:
+                        new_states[symbol], technical_dict[symbol] = stock_indicator.build_indicator_state(ohlcv)
+        except Exception as e:
+            for symbol in symbols:
+                errors.setdefault(symbol, e)
+
+        for symbol in symbols:
+            technical_df = technical_dict.get(symbol)
+            if technical_df is None or technical_df.empty:
+                technical_dict[symbol] = None
+                errors.setdefault(symbol, ValueError(f"{symbol} 데이터를 가져오지 못했습니다."))
+                continue
+            # 화면/프롬프트에는 최근 6개월만 사용, 지표 상태는 그대로 이어짐
+            # 프로세스가 유지되는 동안 보관하므로 지표 컬럼은 float32로 저장
+            start = technical_df.index[-1] - pd.DateOffset(months=HISTORY_MONTHS)
+            technical_dict[symbol] = stock_indicator.compact_technical_frame(technical_df[technical_df.index > start])
+        return technical_dict, new_states
+
+    def _refresh_fundamentals(self, symbols, errors, on_progress, on_snapshot):
+        # 캐시에 있는 종목은 한 번에 읽고, 없는 종목만 동시에 조회
+        # 스냅샷이 준비될 때마다 on_snapshot(종목, 스냅샷) 호출 (캐시에 있는 종목은 바로)
+        snapshots = stock_fundamental.load_cached_snapshots(symbols, self.cache) if self.cache is not None else {}
+        for symbol, snapshot in snapshots.items():
+            on_snapshot(symbol, snapshot)
+        missing = [symbol for symbol in symbols if symbol not in snapshots]
+        done_count = len(snapshots)
+        if on_progress is not None and done_count:
+            on_progress(done_count, len(symbols), None)
+        for symbol, snapshot, error in stock_pipeline.iter_concurrent(
+            missing, lambda s: stock_fundamental.fetch_fundamental_snapshot(s, cache=self.cache)
+        ):
+            done_count += 1
+            if error is not None:
+                errors[symbol] = error
+            else:
+                snapshots[symbol] = snapshot
+                on_snapshot(symbol, snapshot)
+            if on_progress is not None:
+                on_progress(done_count, len(symbols), symbol)
+        return snapshots
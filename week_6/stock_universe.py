@@ -0,0 +1,116 @@
+import os
+import time
+import threading
+import pandas as pd
+from stock_cache import CACHE_DIR_ENV, DEFAULT_CACHE_DIR
+
+# S&P 500 종목 목록 출처 (위키백과)
+SP500_URL = "https://en.wikipedia.org/wiki/List_of_S%26P_500_companies"
+# 위키백과 표 컬럼 -> 스냅샷 컬럼
+SOURCE_COLUMNS = {"Symbol": "symbol", "Security": "name", "GICS Sector": "sector"}
+UNIVERSE_COLUMNS = list(SOURCE_COLUMNS.values())
+
+# 스냅샷 파일 위치 (환경 변수로 지정하지 않으면 캐시 디렉토리에 저장)
+# 오프라인 환경에서는 미리 받아 둔 스냅샷 CSV를 STOCK_UNIVERSE_FILE로 지정
+UNIVERSE_FILE_ENV = "STOCK_UNIVERSE_FILE"
+# 스냅샷을 다시 받는 주기(초), 종목 편입/편출은 드물어서 하루 한 번이면 충분
+UNIVERSE_MAX_AGE = int(os.environ.get("STOCK_UNIVERSE_MAX_AGE", 24 * 60 * 60))
+
+_refresh_lock = threading.Lock()
+_refresh_thread = None
+
+
+def universe_path():
+    """로컬 스냅샷 파일 경로 (STOCK_UNIVERSE_FILE, 없으면 캐시 디렉토리)"""
+    return os.environ.get(UNIVERSE_FILE_ENV) or os.path.join(
+        os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR), "sp500_universe.csv"
+    )
+
+
+def fetch_sp500_universe():
+    """
+    위키백과 페이지에서 S&P 500 종목 목록을 가져옴 (네트워크, lxml 필요)
+    :return: symbol 인덱스, name/sector 컬럼의 데이터프레임
+    """
+    table = pd.read_html(SP500_URL)[0]
+    universe = table[list(SOURCE_COLUMNS)].rename(columns=SOURCE_COLUMNS)
+    return universe.set_index("symbol").sort_index()
+
+
+def save_universe(universe, path=None):
+    """스냅샷을 CSV로 저장 (읽는 쪽이 쓰는 중인 파일을 보지 않도록 임시 파일에 쓰고 교체)"""
+    path = path or universe_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    universe.to_csv(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_universe(path):
+    """스냅샷 CSV를 읽음, 파일이 없으면 None"""
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, index_col="symbol", dtype=str, keep_default_na=False)
+
+
+def load_universe(path=None):
+    """
+    S&P 500 종목 스냅샷을 로컬 파일에서 읽음
+    스냅샷이 없을 때(처음 실행)만 위키백과에서 받아서 저장
+    받지 못하면(오프라인 등) 빈 목록을 반환하고, 이후 start_background_refresh가 스냅샷을 채움
+    :param path: 로컬 스냅샷 경로, 없으면 universe_path()
+    :return: symbol 인덱스, name/sector 컬럼의 데이터프레임 (받지 못하면 빈 데이터프레임)
+    """
+    path = path or universe_path()
+    universe = read_universe(path)
+    if universe is not None:
+        return universe
+    try:
+        universe = fetch_sp500_universe()
+    except Exception as e:
+        print(f"Error fetching S&P 500 universe: {e}")
+        return empty_universe()
+    save_universe(universe, path)
+    return universe
+
+
+def empty_universe():
+    """종목이 없는 스냅샷 (load_universe와 같은 컬럼)"""
+    return pd.DataFrame(columns=UNIVERSE_COLUMNS[1:], index=pd.Index([], name="symbol"), dtype=str)
+
+
+def is_stale(path=None, max_age=UNIVERSE_MAX_AGE):
+    """로컬 스냅샷이 없거나 max_age보다 오래됐는지 여부"""
+    path = path or universe_path()
+    return not os.path.exists(path) or time.time() - os.path.getmtime(path) > max_age
+
+
+def refresh_universe(path=None):
+    """
+    위키백과에서 종목 목록을 다시 받아서 로컬 스냅샷을 교체
+    :return: 새 스냅샷, 실패하면 None (기존 스냅샷은 그대로 유지)
+    """
+    try:
+        universe = fetch_sp500_universe()
+    except Exception as e:
+        print(f"Error refreshing S&P 500 universe: {e}")
+        return None
+    save_universe(universe, path)
+    return universe
+
+
+def start_background_refresh(path=None, max_age=UNIVERSE_MAX_AGE):
+    """
+    스냅샷이 오래됐으면 페이지 렌더링과 별도로 백그라운드 스레드에서 갱신
+    이미 갱신 중이면 새로 시작하지 않음
+    :return: 갱신 스레드를 시작했는지 여부
+    """
+    global _refresh_thread
+    with _refresh_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return False
+        if not is_stale(path, max_age):
+            return False
+        _refresh_thread = threading.Thread(target=refresh_universe, args=(path,), daemon=True)
+        _refresh_thread.start()
+        return True
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# stock_data/stock_fundamental은 모듈을 불러올 때 yfinance를 import (데이터는 로컬 CSV만 사용)
+pytest.importorskip("yfinance")
+
+import stock_data
+import stock_indicator
+import stock_fundamental
+from stock_symbol_store import SymbolDataStore
+
+# 로컬 CSV 종목별 봉 개수 (6개월 이력 기간 안에 모두 들어가서 전체 재계산과 같은 봉을 사용)
+BAR_COUNTS = {"AAA": 110, "BBB": 95, "CCC": 60}
+LAST_DATE = pd.Timestamp("2024-06-28")  # 금요일
+NEW_DATES = pd.bdate_range("2024-07-01", periods=2)
+
+
+def make_ohlcv(dates, seed):
+    """랜덤 워크 OHLCV 데이터프레임 (High >= Open/Close >= Low)"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(dates))))
+    open_ = close * (1 + rng.normal(0, 0.005, len(dates)))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, len(dates)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, len(dates)))
+    volume = rng.integers(1_000_000, 5_000_000, len(dates)).astype(float)
+    frame = pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+    return frame
+
+
+def write_csv(data_dir, symbol, frame):
+    frame.to_csv(data_dir / f"{symbol}.csv")
+
+
+def full_recompute(ohlcv):
+    """전체 봉을 처음부터 다시 계산한 기술적 지표 (저장소와 같은 float32 컬럼)"""
+    _, technical_df = stock_indicator.build_indicator_state(ohlcv)
+    return stock_indicator.compact_technical_frame(technical_df)
+
+
+def assert_technical_equal(actual, expected):
+    pd.testing.assert_frame_equal(
+        actual[expected.columns], expected, check_dtype=False, check_freq=False, rtol=1e-5
+    )
+
+
+@pytest.fixture
+def histories(tmp_path):
+    """종목별 이력을 로컬 CSV로 저장하고 {종목: OHLCV}를 반환 (종목마다 시작일이 달라 날짜 합집합에 빈 행이 생김)"""
+    frames = {}
+    for seed, (symbol, count) in enumerate(BAR_COUNTS.items()):
+        frames[symbol] = make_ohlcv(pd.bdate_range(end=LAST_DATE, periods=count), seed)
+        write_csv(tmp_path, symbol, frames[symbol])
+    return frames
+
+
+def test_download_ohlcv_splits_local_csv(tmp_path, histories):
+    source = stock_data.LocalOhlcvSource(str(tmp_path))
+    ohlcv_dict = stock_data.download_ohlcv(list(histories) + ["MISSING"], period="6mo", downloader=source)
+
+    assert ohlcv_dict["MISSING"] is None
+    for symbol, expected in histories.items():
+        pd.testing.assert_frame_equal(ohlcv_dict[symbol], expected, check_freq=False, check_names=False)
+
+
+def test_bulk_indicators_match_full_recompute(tmp_path, histories):
+    source = stock_data.LocalOhlcvSource(str(tmp_path))
+    ohlcv_dict = stock_data.download_ohlcv(list(histories), period="6mo", downloader=source)
+    bulk = stock_indicator.calculate_technical_indicators_bulk(ohlcv_dict)
+
+    for symbol, ohlcv in histories.items():
+        _, expected = stock_indicator.build_indicator_state(ohlcv)
+        assert_technical_equal(bulk[symbol], expected)
+
+
+def test_refresh_matches_full_recompute(tmp_path, histories, monkeypatch):
+    monkeypatch.setattr(
+        stock_fundamental, "fetch_fundamental_snapshot",
+        lambda symbol, cache=None: stock_fundamental.FundamentalSnapshot(symbol),
+    )
+    periods = []
+    download_ohlcv = stock_data.download_ohlcv
+
+    def recording_download(symbols, period="6mo", **kwargs):
+        periods.append(period)
+        return download_ohlcv(symbols, period=period, **kwargs)
+
+    monkeypatch.setattr(stock_data, "download_ohlcv", recording_download)
+
+    now = [(LAST_DATE + pd.Timedelta(hours=22)).timestamp()]
+    store = SymbolDataStore(downloader=stock_data.LocalOhlcvSource(str(tmp_path)), clock=lambda: now[0])
+    symbols = list(histories)
+
+    # 처음 보는 종목은 전체 이력으로 계산
+    reported = []
+    data, errors = store.refresh(symbols, on_symbol=lambda symbol, _: reported.append(symbol))
+    assert not errors
+    assert sorted(reported) == sorted(symbols)
+    for symbol, ohlcv in histories.items():
+        assert_technical_equal(data[symbol].technical_df, full_recompute(ohlcv))
+
+    # 갱신 주기 안에서는 다시 받지 않음
+    periods.clear()
+    assert store.refresh(symbols)[0] == data
+    assert periods == []
+
+    # 새 봉을 추가하고 갱신 주기가 지나면 최근 봉만 받아서 이어서 계산
+    extended = {}
+    for seed, (symbol, ohlcv) in enumerate(histories.items(), start=len(histories)):
+        new_bars = make_ohlcv(NEW_DATES, seed) * ohlcv["Close"].iloc[-1] / 100
+        extended[symbol] = pd.concat([ohlcv, new_bars])
+        write_csv(tmp_path, symbol, extended[symbol])
+    now[0] = (NEW_DATES[-1] + pd.Timedelta(hours=22)).timestamp()
+
+    data, errors = store.refresh(symbols)
+    assert not errors
+    assert periods == ["5d"]
+    for symbol, ohlcv in extended.items():
+        assert data[symbol].technical_df.index[-1] == NEW_DATES[-1]
+        assert_technical_equal(data[symbol].technical_df, full_recompute(ohlcv))